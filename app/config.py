@@ -1,19 +1,196 @@
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
+
+# Settings without which no request can be served; checked at startup rather
+# than on import, so the app module loads without them (e.g. at build time)
+REQUIRED_SETTINGS = ("gemini_api_key", "supabase_url", "supabase_key", "jina_api_key", "api_secret_key")
+
+
+class ApiKeyConfig(BaseModel):
+    """A named API key: its share of upstream capacity and its request quota"""
+    name: str
+    # Relative share of Gemini/Jina capacity when keys compete for it
+    weight: float = 1.0
+    # Analyze/chat requests per minute; None = unlimited
+    requests_per_minute: Optional[int] = None
+
+
+class ModelRouteConfig(BaseModel):
+    """A Gemini model the LLM service may route prompts to"""
+    name: str
+    # Prompts up to this many tokens (before trimming) go here first; None = any size
+    max_prompt_tokens: Optional[int] = None
+    # Tasks it serves: "insights" (analysis) and/or "chat"
+    tasks: List[str] = ["insights", "chat"]
+    # Per-call timeout; None = LLM_TIMEOUT_SECONDS
+    timeout_seconds: Optional[float] = None
 
 
 class Settings(BaseSettings):
     # API Keys
-    gemini_api_key: str
-    supabase_url: str
-    supabase_key: str
-    jina_api_key: str
+    gemini_api_key: str = ""
+    supabase_url: str = ""
+    supabase_key: str = ""
+    jina_api_key: str = ""
+    
+    # Upstream endpoints (overridable for local stand-ins, e.g. the load-test harness)
+    jina_base_url: str = "https://r.jina.ai/"
+    gemini_api_endpoint: Optional[str] = None
     
     # Authentication
-    api_secret_key: str
+    api_secret_key: str = ""
+    # More keys, by secret, e.g. {"<secret>": {"name": "batch-team", "weight": 0.5, "requests_per_minute": 120}}
+    api_keys: Dict[str, ApiKeyConfig] = {}
+    
+    # Admission control: requests in progress per endpoint, plus a bounded FIFO
+    # wait queue; beyond that (or after the queue timeout) requests get a 503
+    analyze_max_in_flight: int = 32
+    chat_max_in_flight: int = 64
+    admission_max_queue: int = 64
+    admission_queue_timeout_seconds: float = 5.0
+    # /health answers 503 "saturated" once a wait queue is this full, so load
+    # balancers steer new traffic elsewhere
+    health_saturation_ratio: float = 0.8
+
+    # Analyze deadline: the X-Request-Timeout header (seconds) or this default,
+    # capped. Scraping and stored-analysis reads get at most their share of it
+    # and the model gets what's left; when the model can't finish in time the
+    # response carries the locally extracted contact info, marked partial
+    analyze_deadline_seconds: float = 60.0
+    analyze_max_deadline_seconds: float = 300.0
+    deadline_scrape_share: float = 0.5
+    deadline_db_share: float = 0.1
+    # How often a running analysis checks whether its client has gone away
+    disconnect_poll_seconds: float = 0.25
+    # Analyze pipeline database writes: per-attempt timeout and retries. Both writes
+    # upsert the analysis on its url, so a retry after an attempt that timed out
+    # but did land rewrites the same row
+    analyze_write_timeout_seconds: float = 10.0
+    analyze_write_retries: int = 1
+
+    # Upstream scheduling: concurrent Gemini calls / Jina fetches. Chat is served
+    # first and can always use the reserved slots; other work shares the rest
+    # fairly among API keys (by weight)
+    gemini_concurrency: int = 4
+    scraper_concurrency: int = 8
+    interactive_reserved_slots: int = 1
     
     # Rate Limiting
     rate_limit_per_minute: int = 10
+    # Cacheable reads (GET /api/analyses/{url}) are polled by dashboards; most end in a 304
+    read_rate_limit_per_minute: int = 600
+    analysis_cache_max_age_seconds: int = 60
+    encoded_response_cache_entries: int = 2048
+    
+    # Chat context caching (provider-side cached site content for multi-turn chat)
+    context_cache_enabled: bool = True
+    context_cache_backend: str = "gemini"  # "gemini" or "local" (in-process stand-in)
+    context_cache_ttl_seconds: int = 3600
+    context_cache_refresh_margin_seconds: int = 300
+    context_cache_min_chars: int = 4096
+    
+    # Multi-page crawl (opt-in per request)
+    crawl_max_pages: int = 5
+    crawl_per_host_concurrency: int = 2
+    crawl_politeness_delay_seconds: float = 0.5
+    crawl_max_chars: int = 120000
+    crawl_duplicate_threshold: float = 0.9
+    
+    # Model routing, in order of preference, e.g. [{"name": "gemini-2.5-flash-lite",
+    # "max_prompt_tokens": 12000}, {"name": "gemini-2.5-flash"}]. A prompt goes to the
+    # first model serving its task that fits it, skipping models recently failing
+    # or slower than the task's latency target; a call that errors or times out
+    # falls back to the next candidate
+    llm_models: List[ModelRouteConfig] = [ModelRouteConfig(name="gemini-2.5-flash-lite")]
+    llm_timeout_seconds: float = 60.0
+    llm_latency_targets: Dict[str, float] = {"chat": 10.0, "insights": 45.0}
+    # Smoothing of the per-model latency and error rate (weight of the latest call)
+    llm_ewma_alpha: float = 0.3
+    # A model whose error rate reaches this is skipped for the cooldown
+    llm_error_rate_threshold: float = 0.5
+    llm_cooldown_seconds: float = 30.0
+    
+    # Prompt token budgets (content is trimmed to the most relevant sections beyond these)
+    chars_per_token: float = 4.0
+    prompt_token_budgets: Dict[str, int] = {"gemini-2.5-flash-lite": 16000, "gemini-2.5-flash": 32000}
+    default_prompt_token_budget: int = 16000
+    prompt_response_reserve_tokens: int = 2048
+    
+    # Structured extraction answer cache
+    answer_cache_ttl_seconds: int = 86400
+    answer_cache_max_entries: int = 10000
+
+    # Chat answer cache: answers to questions that don't depend on the conversation,
+    # per site and content version (a refreshed analysis starts a new set). A
+    # question also matches a cached one of at least this cosine similarity; 0 = exact only
+    chat_answer_cache_enabled: bool = True
+    chat_answer_cache_ttl_seconds: int = 86400
+    chat_answer_cache_max_sites: int = 10000
+    chat_answer_cache_per_site: int = 50
+    chat_answer_similarity_threshold: float = 0.9
+
+    # Chat history sent with each question: at most this many turns of the session,
+    # newest first, and no more than this many bytes of queries and responses
+    chat_history_turns: int = 10
+    chat_history_max_bytes: int = 16000
+
+    # WebSocket chat sessions (/ws/chat) keep a site's content and the session's
+    # history in memory for the life of the connection: closed after this long
+    # without a question; new sessions are refused beyond the count or memory cap
+    ws_idle_timeout_seconds: float = 300.0
+    ws_max_sessions: int = 1000
+    ws_sessions_max_bytes: int = 256 * 1024 * 1024
+
+    # Incremental re-analysis: above this share of changed content, re-run the full analysis
+    incremental_full_rerun_ratio: float = 0.3
+
+    # Stale-while-revalidate for /api/analyze: how long past max_age a stored
+    # analysis may still be served (flagged stale) while it is refreshed
+    analyze_stale_while_revalidate_seconds: int = 604800
+
+    # Bulk export/import: rows per database round trip
+    bulk_batch_size: int = 500
+
+    # CPU-heavy content processing (enhancement, crawl merging, section splitting)
+    # runs in a process pool for content of at least offload_min_chars; 0 workers = inline
+    offload_workers: int = 2
+    offload_min_chars: int = 100000
+    
+    # Write-behind persistence for analyze/chat writes (acknowledged before they
+    # reach the database; spooled to a local file while it is unreachable)
+    write_behind_enabled: bool = False
+    write_behind_flush_interval_seconds: float = 0.2
+    write_behind_batch_size: int = 200
+    write_behind_max_pending: int = 5000
+    write_behind_spool_path: str = "write_behind_spool.ndjson"
+
+    # Background freshness scheduler (re-scrapes stale analyses; off by default)
+    freshness_enabled: bool = False
+    freshness_max_age_seconds: int = 86400
+    freshness_interval_seconds: int = 300
+    freshness_pages_per_hour: int = 60  # upstream (Jina) page reads
+    freshness_concurrency: int = 2
+    freshness_activity_window_seconds: int = 604800  # chat activity counted over the last week
+    freshness_scan_limit: int = 500
+
+    # Similar-company search (local embeddings + in-process vector index)
+    similarity_enabled: bool = True
+    similarity_dimensions: int = 256  # ~1 GB of index memory per million analyses
+    similarity_nprobe: int = 16  # index partitions scanned per query
+    
+    # On-demand profiling (off by default): requests with an X-Profile header, and
+    # POST /api/profile for the whole worker, record wall-clock stack samples and
+    # an allocation diff, kept for download (the last profiling_keep, for an hour)
+    profiling_enabled: bool = False
+    profiling_sample_interval_seconds: float = 0.005
+    profiling_max_seconds: float = 60.0
+    profiling_keep: int = 20
+    profiling_top_allocations: int = 50
+    
+    # Cold start: SDK clients are built on first use; warm them up in the
+    # background at startup so the first request doesn't wait for them
+    warm_services_on_startup: bool = True
     
     # App Settings
     app_name: str = "Website Intelligence Agent"
@@ -22,6 +199,13 @@ class Settings(BaseSettings):
     
     class Config:
         env_file = ".env"
+    
+    def missing_required(self) -> List[str]:
+        # Named keys can stand in for the single shared one
+        return [
+            name for name in REQUIRED_SETTINGS
+            if not getattr(self, name) and not (name == "api_secret_key" and self.api_keys)
+        ]
 
 
 settings = Settings()
@@ -1,30 +1,140 @@
-from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
+from contextlib import aclosing, asynccontextmanager
 from datetime import datetime
+from typing import Any, Dict, Optional
+from pydantic import HttpUrl
+import asyncio
+import json
 import logging
+import math
+import uuid
 
 from app.config import settings
 from app.models.schemas import (
     AnalyzeRequest, AnalyzeResponse, ChatRequest, ChatResponse, 
-    BusinessInsights, ErrorResponse
+    BusinessInsights, ErrorResponse, AnalysisListResponse, SimilarCompany, SimilarResponse,
+    StoredAnalysisResponse
 )
-from app.utils.auth import verify_token
+from app.utils.admission import AdmissionGate, Saturated, admission
+from app.utils.auth import charge_quota, upstream_caller, verify_token, websocket_api_key
+from app.utils.deadline import ClientDisconnected, Deadline, DeadlineExceeded, request_deadline, until_disconnected
 from app.services.database import db_service
 from app.services.scraper import scraper_service
+from app.services.crawler import site_crawler
 from app.services.llm import llm_service
+from app.services.answer_cache import chat_answer_cache
+from app.services.chat_sessions import SessionsFull, chat_sessions, load_history, load_site
+from app.services.analyzer import (
+    STORED_RESULT_COLUMNS, analysis_age, extract_contact_info, reusable_insights, stored_result, website_analyzer
+)
+from app.services.scheduler import freshness_scheduler
+from app.services.bulk import TABLES as BULK_TABLES, bulk_service, parquet_available, parse_since
+from app.services.search import search_service
+from app.services.embeddings import embedder, to_list
+from app.services.similarity import similarity_service
+from app.services.write_behind import write_behind
+from app.services.offload import content_offload
+from app.services.fair_scheduler import Caller, current_caller, gemini_scheduler, scraper_scheduler
+from app.services.model_router import model_router
+from app.services.prompt_builder import Section, prompt_builder
+from app.services.profiler import ProfilingMiddleware, profiler
+from app.utils.cache import TTLCache, content_hash
+from app.utils.dag import Dag, Stage
+from app.utils.token_bucket import TokenBucket
+from app.utils.http_cache import encode_body, etag_matches, negotiate_encoding, strong_etag, variant_etag
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Per-endpoint admission control for the endpoints that wait on Gemini/Jina
+admission_gates = {
+    name: AdmissionGate(
+        name, max_in_flight, settings.admission_max_queue, settings.admission_queue_timeout_seconds
+    )
+    for name, max_in_flight in (
+        ("analyze", settings.analyze_max_in_flight),
+        ("chat", settings.chat_max_in_flight)
+    )
+}
+
+# Encoded GET /api/analyses/{url} bodies keyed by (ETag, encoding); an ETag names one version
+encoded_responses = TTLCache(
+    max_entries=settings.encoded_response_cache_entries,
+    ttl_seconds=settings.analysis_cache_max_age_seconds * 10
+)
+
+# Per-client-IP question budget for /ws/chat: the same rate_limit_per_minute
+# POST /api/chat is held to, shared by all of an address's sockets
+ws_message_buckets = TTLCache(max_entries=10000, ttl_seconds=600)
+
+
+def ws_message_bucket(websocket: WebSocket) -> TokenBucket:
+    """Token bucket charged for each WebSocket question from the client's address"""
+    address = websocket.client.host if websocket.client else "unknown"
+    bucket = ws_message_buckets.get(address)
+    if bucket is None:
+        bucket = TokenBucket(rate=settings.rate_limit_per_minute / 60.0, capacity=settings.rate_limit_per_minute)
+        ws_message_buckets.set(address, bucket)
+    return bucket
+
+
+async def warm_up_services():
+    """
+    Build the SDK-backed services on a worker thread, so neither the first
+    request nor the event loop waits for their imports and clients
+    """
+    def build():
+        import httpx  # noqa: F401 (imported by the scraper on first fetch)
+        db_service.resolve()
+        llm_service.resolve()
+
+    try:
+        await asyncio.to_thread(build)
+    except Exception as e:
+        logger.error(f"Service warm-up failed: {str(e)}")
+
+
+async def start_background_services():
+    if settings.warm_services_on_startup:
+        await warm_up_services()
+        await content_offload.start()
+    # The index load reads the database, so it starts once the client exists
+    if settings.similarity_enabled:
+        similarity_service.start()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers"""
+    missing = settings.missing_required()
+    if missing:
+        logger.warning(f"Missing required settings: {', '.join(missing)}")
+    write_behind.start()
+    if settings.freshness_enabled:
+        freshness_scheduler.start()
+    # Startup returns at once; warm-up and index loading continue in the background
+    starting = asyncio.create_task(start_background_services())
+    yield
+    starting.cancel()
+    await freshness_scheduler.stop()
+    await similarity_service.stop()
+    content_offload.shutdown()
+    # Last: flush (or spool) writes acknowledged but not yet persisted
+    await write_behind.stop()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.app_name,
     description="AI-powered agent for extracting business insights from websites",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Setup rate limiting
@@ -32,6 +142,9 @@ limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# On-demand request profiling (passes requests through unless PROFILING_ENABLED)
+app.add_middleware(ProfilingMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -50,12 +163,22 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Detailed health check"""
-    return {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
-        "version": "1.0.0"
-    }
+    """Detailed health check; 503 while an endpoint's wait queue is nearly full"""
+    saturated = any(gate.saturation >= settings.health_saturation_ratio for gate in admission_gates.values())
+    return JSONResponse(
+        status_code=503 if saturated else 200,
+        content={
+            "status": "saturated" if saturated else "healthy",
+            "timestamp": datetime.utcnow().isoformat(),
+            "version": "1.0.0",
+            "admission": {name: gate.metrics() for name, gate in admission_gates.items()},
+            "offload": content_offload.metrics(),
+            "upstream": {"gemini": gemini_scheduler.metrics(), "scraper": scraper_scheduler.metrics()},
+            "models": model_router.metrics(),
+            "chat_answers": chat_answer_cache.metrics(),
+            "chat_sessions": chat_sessions.metrics()
+        }
+    )
 
 
 @app.post(
@@ -64,44 +187,216 @@ async def health_check():
     responses={
         401: {"model": ErrorResponse, "description": "Unauthorized"},
         429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
-        500: {"model": ErrorResponse, "description": "Internal server error"}
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+        503: {"model": ErrorResponse, "description": "Too many analyses in progress"},
+        504: {"model": ErrorResponse, "description": "Deadline exceeded before any content was scraped"}
     }
 )
 @limiter.limit(f"{settings.rate_limit_per_minute}/minute")
 async def analyze_website(
     request: Request,
+    response: Response,
     analyze_request: AnalyzeRequest,
-    token: str = Depends(verify_token)
+    background_tasks: BackgroundTasks,
+    caller: Caller = Depends(upstream_caller(interactive=False)),
+    deadline: Deadline = Depends(request_deadline),
+    # Resolved last: only authenticated requests within their quota take a slot
+    admitted: None = Depends(admission(admission_gates["analyze"]))
 ):
     """
     Analyze a website and extract business insights
     """
+    try:
+        return await until_disconnected(
+            request,
+            run_analysis(analyze_request, background_tasks, deadline, response),
+            settings.disconnect_poll_seconds
+        )
+    except ClientDisconnected:
+        # Nobody is waiting: the scrape and model calls in progress were cancelled
+        logger.info(f"Client disconnected, analysis cancelled: {analyze_request.url}")
+        return Response(status_code=499)
+
+
+async def run_analysis(
+    analyze_request: AnalyzeRequest,
+    background_tasks: BackgroundTasks,
+    deadline: Deadline,
+    response: Response
+) -> AnalyzeResponse:
+    """
+    The analyze pipeline, each stage bounded by its share of the deadline and
+    started as soon as the stages it needs are done; the stage timings and
+    critical path are returned in a Server-Timing header
+    """
     try:
         logger.info(f"Analyzing website: {analyze_request.url}")
         
-        # Step 1: Scrape website content
-        content = await scraper_service.scrape_website(str(analyze_request.url))
+        # Serve a recent enough stored analysis (stale-while-revalidate)
+        if analyze_request.max_age is not None:
+            try:
+                stored = await deadline.run(
+                    "database",
+                    db_service.get_website_analysis(str(analyze_request.url), columns=STORED_RESULT_COLUMNS),
+                    settings.deadline_db_share
+                )
+            except DeadlineExceeded:
+                logger.warning(f"Stored analysis read timed out, analyzing afresh: {analyze_request.url}")
+                stored = None
+            result = stored_result(stored, analyze_request.questions, analyze_request.structured)
+            age = analysis_age(stored)
+            if result is not None and age is not None and \
+                    age <= analyze_request.max_age + settings.analyze_stale_while_revalidate_seconds:
+                stale = age > analyze_request.max_age
+                if stale:
+                    background_tasks.add_task(freshness_scheduler.revalidate, str(analyze_request.url))
+                insights, answers = result
+                return AnalyzeResponse(
+                    url=str(analyze_request.url),
+                    insights=insights,
+                    answers=answers,
+                    cached=True,
+                    stale=stale,
+                    analyzed_at=stored["updated_at"],
+                    timestamp=datetime.utcnow()
+                )
         
-        # Step 2: Store scraped content in database
-        analysis_id = await db_service.store_website_analysis(
-            url=str(analyze_request.url),
-            raw_content=content
-        )
+        url = str(analyze_request.url)
+        # Incremental mode diffs against the stored version, so it is read before being overwritten
+        incremental = analyze_request.incremental and not (analyze_request.questions or analyze_request.structured)
         
-        # Step 3: Extract insights using LLM
-        insights_data = await llm_service.extract_business_insights(
-            content=content,
-            custom_questions=analyze_request.questions
-        )
+        # Step 1: Scrape website content (optionally with linked about/contact pages)
+        async def scrape(results):
+            if analyze_request.crawl:
+                pages = site_crawler.crawl_website(url, max_pages=analyze_request.max_pages)
+            else:
+                pages = scraper_service.scrape_website(url)
+            return await deadline.run("scrape", pages, settings.deadline_scrape_share)
         
-        # Step 4: Update database with insights
-        await db_service.store_website_analysis(
-            url=str(analyze_request.url),
-            raw_content=content,
-            insights=insights_data
-        )
+        async def read_previous(results):
+            try:
+                return await deadline.run("database", db_service.get_website_analysis(url), settings.deadline_db_share)
+            except DeadlineExceeded:
+                logger.warning(f"Previous analysis read timed out, running full analysis: {url}")
+                return None
+        
+        async def split_sections(results):
+            content = results["scrape"]
+            return await content_offload.run(prompt_builder.split_sections, content, size=len(content))
+        
+        async def find_contacts(results):
+            # Pattern matching only; runs alongside the model call
+            content = results["scrape"]
+            return await content_offload.run(extract_contact_info, content, size=len(content))
+        
+        # Step 2: Store scraped content in database, with its token accounting
+        async def store_content(results):
+            content, sections = results["scrape"], results["sections"]
+            await write_behind.store_website_analysis(
+                url=url,
+                raw_content=content,
+                token_count=sum(section.tokens for section in sections),
+                sections=[section.to_dict() for section in sections],
+                content_hash=content_hash(content)
+            )
+            # Chat answers about the previous version no longer apply
+            chat_answer_cache.invalidate(url)
+            chat_sessions.invalidate(url)
+        
+        # Step 3: Extract insights using LLM, with whatever time is left; None when out of time
+        async def extract_insights(results):
+            content, sections = results["scrape"], results["sections"]
+            try:
+                if analyze_request.structured:
+                    # Default insights and custom answers from one schema-constrained call
+                    analysis = await deadline.run("analysis", llm_service.extract_structured_insights(
+                        content=content,
+                        questions=analyze_request.questions,
+                        sections=sections
+                    ))
+                    insights_data = analysis.insights.model_dump()
+                    if analysis.answers:
+                        insights_data["answers"] = analysis.answers
+                    return insights_data, analysis, None
+                if incremental:
+                    # Only sections changed since the last analysis are sent to the model
+                    insights_data, analysis_mode = await deadline.run(
+                        "analysis", website_analyzer.extract_insights(content, sections, results.get("previous"))
+                    )
+                    return insights_data, None, analysis_mode
+                insights_data = await deadline.run("analysis", llm_service.extract_business_insights(
+                    content=content,
+                    custom_questions=analyze_request.questions,
+                    sections=sections
+                ))
+                return insights_data, None, None
+            except Exception as e:
+                # The SDK's own timeout surfaces as an analysis error once the deadline has passed
+                if not (isinstance(e, DeadlineExceeded) or deadline.expired):
+                    raise
+                logger.warning(f"Analysis deadline exceeded, returning partial result: {url}")
+                return None
+        
+        # Step 4: Update database with insights and their embedding
+        async def store_insights(results):
+            if results["insights"] is None:
+                return
+            insights_data = results["insights"][0]
+            if not (analyze_request.structured or analyze_request.questions) and not insights_data.get("contact_info"):
+                insights_data["contact_info"] = results["contacts"]
+            embedding = embedder.embed_insights(insights_data)
+            await write_behind.store_website_analysis(
+                url=url,
+                raw_content=results["scrape"],
+                insights=insights_data,
+                embedding=to_list(embedding) if embedding is not None else None
+            )
+            similarity_service.update(url, embedding)
+        
+        # Storing the content and calling the model only need the scrape, so they overlap
+        needs_content = ("sections", "previous") if incremental else ("sections",)
+        stages = [
+            Stage("scrape", scrape),
+            Stage("sections", split_sections, after=("scrape",)),
+            Stage("contacts", find_contacts, after=("scrape",)),
+            Stage("insights", extract_insights, after=needs_content),
+            Stage(
+                "store_content", store_content, after=needs_content,
+                timeout=settings.analyze_write_timeout_seconds, retries=settings.analyze_write_retries
+            ),
+            Stage(
+                "store_insights", store_insights, after=("insights", "store_content", "contacts"),
+                timeout=settings.analyze_write_timeout_seconds, retries=settings.analyze_write_retries
+            )
+        ]
+        if incremental:
+            # Read alongside the scrape
+            stages.append(Stage("previous", read_previous))
+        pipeline = Dag(stages)
+        try:
+            results = await pipeline.run()
+        finally:
+            response.headers["Server-Timing"] = pipeline.server_timing()
+            logger.info(f"Analysis of {url} critical path: {' > '.join(pipeline.critical_path())}")
+        
+        if results["insights"] is None:
+            return AnalyzeResponse(
+                url=url,
+                insights=BusinessInsights(contact_info=results["contacts"]),
+                partial=True,
+                timestamp=datetime.utcnow()
+            )
+        insights_data, analysis, analysis_mode = results["insights"]
         
         # Step 5: Prepare response
+        if analyze_request.structured:
+            return AnalyzeResponse(
+                url=str(analyze_request.url),
+                insights=analysis.insights,
+                answers=analysis.answers or None,
+                timestamp=datetime.utcnow()
+            )
+        
         if analyze_request.questions:
             # Custom questions format
             insights = BusinessInsights()
@@ -113,9 +408,16 @@ async def analyze_website(
         return AnalyzeResponse(
             url=str(analyze_request.url),
             insights=insights,
+            analysis_mode=analysis_mode,
             timestamp=datetime.utcnow()
         )
         
+    except DeadlineExceeded as e:
+        logger.warning(f"Analysis deadline exceeded during {e.stage}: {analyze_request.url}")
+        raise HTTPException(
+            status_code=504,
+            detail=f"Request deadline exceeded during {e.stage}"
+        )
     except Exception as e:
         logger.error(f"Analysis error: {str(e)}")
         raise HTTPException(
@@ -131,14 +433,17 @@ async def analyze_website(
         401: {"model": ErrorResponse, "description": "Unauthorized"},
         404: {"model": ErrorResponse, "description": "Website not analyzed"},
         429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
-        500: {"model": ErrorResponse, "description": "Internal server error"}
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+        503: {"model": ErrorResponse, "description": "Too many chats in progress"}
     }
 )
 @limiter.limit(f"{settings.rate_limit_per_minute}/minute")
 async def chat_about_website(
     request: Request,
     chat_request: ChatRequest,
-    token: str = Depends(verify_token)
+    caller: Caller = Depends(upstream_caller(interactive=True)),
+    # Resolved last: only authenticated requests within their quota take a slot
+    admitted: None = Depends(admission(admission_gates["chat"]))
 ):
     """
     Ask conversational questions about a previously analyzed website
@@ -146,8 +451,8 @@ async def chat_about_website(
     try:
         logger.info(f"Chat query for website: {chat_request.url}")
         
-        # Step 1: Retrieve website data from database
-        website_data = await db_service.get_website_analysis(str(chat_request.url))
+        # Step 1: Retrieve website data from database, plus writes still queued
+        website_data = await load_site(str(chat_request.url))
         
         if not website_data:
             raise HTTPException(
@@ -155,28 +460,32 @@ async def chat_about_website(
                 detail="Website not found. Please analyze the website first using /api/analyze"
             )
         
-        # Step 2: Get conversation history
-        conversation_history = await db_service.get_conversation_history(
-            url=str(chat_request.url),
-            limit=10
-        )
+        # Step 2: Get this session's conversation history (a new session has none)
+        session_id = chat_request.session_id or str(uuid.uuid4())
+        conversation_history = []
+        if chat_request.session_id:
+            conversation_history = await load_history(str(chat_request.url), session_id)
         
         # Step 3: Generate response using LLM
         response_text = await llm_service.answer_conversational_query(
             content=website_data["raw_content"],
             query=chat_request.query,
-            conversation_history=conversation_history
+            conversation_history=conversation_history,
+            url=str(chat_request.url),
+            sections=[Section.from_dict(s) for s in website_data.get("sections") or []] or None
         )
         
         # Step 4: Store conversation in database
-        await db_service.store_conversation(
+        await write_behind.store_conversation(
             url=str(chat_request.url),
             query=chat_request.query,
-            response=response_text
+            response=response_text,
+            session_id=session_id
         )
         
         return ChatResponse(
             response=response_text,
+            session_id=session_id,
             timestamp=datetime.utcnow()
         )
         
@@ -190,6 +499,465 @@ async def chat_about_website(
         )
 
 
+@app.websocket("/ws/chat")
+async def chat_session(
+    websocket: WebSocket,
+    url: HttpUrl = Query(..., description="Analyzed website to chat about"),
+    session_id: Optional[str] = Query(None, description="Session to resume; a new one is started without it")
+):
+    """
+    Chat about a previously analyzed website over a WebSocket. The site's
+    content and the session's history are loaded once, when the socket opens;
+    each {"query": ...} message is answered with "chunk" messages as the
+    answer is written, then a "done" message. Turns are stored in the
+    background. The socket is closed after ws_idle_timeout_seconds without a
+    question.
+    """
+    key = websocket_api_key(websocket)
+    if key is None:
+        # Closing before accepting refuses the handshake (HTTP 403)
+        await websocket.close(code=1008)
+        return
+    current_caller.set(Caller(key=key.name, weight=key.weight, interactive=True))
+    await websocket.accept()
+
+    gate = admission_gates["chat"]
+    if gate.saturation >= 1.0:
+        # No session is opened (nor site loaded) while chats are already being shed
+        await websocket.send_json({
+            "type": "error", "detail": "Too many chats in progress", "retry_after": gate.retry_after
+        })
+        await websocket.close(code=1013)
+        return
+    try:
+        session = await chat_sessions.open(str(url), session_id)
+    except SessionsFull as e:
+        await websocket.send_json({"type": "error", "detail": f"Too many chat sessions: {str(e)}"})
+        await websocket.close(code=1013)
+        return
+    except Exception as e:
+        logger.error(f"Chat session error: {str(e)}")
+        await websocket.send_json({"type": "error", "detail": f"Chat failed: {str(e)}"})
+        await websocket.close(code=1011)
+        return
+    if session is None:
+        await websocket.send_json({
+            "type": "error",
+            "detail": "Website not found. Please analyze the website first using /api/analyze"
+        })
+        await websocket.close(code=1008)
+        return
+
+    messages = ws_message_bucket(websocket)
+    try:
+        await websocket.send_json({"type": "ready", "session_id": session.session_id})
+        while True:
+            try:
+                frame = await asyncio.wait_for(websocket.receive(), settings.ws_idle_timeout_seconds)
+            except asyncio.TimeoutError:
+                await websocket.close(code=1000, reason="Idle timeout")
+                break
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            if frame.get("text") is None:
+                # Binary frames aren't part of the protocol
+                await websocket.close(code=1003, reason="Messages must be JSON text")
+                break
+            try:
+                message = json.loads(frame["text"])
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON"})
+                continue
+            query = message.get("query") if isinstance(message, dict) else None
+            if not isinstance(query, str) or not query.strip():
+                await websocket.send_json({"type": "error", "detail": "Message must have a non-empty query"})
+                continue
+
+            if not messages.try_acquire():
+                await websocket.send_json({
+                    "type": "error",
+                    "detail": f"Rate limit of {settings.rate_limit_per_minute} questions per minute exceeded",
+                    "retry_after": max(math.ceil(messages.time_until()), 1)
+                })
+                continue
+            try:
+                charge_quota(key)
+                await gate.acquire()
+            except HTTPException as e:
+                await websocket.send_json({
+                    "type": "error", "detail": e.detail, "retry_after": int(e.headers["Retry-After"])
+                })
+                continue
+            except Saturated as e:
+                await websocket.send_json({
+                    "type": "error", "detail": "Too many chats in progress", "retry_after": e.retry_after
+                })
+                continue
+
+            try:
+                if not await chat_sessions.refresh(session):
+                    await websocket.send_json({"type": "error", "detail": "Website analysis no longer available"})
+                    await websocket.close(code=1008)
+                    break
+                chunks = []
+                # Closed as soon as the client drops, so the stream's Gemini slot is released at once
+                async with aclosing(llm_service.stream_conversational_query(
+                    content=session.site.content,
+                    query=query,
+                    conversation_history=list(session.history),
+                    url=session.site.url,
+                    sections=session.site.sections
+                )) as answer:
+                    async for chunk in answer:
+                        chunks.append(chunk)
+                        await websocket.send_json({"type": "chunk", "text": chunk})
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.error(f"Chat error: {str(e)}")
+                await websocket.send_json({"type": "error", "detail": f"Chat failed: {str(e)}"})
+                continue
+            finally:
+                gate.release()
+
+            response_text = "".join(chunks)
+            session.add_turn(query, response_text)
+            session.persist(query, response_text)
+            await websocket.send_json({
+                "type": "done",
+                "response": response_text,
+                "session_id": session.session_id,
+                "timestamp": datetime.utcnow().isoformat()
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chat_sessions.close(session)
+        await session.flush()
+
+
+@app.get(
+    "/api/analyses",
+    response_model=AnalysisListResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid cursor"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+@limiter.limit(f"{settings.rate_limit_per_minute}/minute")
+async def list_analyses(
+    request: Request,
+    q: Optional[str] = Query(None, max_length=200, description="Full-text query over insights (websearch syntax)"),
+    industry: Optional[str] = Query(None, max_length=100),
+    location: Optional[str] = Query(None, max_length=100),
+    company_size: Optional[str] = Query(None, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    token: str = Depends(verify_token)
+):
+    """
+    List and search analyzed websites, most recently updated first
+    """
+    try:
+        return await search_service.list_analyses(
+            text_query=q,
+            industry=industry,
+            location=location,
+            company_size=company_size,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Search error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Search failed: {str(e)}"
+        )
+
+
+def analysis_etag(url: str, record: Dict[str, Any]) -> str:
+    # updated_at moves on every write (table trigger), so it covers insights changes
+    return strong_etag(url, record.get("content_hash"), record.get("updated_at"))
+
+
+@app.get(
+    "/api/analyses/{url:path}",
+    response_model=StoredAnalysisResponse,
+    responses={
+        304: {"description": "Not modified since the version named by If-None-Match"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        404: {"model": ErrorResponse, "description": "Website not analyzed"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+@limiter.limit(f"{settings.read_rate_limit_per_minute}/minute")
+async def get_analysis(
+    request: Request,
+    url: HttpUrl,
+    token: str = Depends(verify_token)
+):
+    """
+    Stored insights for a website, with a strong ETag for conditional polling
+    (If-None-Match → 304) and br/gzip compression
+    """
+    url = str(url)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {
+        "Cache-Control": f"private, max-age={settings.analysis_cache_max_age_seconds}",
+        "Vary": "Accept-Encoding, Authorization"
+    }
+    try:
+        # Validators only: a poll that ends in a 304 never reads the insights
+        version = await db_service.get_website_analysis(url, columns="content_hash, updated_at")
+        if version is None:
+            raise HTTPException(status_code=404, detail="Website not analyzed")
+        etag = analysis_etag(url, version)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={**headers, "ETag": variant_etag(etag, encoding)})
+
+        body = encoded_responses.get((etag, encoding))
+        if body is None:
+            record = await db_service.get_website_analysis(url, columns="url, insights, content_hash, updated_at")
+            insights = reusable_insights(record)
+            if insights is None:
+                raise HTTPException(status_code=404, detail="No stored insights for this website")
+            # The row may have changed since the validator read; name what is served
+            etag = analysis_etag(url, record)
+            body = encode_body(
+                StoredAnalysisResponse(
+                    url=url,
+                    insights=BusinessInsights(**insights),
+                    answers=record["insights"].get("answers") or None,
+                    content_hash=record.get("content_hash"),
+                    analyzed_at=record.get("updated_at")
+                ).model_dump_json().encode(),
+                encoding
+            )
+            encoded_responses.set((etag, encoding), body)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Analysis read error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to read analysis: {str(e)}"
+        )
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={**headers, "ETag": variant_etag(etag, encoding)}
+    )
+
+
+@app.get(
+    "/api/similar",
+    response_model=SimilarResponse,
+    responses={
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        404: {"model": ErrorResponse, "description": "Website not analyzed"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+        503: {"model": ErrorResponse, "description": "Similarity index is loading"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+@limiter.limit(f"{settings.rate_limit_per_minute}/minute")
+async def find_similar_companies(
+    request: Request,
+    url: HttpUrl,
+    limit: int = Query(10, ge=1, le=100),
+    token: str = Depends(verify_token)
+):
+    """
+    Find analyzed companies most similar to an analyzed website
+    """
+    if not settings.similarity_enabled or not similarity_service.ready:
+        raise HTTPException(status_code=503, detail="Similarity index is loading, retry shortly")
+    try:
+        results = await similarity_service.find_similar(str(url), limit)
+    except Exception as e:
+        logger.error(f"Similarity error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Similarity search failed: {str(e)}"
+        )
+    if results is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Website not found. Please analyze the website first using /api/analyze"
+        )
+    return SimilarResponse(
+        url=str(url),
+        results=[SimilarCompany(url=similar_url, score=round(score, 4)) for similar_url, score in results],
+        timestamp=datetime.utcnow()
+    )
+
+
+@app.get(
+    "/api/export/{table}",
+    responses={
+        200: {"description": "NDJSON or Parquet stream of the table"},
+        400: {"model": ErrorResponse, "description": "Invalid since timestamp"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        404: {"model": ErrorResponse, "description": "Unknown table"},
+        501: {"model": ErrorResponse, "description": "Parquet support not installed"}
+    }
+)
+@limiter.limit(f"{settings.rate_limit_per_minute}/minute")
+async def export_table(
+    request: Request,
+    table: str,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|parquet)$"),
+    since: Optional[str] = Query(None, description="Only rows updated (analyses) or created (conversations) at or after this ISO timestamp"),
+    batch_size: Optional[int] = Query(None, ge=1, le=5000),
+    token: str = Depends(verify_token)
+):
+    """
+    Stream a whole table (website_analyses or conversations) as NDJSON or Parquet
+    """
+    if table not in BULK_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}")
+    
+    # Checked before streaming starts: afterwards a failure can only truncate the body
+    try:
+        since = parse_since(since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if export_format == "parquet":
+        if not parquet_available():
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow to be installed")
+        return StreamingResponse(
+            bulk_service.export_parquet(table, batch_size, since),
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": f'attachment; filename="{table}.parquet"'}
+        )
+    
+    return StreamingResponse(
+        bulk_service.export_ndjson(table, batch_size, since),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{table}.ndjson"'}
+    )
+
+
+@app.post(
+    "/api/import/{table}",
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid NDJSON line"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        404: {"model": ErrorResponse, "description": "Unknown table"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+@limiter.limit(f"{settings.rate_limit_per_minute}/minute")
+async def import_table(
+    request: Request,
+    table: str,
+    batch_size: Optional[int] = Query(None, ge=1, le=5000),
+    token: str = Depends(verify_token)
+):
+    """
+    Bulk upsert an NDJSON request body (as produced by /api/export) into a table
+    """
+    if table not in BULK_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}")
+    
+    try:
+        return await bulk_service.import_ndjson(table, request.stream(), batch_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Import failed: {str(e)}")
+    except Exception as e:
+        logger.error(f"Import error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Import failed: {str(e)}"
+        )
+
+
+def profile_download(profile_id: str, content: str, suffix: str) -> Response:
+    """Plain-text attachment named after the profile"""
+    return Response(
+        content=content,
+        media_type="text/plain; charset=utf-8",
+        headers={
+            "Content-Disposition": f'attachment; filename="profile-{profile_id}.{suffix}"',
+            "X-Profile-Id": profile_id
+        }
+    )
+
+
+def stored_profile(profile_id: str):
+    """A finished profile; 404 when profiling is off or it is unknown, 409 while it runs"""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if not profile.finished:
+        raise HTTPException(status_code=409, detail="Profile still running")
+    return profile
+
+
+@app.post(
+    "/api/profile",
+    responses={
+        200: {"description": "Folded stack samples of the whole worker (flame graph input)"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        404: {"model": ErrorResponse, "description": "Profiling disabled"}
+    }
+)
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0, description="How long to sample"),
+    token: str = Depends(verify_token)
+):
+    """
+    Profile the whole worker (every task and thread) for a number of seconds
+    """
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    profile = await profiler.capture(min(seconds, settings.profiling_max_seconds))
+    return profile_download(profile.id, profile.folded(), "folded")
+
+
+@app.get(
+    "/api/profiles/{profile_id}",
+    responses={
+        200: {"description": "Folded stack samples (flame graph input)"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        404: {"model": ErrorResponse, "description": "Profiling disabled or profile not found"},
+        409: {"model": ErrorResponse, "description": "Profile still running"}
+    }
+)
+async def get_profile(profile_id: str, token: str = Depends(verify_token)):
+    """
+    Download a profile's stack samples in the folded format
+    """
+    return profile_download(profile_id, stored_profile(profile_id).folded(), "folded")
+
+
+@app.get(
+    "/api/profiles/{profile_id}/allocations",
+    responses={
+        200: {"description": "Memory allocated during the profile, by source line"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        404: {"model": ErrorResponse, "description": "Profiling disabled or profile not found"},
+        409: {"model": ErrorResponse, "description": "Profile still running"}
+    }
+)
+async def get_profile_allocations(profile_id: str, token: str = Depends(verify_token)):
+    """
+    Download a profile's allocation snapshot diff (tracemalloc)
+    """
+    return profile_download(profile_id, stored_profile(profile_id).allocations_report(), "allocations.txt")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=settings.port)
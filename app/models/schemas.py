@@ -6,11 +6,22 @@ from datetime import datetime
 class AnalyzeRequest(BaseModel):
     url: HttpUrl
     questions: Optional[List[str]] = None
+    # Schema-constrained mode: default insights plus per-question answers in one call
+    structured: bool = False
+    # Also read high-value internal pages (about, contact, ...) linked from the homepage
+    crawl: bool = False
+    max_pages: Optional[int] = Field(default=None, ge=1, le=20)
+    # Re-analyze only the sections that changed since the stored version
+    incremental: bool = False
+    # Serve a stored analysis up to this many seconds old instead of re-analyzing
+    max_age: Optional[int] = Field(default=None, ge=0)
 
 
 class ChatRequest(BaseModel):
     url: HttpUrl
     query: str
+    # Conversation to continue; omit to start a new one (the new ID is returned)
+    session_id: Optional[str] = Field(None, min_length=1, max_length=128)
     conversation_history: Optional[List[Dict[str, str]]] = None
 
 
@@ -24,14 +35,75 @@ class BusinessInsights(BaseModel):
     contact_info: Optional[Dict[str, Any]] = None
 
 
+class QuestionAnswer(BaseModel):
+    question: str
+    answer: str
+
+
+class StructuredInsights(BusinessInsights):
+    """Schema-constrained model output: default insights plus answers to custom questions"""
+    answers: List[QuestionAnswer] = Field(default_factory=list)
+
+
+class StructuredAnalysis(BaseModel):
+    insights: BusinessInsights
+    answers: Dict[str, str] = Field(default_factory=dict)
+
+
 class AnalyzeResponse(BaseModel):
     url: str
     insights: BusinessInsights
+    answers: Optional[Dict[str, str]] = None
+    # Set for incremental requests: "full", "incremental" or "unchanged"
+    analysis_mode: Optional[str] = None
+    # Served from a stored analysis (max_age); stale ones are being refreshed in the background
+    cached: bool = False
+    stale: bool = False
+    # The model didn't finish within the deadline: insights hold only the
+    # contact info extracted from the page without it
+    partial: bool = False
+    analyzed_at: Optional[datetime] = None
+    timestamp: datetime
+
+
+class AnalysisSummary(BaseModel):
+    url: str
+    industry: Optional[str] = None
+    location: Optional[str] = None
+    company_size: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+
+class AnalysisListResponse(BaseModel):
+    items: List[AnalysisSummary]
+    # Pass back as `cursor` to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
+class StoredAnalysisResponse(BaseModel):
+    url: str
+    insights: BusinessInsights
+    # Stored structured answers to custom questions, keyed by question
+    answers: Optional[Dict[str, str]] = None
+    content_hash: Optional[str] = None
+    analyzed_at: Optional[datetime] = None
+
+
+class SimilarCompany(BaseModel):
+    url: str
+    # Cosine similarity of the insights embeddings, 1.0 = identical
+    score: float
+
+
+class SimilarResponse(BaseModel):
+    url: str
+    results: List[SimilarCompany]
     timestamp: datetime
 
 
 class ChatResponse(BaseModel):
     response: str
+    session_id: Optional[str] = None
     timestamp: datetime
 
 
@@ -0,0 +1,164 @@
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.models.schemas import BusinessInsights
+from app.services.content_diff import diff_sections
+from app.services.llm import llm_service
+from app.services.prompt_builder import Section
+
+logger = logging.getLogger(__name__)
+
+# How insights were produced for a re-scraped page
+MODE_FULL = "full"
+MODE_INCREMENTAL = "incremental"
+MODE_UNCHANGED = "unchanged"
+
+# Contact details that can be found without the model
+_EMAIL = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+_PHONE = re.compile(r"(?<![\w.])\+?\(?\d[\d\s().-]{6,}\d(?!\w)")
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_SOCIAL = re.compile(
+    r"https?://(?:www\.)?(?:linkedin\.com|twitter\.com|x\.com|facebook\.com|instagram\.com|"
+    r"youtube\.com|github\.com)/[^\s)\]>\"']+"
+)
+_IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")
+_MAX_CONTACTS = 10
+
+
+def reusable_insights(record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Default insights from a stored analysis, or None if the record holds none
+    (never analyzed, custom-question answers, or an unparsed model response)
+    """
+    insights = (record or {}).get("insights")
+    if not isinstance(insights, dict) or "raw_analysis" in insights or "custom_answers" in insights:
+        return None
+    # Question answers belong to the old content
+    return {key: value for key, value in insights.items() if key != "answers"}
+
+
+# Columns needed to answer /api/analyze from a stored analysis
+STORED_RESULT_COLUMNS = "url, insights, updated_at"
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse a Supabase timestamp; naive values are taken as UTC
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def analysis_age(record: Optional[Dict[str, Any]]) -> Optional[float]:
+    """
+    Seconds since a stored analysis was last updated
+    """
+    updated_at = parse_timestamp((record or {}).get("updated_at"))
+    if updated_at is None:
+        return None
+    return max((datetime.now(timezone.utc) - updated_at).total_seconds(), 0.0)
+
+
+def stored_result(
+    record: Optional[Dict[str, Any]],
+    questions: Optional[List[str]] = None,
+    structured: bool = False
+) -> Optional[Tuple[BusinessInsights, Optional[Dict[str, str]]]]:
+    """
+    (insights, answers) for a request from a stored analysis, or None if the
+    stored analysis can't answer it. Free-text custom answers are never reused
+    since they don't record which questions they answer.
+    """
+    insights = reusable_insights(record)
+    if insights is None:
+        return None
+    if not questions:
+        return BusinessInsights(**insights), None
+    if not structured:
+        return None
+    stored_answers = record["insights"].get("answers") or {}
+    if not all(question in stored_answers for question in questions):
+        return None
+    return BusinessInsights(**insights), {question: stored_answers[question] for question in questions}
+
+
+def _unique(values: List[str]) -> List[str]:
+    return list(dict.fromkeys(values))[:_MAX_CONTACTS]
+
+
+def extract_contact_info(content: str) -> Dict[str, List[str]]:
+    """
+    Emails, phone numbers and social media links found in the content by
+    pattern matching, in the shape the model returns them
+    """
+    emails = [
+        email.rstrip(".") for email in _EMAIL.findall(content)
+        if not email.lower().endswith(_IMAGE_SUFFIXES)
+    ]
+    phones = [
+        phone.strip() for phone in _PHONE.findall(content)
+        if 7 <= sum(ch.isdigit() for ch in phone) <= 15 and not _DATE.search(phone)
+    ]
+    return {
+        "emails": _unique(emails),
+        "phones": _unique(phones),
+        "social_media": _unique(link.rstrip(".,") for link in _SOCIAL.findall(content))
+    }
+
+
+class WebsiteAnalyzer:
+    """
+    Re-analyzes a page by diffing its sections against the stored version:
+    unchanged pages reuse their insights, small changes are merged into the
+    existing insights, and large changes trigger a full analysis.
+    """
+
+    def __init__(self, full_rerun_ratio: float):
+        self.full_rerun_ratio = full_rerun_ratio
+
+    async def extract_insights(
+        self,
+        content: str,
+        sections: List[Section],
+        previous: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Return (insights, mode) for content, reusing previous work where possible
+        """
+        previous_insights = reusable_insights(previous)
+        if previous_insights is not None:
+            old_sections = [Section.from_dict(s) for s in previous.get("sections") or []]
+            diff = diff_sections(old_sections, sections)
+
+            if not diff.changed:
+                return previous_insights, MODE_UNCHANGED
+
+            if old_sections and diff.change_ratio <= self.full_rerun_ratio:
+                logger.info(
+                    f"Incremental analysis: {len(diff.added)} changed sections "
+                    f"({diff.change_ratio:.0%} of content)"
+                )
+                try:
+                    insights = await llm_service.update_business_insights(
+                        previous_insights,
+                        changed_content="\n\n".join(s.text(content).strip() for s in diff.added),
+                        removed_titles=[s.title for s in diff.removed]
+                    )
+                    return insights, MODE_INCREMENTAL
+                except Exception as e:
+                    logger.warning(f"Incremental analysis failed, running full analysis: {str(e)}")
+
+        insights = await llm_service.extract_business_insights(content=content, sections=sections)
+        return insights, MODE_FULL
+
+
+# Global website analyzer instance
+website_analyzer = WebsiteAnalyzer(settings.incremental_full_rerun_ratio)
@@ -0,0 +1,122 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.embeddings import embedder
+from app.utils.cache import TTLCache
+
+_WHITESPACE = re.compile(r"\s+")
+# Words that point back into the conversation ("what about pricing?", "tell me more about it")
+_FOLLOW_UP = re.compile(
+    r"\b(it|its|that|this|these|those|them|he|she|his|her|more|else|above|previous|earlier|again|also|same|"
+    r"other|another)\b|^(and|but|so|what about|how about)\b"
+)
+# The embedder drops these as stopwords, but they flip a question's meaning
+_NEGATION = re.compile(r"\b(not|no|never|without)\b|n't\b")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for cache lookups (case, whitespace, trailing punctuation)
+    """
+    return _WHITESPACE.sub(" ", question.strip().lower()).rstrip(" ?!.")
+
+
+def history_independent(query: str, conversation_history: Optional[List[Dict[str, str]]] = None) -> bool:
+    """
+    Whether the answer to query doesn't depend on the conversation so far:
+    any question opening a conversation, or one that doesn't refer back to it
+    """
+    return not conversation_history or not _FOLLOW_UP.search(normalize_question(query))
+
+
+@dataclass
+class _SiteAnswers:
+    """Cached answers for one version (content hash) of a site"""
+    digest: str
+    # normalized query -> (answer, query embedding)
+    answers: TTLCache
+
+
+class ChatAnswerCache:
+    """
+    Answers to history-independent chat questions, per site and content
+    version: a re-scraped page with different content gets a fresh set. A
+    question is answered from the cache when its normalized text was asked
+    before or, with a similarity threshold, when a near-identical question was
+    (cosine similarity of local embeddings over the site's cached questions).
+    """
+
+    def __init__(self, max_sites: int, per_site: int, ttl_seconds: float, similarity_threshold: float):
+        self.per_site = per_site
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._sites = TTLCache(max_entries=max_sites)
+        self.stats: Dict[str, int] = {"hits": 0, "near_hits": 0, "misses": 0, "invalidations": 0}
+
+    def _embed(self, normalized: str) -> Optional[np.ndarray]:
+        if not self.similarity_threshold:
+            return None
+        vector = embedder.embed_fields({normalized: 1.0})
+        return vector if vector.any() else None
+
+    def get(self, url: str, digest: str, query: str) -> Optional[str]:
+        site = self._sites.get(url)
+        if site is None or site.digest != digest:
+            self.stats["misses"] += 1
+            return None
+        normalized = normalize_question(query)
+        entry = site.answers.get(normalized)
+        if entry is not None:
+            self.stats["hits"] += 1
+            return entry[0]
+
+        vector = self._embed(normalized)
+        if vector is not None:
+            negated = bool(_NEGATION.search(normalized))
+            best, best_score = None, self.similarity_threshold
+            for key in site.answers.keys():
+                candidate = site.answers.get(key)
+                if candidate is None or candidate[1] is None or bool(_NEGATION.search(key)) != negated:
+                    continue
+                score = float(np.dot(vector, candidate[1]))
+                if score >= best_score:
+                    best, best_score = candidate[0], score
+            if best is not None:
+                self.stats["near_hits"] += 1
+                return best
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, url: str, digest: str, query: str, answer: str) -> None:
+        if not answer or not answer.strip():
+            return
+        site = self._sites.get(url)
+        if site is None or site.digest != digest:
+            site = _SiteAnswers(digest, TTLCache(max_entries=self.per_site, ttl_seconds=self.ttl_seconds))
+            self._sites.set(url, site)
+        normalized = normalize_question(query)
+        site.answers.set(normalized, (answer, self._embed(normalized)))
+
+    def invalidate(self, url: str) -> None:
+        """Drop a site's answers, e.g. once its analysis is refreshed"""
+        if self._sites.pop(url) is not None:
+            self.stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        self._sites.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"sites": len(self._sites), **self.stats}
+
+
+# Global chat answer cache instance
+chat_answer_cache = ChatAnswerCache(
+    max_sites=settings.chat_answer_cache_max_sites,
+    per_site=settings.chat_answer_cache_per_site,
+    ttl_seconds=settings.chat_answer_cache_ttl_seconds,
+    similarity_threshold=settings.chat_answer_similarity_threshold
+)
@@ -0,0 +1,257 @@
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.config import settings
+from app.services.analyzer import parse_timestamp
+from app.services.database import db_service
+
+logger = logging.getLogger(__name__)
+
+# Keyset cursor start for "since" exports: sorts before every UUID
+_NIL_UUID = "00000000-0000-0000-0000-000000000000"
+
+
+@dataclass
+class TableSpec:
+    """Export/import layout of one table"""
+    key_column: str          # keyset pagination runs over (key_column, id)
+    conflict_column: str     # imports update the existing row on this column
+    columns: Dict[str, str]  # column -> "string" | "int" | "timestamp" | "json"
+
+
+TABLES: Dict[str, TableSpec] = {
+    "website_analyses": TableSpec(
+        key_column="updated_at",
+        conflict_column="url",
+        columns={
+            "id": "string",
+            "url": "string",
+            "raw_content": "string",
+            "insights": "json",
+            "token_count": "int",
+            "sections": "json",
+            "content_hash": "string",
+            "embedding": "json",
+            "created_at": "timestamp",
+            "updated_at": "timestamp",
+        },
+    ),
+    "conversations": TableSpec(
+        key_column="created_at",
+        conflict_column="id",
+        columns={
+            "id": "string",
+            "url": "string",
+            "session_id": "string",
+            "query": "string",
+            "response": "string",
+            "created_at": "timestamp",
+        },
+    ),
+}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class _ChunkSink:
+    """Write-only file object whose contents are drained after each Parquet row group"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_schema(spec: TableSpec):
+    import pyarrow as pa
+
+    types = {
+        "string": pa.string(),
+        "int": pa.int64(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "json": pa.string(),
+    }
+    return pa.schema([(column, types[kind]) for column, kind in spec.columns.items()])
+
+
+def _arrow_row(spec: TableSpec, row: Dict[str, Any]) -> Dict[str, Any]:
+    converted = {}
+    for column, kind in spec.columns.items():
+        value = row.get(column)
+        if value is not None and kind == "json":
+            value = json.dumps(value)
+        elif kind == "timestamp":
+            value = parse_timestamp(value)
+        converted[column] = value
+    return converted
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without buffering more than one line"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def parse_since(since: Optional[str]) -> Optional[str]:
+    """
+    Validate an export's since timestamp, re-serialized for the keyset filter;
+    raises ValueError when it isn't an ISO timestamp
+    """
+    if not since:
+        return None
+    parsed = parse_timestamp(since)
+    if parsed is None:
+        raise ValueError(f"Invalid since timestamp: {since}")
+    return parsed.isoformat()
+
+
+class BulkTransferService:
+    """
+    Streams whole tables out (NDJSON or Parquet) and back in, in bounded batches.
+    Exports page through the table by keyset over (key_column, id), so memory
+    stays constant and rows inserted during an export are not skipped. Analyses
+    are keyed on updated_at, so one updated mid-export moves past the cursor and
+    can be emitted twice; consumers should upsert on url.
+    """
+
+    async def iter_batches(
+        self,
+        table: str,
+        batch_size: Optional[int] = None,
+        since: Optional[str] = None,
+        columns: Optional[List[str]] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield the table in batches ordered by (key_column, id), optionally only
+        rows whose key_column is at or after since (ISO timestamp; ValueError
+        otherwise). columns defaults to the table's export columns and must include the key columns.
+        """
+        spec = TABLES[table]
+        batch_size = batch_size or settings.bulk_batch_size
+        since = parse_since(since)
+        after = (since, _NIL_UUID) if since else None
+        while True:
+            rows = await db_service.get_rows_after(
+                table, spec.key_column, after, batch_size, columns=",".join(columns or spec.columns)
+            )
+            if rows:
+                yield rows
+            if len(rows) < batch_size or rows[-1].get(spec.key_column) is None:
+                return
+            after = (rows[-1][spec.key_column], rows[-1]["id"])
+
+    async def export_ndjson(
+        self,
+        table: str,
+        batch_size: Optional[int] = None,
+        since: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream the table as newline-delimited JSON, one chunk per batch
+        """
+        async for rows in self.iter_batches(table, batch_size, since):
+            yield "".join(json.dumps(row, default=str) + "\n" for row in rows).encode("utf-8")
+
+    async def export_parquet(
+        self,
+        table: str,
+        batch_size: Optional[int] = None,
+        since: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream the table as a Parquet file, one row group per batch.
+        JSON columns are stored as JSON strings. Requires pyarrow.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        spec = TABLES[table]
+        schema = _arrow_schema(spec)
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        try:
+            async for rows in self.iter_batches(table, batch_size, since):
+                writer.write_table(pa.Table.from_pylist([_arrow_row(spec, row) for row in rows], schema=schema))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    async def import_ndjson(
+        self,
+        table: str,
+        chunks: AsyncIterator[bytes],
+        batch_size: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Upsert NDJSON rows (e.g. from export_ndjson) in batches.
+        Unknown columns are ignored; invalid lines raise ValueError with the line number.
+        """
+        spec = TABLES[table]
+        batch_size = batch_size or settings.bulk_batch_size
+        imported = batches = line_number = 0
+        batch: List[Dict[str, Any]] = []
+
+        async def flush():
+            nonlocal imported, batches, batch
+            imported += await db_service.upsert_rows(table, batch, on_conflict=spec.conflict_column)
+            batches += 1
+            batch = []
+
+        async for line in _iter_lines(chunks):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {line_number}: invalid JSON ({str(e)}); {imported} rows imported")
+            if not isinstance(row, dict) or not row.get(spec.conflict_column):
+                raise ValueError(
+                    f"Line {line_number}: expected an object with '{spec.conflict_column}'; "
+                    f"{imported} rows imported"
+                )
+            batch.append({column: row[column] for column in spec.columns if column in row})
+            if len(batch) >= batch_size:
+                await flush()
+
+        if batch:
+            await flush()
+        return {"imported": imported, "batches": batches}
+
+
+# Global bulk transfer service instance
+bulk_service = BulkTransferService()
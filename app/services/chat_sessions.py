@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import settings
+from app.services.database import db_service
+from app.services.prompt_builder import Section
+from app.services.write_behind import write_behind
+
+logger = logging.getLogger(__name__)
+
+
+async def load_site(url: str) -> Optional[Dict[str, Any]]:
+    """
+    A site's stored analysis, plus writes still queued for it; None if it
+    was never analyzed
+    """
+    # The queue is read first: a write flushed in between is then seen twice, not missed
+    queued = write_behind.pending_row("website_analyses", "url", url)
+    website_data = await db_service.get_website_analysis(url)
+    if queued:
+        website_data = {**(website_data or {}), **queued}
+    return website_data or None
+
+
+async def load_history(url: str, session_id: str) -> List[Dict[str, Any]]:
+    """
+    A session's most recent turns, oldest first, including turns acknowledged
+    but not written yet
+    """
+    # Newest first, like the database query
+    queued_turns = write_behind.pending_rows("conversations", session_id=session_id, url=url)[::-1]
+    history = await db_service.get_conversation_history(
+        url=url,
+        limit=settings.chat_history_turns,
+        session_id=session_id
+    )
+    if queued_turns:
+        queued_ids = {turn["id"] for turn in queued_turns}
+        history = (queued_turns + [
+            turn for turn in history if turn.get("id") not in queued_ids
+        ])[:settings.chat_history_turns]
+    history.reverse()
+    return history
+
+
+def _turn_bytes(turn: Dict[str, Any]) -> int:
+    return len((turn.get("query") or "").encode("utf-8")) + len((turn.get("response") or "").encode("utf-8"))
+
+
+class SessionsFull(Exception):
+    """No room for another session (session count or memory cap reached)"""
+
+
+class SiteContext:
+    """A site's content held in memory, shared by all open sessions about it"""
+
+    def __init__(self, url: str, content: str, sections: Optional[List[Section]] = None):
+        self.url = url
+        self.content = content
+        self.sections = sections
+        self.size = len(content.encode("utf-8"))
+        self.sessions = 0
+        # Set once the site is re-analyzed; sessions reload it before their next question
+        self.stale = False
+
+
+class ChatSession:
+    """One connection's conversation: its site and the turns so far"""
+
+    def __init__(self, session_id: str, site: SiteContext, history: List[Dict[str, Any]]):
+        self.session_id = session_id
+        self.site = site
+        self.history: List[Dict[str, Any]] = []
+        self.history_bytes = 0
+        self._writes: Set[asyncio.Task] = set()
+        for turn in history:
+            self.add_turn(turn.get("query") or "", turn.get("response") or "")
+
+    def add_turn(self, query: str, response: str):
+        """Append a turn, keeping the history within the configured turns and bytes"""
+        turn = {"query": query, "response": response}
+        self.history.append(turn)
+        self.history_bytes += _turn_bytes(turn)
+        while self.history and (
+            len(self.history) > settings.chat_history_turns or self.history_bytes > settings.chat_history_max_bytes
+        ):
+            self.history_bytes -= _turn_bytes(self.history.pop(0))
+
+    def persist(self, query: str, response: str):
+        """Store a turn in the background; the connection doesn't wait for the write"""
+        task = asyncio.create_task(self._store(query, response))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _store(self, query: str, response: str):
+        try:
+            await write_behind.store_conversation(
+                url=self.site.url, query=query, response=response, session_id=self.session_id
+            )
+        except Exception as e:
+            logger.error(f"Failed to store chat turn for session {self.session_id}: {str(e)}")
+
+    async def flush(self):
+        """Wait for turns still being stored"""
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+
+class ChatSessionStore:
+    """
+    Open WebSocket chat sessions. A session loads its site's content and its
+    history once, when it opens, instead of on every question; the content is
+    shared by every session about the same site. New sessions are refused
+    once max_sessions are open or the content and histories held would
+    exceed max_bytes.
+    """
+
+    def __init__(self, max_sessions: int, max_bytes: int):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sites: Dict[str, SiteContext] = {}
+        self._sessions: Set[ChatSession] = set()
+        self.stats: Dict[str, int] = {"opened": 0, "rejected": 0, "reloads": 0}
+
+    @property
+    def used_bytes(self) -> int:
+        sites = {id(session.site): session.site.size for session in self._sessions}
+        return sum(sites.values()) + sum(session.history_bytes for session in self._sessions)
+
+    async def _site(self, url: str) -> Optional[SiteContext]:
+        site = self._sites.get(url)
+        if site is not None:
+            return site
+        website_data = await load_site(url)
+        if website_data is None:
+            return None
+        # Another session may have loaded it meanwhile
+        site = self._sites.get(url)
+        if site is None:
+            site = SiteContext(
+                url,
+                website_data["raw_content"],
+                [Section.from_dict(s) for s in website_data.get("sections") or []] or None
+            )
+        return site
+
+    def _check_room(self, site: SiteContext, history_bytes: int = 0):
+        if len(self._sessions) >= self.max_sessions:
+            self.stats["rejected"] += 1
+            raise SessionsFull(f"{self.max_sessions} chat sessions open")
+        added = history_bytes + (0 if self._sites.get(site.url) is site else site.size)
+        if self.used_bytes + added > self.max_bytes:
+            self.stats["rejected"] += 1
+            raise SessionsFull("chat session memory limit reached")
+
+    def _attach(self, site: SiteContext):
+        self._sites[site.url] = site
+        site.sessions += 1
+
+    def _detach(self, site: SiteContext):
+        site.sessions -= 1
+        if site.sessions <= 0 and self._sites.get(site.url) is site:
+            del self._sites[site.url]
+
+    async def open(self, url: str, session_id: Optional[str] = None) -> Optional[ChatSession]:
+        """
+        Open a session about url, resuming session_id's history if given; None
+        if the site was never analyzed. Raises SessionsFull when there's no room.
+        """
+        # Cheap check first, so a full server doesn't read the database
+        if len(self._sessions) >= self.max_sessions:
+            self.stats["rejected"] += 1
+            raise SessionsFull(f"{self.max_sessions} chat sessions open")
+        site = await self._site(url)
+        if site is None:
+            return None
+        history = await load_history(url, session_id) if session_id else []
+        session = ChatSession(session_id or str(uuid.uuid4()), site, history)
+        self._check_room(site, session.history_bytes)
+        self._attach(site)
+        self._sessions.add(session)
+        self.stats["opened"] += 1
+        return session
+
+    async def refresh(self, session: ChatSession) -> bool:
+        """Reload a session's site if it was re-analyzed since; False if it is gone"""
+        if not session.site.stale:
+            return True
+        site = await self._site(session.site.url)
+        if site is None:
+            return False
+        self._detach(session.site)
+        session.site = site
+        self._attach(site)
+        self.stats["reloads"] += 1
+        return True
+
+    def close(self, session: ChatSession):
+        if session in self._sessions:
+            self._sessions.discard(session)
+            self._detach(session.site)
+
+    def invalidate(self, url: str):
+        """Mark a site's held content out of date, e.g. once it is re-analyzed"""
+        site = self._sites.pop(url, None)
+        if site is not None:
+            site.stale = True
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "sites": len(self._sites),
+            "bytes": self.used_bytes,
+            **self.stats
+        }
+
+
+# Global chat session store instance
+chat_sessions = ChatSessionStore(
+    max_sessions=settings.ws_max_sessions,
+    max_bytes=settings.ws_sessions_max_bytes
+)
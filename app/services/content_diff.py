@@ -0,0 +1,48 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List
+
+from app.services.prompt_builder import Section
+
+
+@dataclass
+class SectionDiff:
+    """Section-level difference between two versions of a page"""
+    added: List[Section] = field(default_factory=list)    # new or changed, offsets into the new content
+    removed: List[Section] = field(default_factory=list)  # gone or changed, offsets into the old content
+    unchanged: int = 0
+    change_ratio: float = 0.0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.removed)
+
+
+def diff_sections(old: List[Section], new: List[Section]) -> SectionDiff:
+    """
+    Match sections of two page versions by content hash. A section that moved is
+    unchanged; an edited section shows up as removed (old text) plus added (new text).
+    change_ratio is the share of tokens, across both versions, in unmatched sections.
+    Sections stored without a hash never match, so they count as fully changed.
+    """
+    available = Counter(section.hash for section in old if section.hash)
+    diff = SectionDiff()
+
+    for section in new:
+        if section.hash and available[section.hash] > 0:
+            available[section.hash] -= 1
+            diff.unchanged += 1
+        else:
+            diff.added.append(section)
+
+    for section in old:
+        if section.hash and available[section.hash] > 0:
+            available[section.hash] -= 1
+            diff.removed.append(section)
+        elif not section.hash:
+            diff.removed.append(section)
+
+    changed_tokens = sum(s.tokens for s in diff.added) + sum(s.tokens for s in diff.removed)
+    total_tokens = sum(s.tokens for s in old) + sum(s.tokens for s in new)
+    diff.change_ratio = changed_tokens / total_tokens if total_tokens else 0.0
+    return diff
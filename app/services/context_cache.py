@@ -0,0 +1,235 @@
+import asyncio
+import datetime
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.utils.cache import TTLCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedContextHandle:
+    """A provider-side cached prompt prefix for one version of a site's content"""
+    name: str
+    url: str
+    content_hash: str
+    model_name: str
+    expires_at: float  # wall-clock seconds
+    resource: Any = None
+    model: Any = None
+    uses: int = field(default=0)
+
+    def remaining(self, now: Optional[float] = None) -> float:
+        return self.expires_at - (time.time() if now is None else now)
+
+
+class GeminiContextCacheBackend:
+    """
+    Context cache backed by Gemini cached content (``genai.caching.CachedContent``)
+    """
+
+    def create(self, model_name: str, system_instruction: str, content: str, ttl_seconds: int) -> CachedContextHandle:
+        import google.generativeai as genai
+
+        cached = genai.caching.CachedContent.create(
+            model=model_name,
+            system_instruction=system_instruction,
+            contents=[content],
+            ttl=datetime.timedelta(seconds=ttl_seconds),
+        )
+        return CachedContextHandle(
+            name=cached.name,
+            url="",
+            content_hash="",
+            model_name=model_name,
+            expires_at=cached.expire_time.timestamp(),
+            resource=cached,
+            model=genai.GenerativeModel.from_cached_content(cached),
+        )
+
+    def extend(self, handle: CachedContextHandle, ttl_seconds: int) -> None:
+        handle.resource.update(ttl=datetime.timedelta(seconds=ttl_seconds))
+        handle.expires_at = handle.resource.expire_time.timestamp()
+
+    def delete(self, handle: CachedContextHandle) -> None:
+        handle.resource.delete()
+
+
+class _LocalCachedModel:
+    """Prepends the cached prefix locally, mimicking a model bound to cached content"""
+
+    def __init__(self, base_model, prefix: str):
+        self._base_model = base_model
+        self._prefix = prefix
+
+    def generate_content(self, prompt, **kwargs):
+        return self._base_model.generate_content(f"{self._prefix}\n\n{prompt}", **kwargs)
+
+
+class LocalContextCacheBackend:
+    """
+    In-process stand-in for provider-side caching, used in tests and local development.
+    Tracks created/deleted handles so callers can assert on cache behaviour.
+    """
+
+    def __init__(self, base_model=None):
+        self.base_model = base_model
+        self.entries: Dict[str, str] = {}
+        self.created = 0
+        self.deleted = 0
+        self.extended = 0
+
+    def create(self, model_name: str, system_instruction: str, content: str, ttl_seconds: int) -> CachedContextHandle:
+        name = f"cachedContents/local-{uuid.uuid4().hex[:12]}"
+        prefix = f"{system_instruction}\n\n{content}"
+        self.entries[name] = prefix
+        self.created += 1
+        return CachedContextHandle(
+            name=name,
+            url="",
+            content_hash="",
+            model_name=model_name,
+            expires_at=time.time() + ttl_seconds,
+            model=_LocalCachedModel(self.base_model, prefix),
+        )
+
+    def extend(self, handle: CachedContextHandle, ttl_seconds: int) -> None:
+        if handle.name not in self.entries:
+            raise KeyError(handle.name)
+        handle.expires_at = time.time() + ttl_seconds
+        self.extended += 1
+
+    def delete(self, handle: CachedContextHandle) -> None:
+        if self.entries.pop(handle.name, None) is not None:
+            self.deleted += 1
+
+
+class ContextCache:
+    """
+    Keeps one cached-context handle per URL, keyed by the hash of its content.
+
+    Handles are recreated when they expire or the content changes, and their TTL
+    is extended while a conversation keeps using them. Content too small to be
+    worth caching, and sites whose cache creation failed recently, fall back to
+    regular prompts (``get_model`` returns None).
+    """
+
+    def __init__(
+        self,
+        backend,
+        ttl_seconds: int = 3600,
+        refresh_margin_seconds: int = 300,
+        min_content_chars: int = 4096,
+        max_entries: int = 256,
+        failure_backoff_seconds: int = 300
+    ):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.min_content_chars = min_content_chars
+        self.failure_backoff_seconds = failure_backoff_seconds
+        # Evicted handles are not deleted remotely; they simply expire with their TTL
+        self._handles = TTLCache(max_entries=max_entries)
+        self._failures = TTLCache(max_entries=max_entries, ttl_seconds=failure_backoff_seconds)
+        # Per-URL creation locks with their number of holders and waiters; dropped
+        # when idle, so only URLs being chatted about right now have one
+        self._locks: Dict[str, List] = {}
+
+    @asynccontextmanager
+    async def _url_lock(self, url: str):
+        entry = self._locks.get(url)
+        if entry is None:
+            entry = self._locks[url] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[url]
+
+    async def get_model(self, url: str, content: str, model_name: str, system_instruction: str):
+        """
+        Return a model bound to cached content for this URL/content, creating or
+        refreshing the cache entry as needed
+        """
+        if len(content) < self.min_content_chars:
+            return None
+
+        digest = content_hash(content)
+        if self._failures.get((url, digest)):
+            return None
+
+        async with self._url_lock(url):
+            handle: Optional[CachedContextHandle] = self._handles.get(url)
+
+            if handle and (handle.content_hash != digest or handle.model_name != model_name):
+                await self._delete(handle)
+                handle = None
+
+            if handle and handle.remaining() <= 0:
+                logger.info(f"Context cache expired for {url}, recreating")
+                self._handles.pop(url)
+                handle = None
+
+            if handle and handle.remaining() < self.refresh_margin_seconds:
+                try:
+                    await asyncio.to_thread(self.backend.extend, handle, self.ttl_seconds)
+                except Exception as e:
+                    logger.warning(f"Context cache refresh failed for {url}: {str(e)}")
+                    self._handles.pop(url)
+                    handle = None
+
+            if handle is None:
+                try:
+                    handle = await asyncio.to_thread(
+                        self.backend.create, model_name, system_instruction, content, self.ttl_seconds
+                    )
+                except Exception as e:
+                    logger.warning(f"Context cache creation failed for {url}: {str(e)}")
+                    self._failures.set((url, digest), True)
+                    return None
+                handle.url = url
+                handle.content_hash = digest
+                self._handles.set(url, handle)
+
+            handle.uses += 1
+            return handle.model
+
+    async def invalidate(self, url: str) -> None:
+        """Drop the cached context for a URL (e.g. after re-analysis or a failed call)"""
+        handle = self._handles.pop(url)
+        if handle:
+            await self._delete(handle)
+
+    async def _delete(self, handle: CachedContextHandle) -> None:
+        try:
+            await asyncio.to_thread(self.backend.delete, handle)
+        except Exception as e:
+            # The entry expires on its own; deletion only frees storage early
+            logger.debug(f"Context cache delete failed for {handle.url}: {str(e)}")
+
+
+def create_context_cache(base_model=None) -> Optional[ContextCache]:
+    """
+    Build the context cache configured in settings, or None when disabled
+    """
+    if not settings.context_cache_enabled:
+        return None
+    if settings.context_cache_backend == "local":
+        backend = LocalContextCacheBackend(base_model)
+    else:
+        backend = GeminiContextCacheBackend()
+    return ContextCache(
+        backend,
+        ttl_seconds=settings.context_cache_ttl_seconds,
+        refresh_margin_seconds=settings.context_cache_refresh_margin_seconds,
+        min_content_chars=settings.context_cache_min_chars,
+    )
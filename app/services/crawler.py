@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+from urllib.parse import urldefrag, urljoin, urlparse
+
+from app.config import settings
+from app.services.offload import content_offload
+from app.services.scraper import ScraperService, scraper_service
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+_MARKDOWN_LINK = re.compile(r"\[([^\]]*)\]\(\s*<?([^)\s>]+)>?(?:\s+\"[^\"]*\")?\s*\)")
+_BARE_URL = re.compile(r"https?://[^\s)\]>\"']+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Path/anchor keywords of internal pages that usually hold location, size and contact details
+HIGH_VALUE_KEYWORDS: Dict[str, float] = {
+    "contact": 10.0,
+    "about": 9.0,
+    "impressum": 8.0,
+    "imprint": 8.0,
+    "company": 7.0,
+    "team": 6.0,
+    "locations": 6.0,
+    "offices": 6.0,
+    "careers": 5.0,
+    "jobs": 4.0,
+    "pricing": 5.0,
+    "products": 5.0,
+    "services": 5.0,
+    "solutions": 4.0,
+    "customers": 3.0,
+    "legal": 2.0,
+}
+
+# Header marking each page in merged crawl output
+PAGE_HEADER = "## Page: "
+
+_SKIP_EXTENSIONS = (
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".pdf", ".zip",
+    ".css", ".js", ".xml", ".json", ".mp4", ".mp3", ".woff", ".woff2",
+)
+
+
+def _host(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def discover_links(content: str, base_url: str) -> List[Tuple[str, float]]:
+    """
+    Find same-site links in Jina markdown and score them by how likely they are
+    to hold business details. Returns (url, score) pairs, best first.
+    """
+    base_host = _host(base_url)
+    base_clean = urldefrag(base_url)[0].rstrip("/")
+    scores: Dict[str, float] = {}
+
+    candidates = [(m.group(2), m.group(1)) for m in _MARKDOWN_LINK.finditer(content)]
+    candidates += [(m.group(0), "") for m in _BARE_URL.finditer(content)]
+
+    for href, anchor in candidates:
+        if href.startswith(("mailto:", "tel:", "javascript:", "#")):
+            continue
+        url = urldefrag(urljoin(base_url, href))[0]
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or _host(url) != base_host:
+            continue
+        path = parsed.path.lower()
+        if path.endswith(_SKIP_EXTENSIONS) or url.rstrip("/") == base_clean:
+            continue
+
+        words = set(_WORD.findall(path)) | set(_WORD.findall(anchor.lower()))
+        score = sum(weight for keyword, weight in HIGH_VALUE_KEYWORDS.items() if keyword in words)
+        if score <= 0:
+            continue
+        # Shallow pages are usually the canonical ones (/about vs /blog/about-our-new-office)
+        score -= 0.5 * max(path.strip("/").count("/"), 0)
+        scores[url] = max(scores.get(url, 0.0), score)
+
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def is_crawled_content(content: str) -> bool:
+    """Whether stored content came from a multi-page crawl"""
+    return f"\n{PAGE_HEADER}" in content
+
+
+def _shingles(text: str, size: int = 5, limit: int = 3000) -> Set[int]:
+    words = _WORD.findall(text.lower())[:limit]
+    return {hash(tuple(words[i:i + size])) for i in range(max(len(words) - size + 1, 1))}
+
+
+def similarity(a: Set[int], b: Set[int]) -> float:
+    """Jaccard similarity of two shingle sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class HostThrottle:
+    """
+    Per-host politeness: bounded concurrency plus a minimum delay between request starts
+    """
+
+    def __init__(self, concurrency: int, delay_seconds: float):
+        self.concurrency = concurrency
+        self.delay_seconds = delay_seconds
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._last_start: Dict[str, float] = {}
+
+    async def acquire(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.concurrency))
+        await semaphore.acquire()
+        async with self._locks.setdefault(host, asyncio.Lock()):
+            wait = self._last_start.get(host, 0.0) + self.delay_seconds - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_start[host] = time.monotonic()
+        return semaphore
+
+
+class SiteCrawler:
+    """
+    Crawls a homepage plus its highest-value internal pages (about, contact, ...)
+    and merges them into a single analysis input under a size budget.
+    """
+
+    def __init__(self, scraper: ScraperService):
+        self.scraper = scraper
+
+    async def crawl_website(self, url: str, max_pages: Optional[int] = None) -> str:
+        """
+        Crawl the site starting at url and return enhanced, merged content
+        """
+        max_pages = max_pages or settings.crawl_max_pages
+        throttle = HostThrottle(settings.crawl_per_host_concurrency, settings.crawl_politeness_delay_seconds)
+        import httpx
+
+        try:
+            async with httpx.AsyncClient(timeout=60.0) as client:
+                homepage = await self._fetch(client, throttle, url)
+
+                # Bounded frontier: only the best-scoring links for this host are queued
+                frontier = [link for link, _ in discover_links(homepage, url)][:max(max_pages - 1, 0)]
+                results = await asyncio.gather(
+                    *(self._fetch(client, throttle, link) for link in frontier),
+                    return_exceptions=True
+                )
+        except httpx.TimeoutException:
+            raise Exception("Timeout while scraping website (comprehensive extraction may take longer)")
+        except httpx.HTTPStatusError as e:
+            raise Exception(f"HTTP error while scraping: {e.response.status_code}")
+        except Exception as e:
+            raise Exception(f"Scraping error: {str(e)}")
+
+        pages = [(url, homepage)]
+        for link, result in zip(frontier, results):
+            if isinstance(result, Exception):
+                logger.info(f"Skipping {link} during crawl: {str(result)}")
+                continue
+            pages.append((link, result))
+
+        return await content_offload.run(
+            self._build_content, pages, url, size=sum(len(content) for _, content in pages)
+        )
+
+    def _build_content(self, pages: List[Tuple[str, str]], url: str) -> str:
+        """Deduplicate, merge and enhance crawled pages (in an offload worker for large crawls)"""
+        merged = self._merge(self._deduplicate(pages), settings.crawl_max_chars)
+        return self.scraper._enhance_content_extraction(merged, url)
+
+    async def _fetch(self, client: "httpx.AsyncClient", throttle: HostThrottle, url: str) -> str:
+        semaphore = await throttle.acquire(_host(url))
+        try:
+            return await self.scraper.fetch_page(client, url)
+        finally:
+            semaphore.release()
+
+    def _deduplicate(self, pages: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Drop pages that are near-identical to an earlier (higher-priority) page"""
+        kept: List[Tuple[str, str, Set[int]]] = []
+        for page_url, content in pages:
+            fingerprint = _shingles(content)
+            duplicate_of = next(
+                (kept_url for kept_url, _, other in kept
+                 if similarity(fingerprint, other) >= settings.crawl_duplicate_threshold),
+                None
+            )
+            if duplicate_of:
+                logger.info(f"Skipping {page_url}: near-duplicate of {duplicate_of}")
+                continue
+            kept.append((page_url, content, fingerprint))
+        return [(page_url, content) for page_url, content, _ in kept]
+
+    def _merge(self, pages: List[Tuple[str, str]], max_chars: int) -> str:
+        """
+        Concatenate pages in priority order. Every page gets a fair share of the
+        budget; space a short page doesn't use is passed on to the pages after it.
+        """
+        parts = []
+        remaining = max_chars
+        for index, (page_url, content) in enumerate(pages):
+            share = remaining // (len(pages) - index)
+            header = f"{PAGE_HEADER}{page_url}\n\n"
+            body = content.strip()[:max(share - len(header), 0)]
+            if not body:
+                continue
+            parts.append(header + body)
+            remaining -= len(header) + len(body)
+        return "\n\n".join(parts)
+
+
+# Global site crawler instance
+site_crawler = SiteCrawler(scraper_service)
@@ -1,63 +1,227 @@
-from supabase import create_client, Client
 from app.config import settings
-from typing import Optional, Dict, Any
+from app.utils.lazy import LazyService
+from typing import Optional, Dict, Any, List, Tuple, TYPE_CHECKING
+from collections import Counter
+import asyncio
+from datetime import datetime, timezone
 import json
 
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+def create_client(supabase_url: str, supabase_key: str) -> "Client":
+    """
+    supabase.create_client, importing the SDK on first use rather than with the app
+    """
+    from supabase import create_client as create_supabase_client
+    return create_supabase_client(supabase_url, supabase_key)
+
+
+def website_analysis_row(
+    url: str,
+    raw_content: str,
+    insights: Optional[Dict[str, Any]] = None,
+    token_count: Optional[int] = None,
+    sections: Optional[List[Dict[str, Any]]] = None,
+    content_hash: Optional[str] = None,
+    embedding: Optional[List[float]] = None
+) -> Dict[str, Any]:
+    """
+    Columns written for a website analysis; optional columns are only set when given
+    """
+    data = {
+        "url": url,
+        "raw_content": raw_content,
+        "insights": insights
+    }
+    # Token accounting is computed once per scrape and reused by chat
+    if token_count is not None:
+        data["token_count"] = token_count
+    if sections is not None:
+        data["sections"] = sections
+    if content_hash is not None:
+        data["content_hash"] = content_hash
+    if embedding is not None:
+        data["embedding"] = embedding
+    return data
+
 
 class DatabaseService:
     def __init__(self):
-        self.supabase: Client = create_client(
+        self.supabase: "Client" = create_client(
             settings.supabase_url, 
             settings.supabase_key
         )
     
+    async def _execute(self, query):
+        """
+        Run a query on a worker thread; the Supabase client is synchronous and
+        would otherwise block the event loop for the whole round trip
+        """
+        return await asyncio.to_thread(query.execute)
+    
     async def store_website_analysis(
         self, 
         url: str, 
         raw_content: str, 
-        insights: Optional[Dict[str, Any]] = None
+        insights: Optional[Dict[str, Any]] = None,
+        token_count: Optional[int] = None,
+        sections: Optional[List[Dict[str, Any]]] = None,
+        content_hash: Optional[str] = None,
+        embedding: Optional[List[float]] = None
     ) -> str:
         """
         Store website analysis data in Supabase
         Returns the record ID
         """
         try:
-            # Check if URL already exists
-            existing = self.supabase.table("website_analyses").select("id").eq("url", url).execute()
-            
-            data = {
-                "url": url,
-                "raw_content": raw_content,
-                "insights": insights
-            }
-            
-            if existing.data:
-                # Update existing record
-                result = self.supabase.table("website_analyses").update(data).eq("url", url).execute()
-                return existing.data[0]["id"]
-            else:
-                # Insert new record
-                result = self.supabase.table("website_analyses").insert(data).execute()
-                return result.data[0]["id"]
+            data = website_analysis_row(
+                url, raw_content, insights, token_count, sections, content_hash, embedding
+            )
+            # One statement (insert or update on the unique url), so a write retried
+            # after a timed-out attempt that did land can't collide with it
+            result = await self._execute(
+                self.supabase.table("website_analyses").upsert(data, on_conflict="url")
+            )
+            return result.data[0]["id"]
                 
         except Exception as e:
             raise Exception(f"Database error: {str(e)}")
     
-    async def get_website_analysis(self, url: str) -> Optional[Dict[str, Any]]:
+    async def get_website_analysis(self, url: str, columns: str = "*") -> Optional[Dict[str, Any]]:
         """
-        Retrieve website analysis data from Supabase
+        Retrieve website analysis data from Supabase, optionally only some columns
         """
         try:
-            result = self.supabase.table("website_analyses").select("*").eq("url", url).execute()
+            result = await self._execute(self.supabase.table("website_analyses").select(columns).eq("url", url))
             return result.data[0] if result.data else None
         except Exception as e:
             raise Exception(f"Database error: {str(e)}")
     
+    async def touch_website_analysis(self, url: str) -> None:
+        """
+        Mark a stored analysis as fresh without changing its content
+        """
+        try:
+            await self._execute(
+                self.supabase.table("website_analyses").update(
+                    {"updated_at": datetime.now(timezone.utc).isoformat()}
+                ).eq("url", url)
+            )
+        except Exception as e:
+            raise Exception(f"Database error: {str(e)}")
+    
+    async def get_analyses_updated_before(self, cutoff: str, limit: int = 100) -> list:
+        """
+        Get URLs of analyses last updated before cutoff (ISO timestamp), oldest first
+        """
+        try:
+            result = await self._execute(
+                self.supabase.table("website_analyses")
+                .select("url, updated_at")
+                .lt("updated_at", cutoff)
+                .order("updated_at")
+                .limit(limit)
+            )
+            return result.data if result.data else []
+        except Exception as e:
+            raise Exception(f"Database error: {str(e)}")
+    
+    async def get_chat_activity(self, since: str, limit: int = 10000) -> Dict[str, int]:
+        """
+        Count conversations per URL since the given ISO timestamp
+        """
+        try:
+            result = await self._execute(
+                self.supabase.table("conversations")
+                .select("url")
+                .gte("created_at", since)
+                .limit(limit)
+            )
+            return dict(Counter(row["url"] for row in result.data or []))
+        except Exception as e:
+            raise Exception(f"Database error: {str(e)}")
+    
+    async def get_rows_after(
+        self,
+        table: str,
+        key_column: str,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 500,
+        columns: str = "*"
+    ) -> list:
+        """
+        One keyset page of a table ordered by (key_column, id), starting after
+        the (key, id) of the last row of the previous page
+        """
+        try:
+            query = self.supabase.table(table).select(columns).order(key_column).order("id").limit(limit)
+            if after is not None:
+                key, row_id = after
+                query = query.or_(
+                    f'{key_column}.gt."{key}",and({key_column}.eq."{key}",id.gt.{row_id})'
+                )
+            result = await self._execute(query)
+            return result.data if result.data else []
+        except Exception as e:
+            raise Exception(f"Database error: {str(e)}")
+    
+    async def search_analyses(
+        self,
+        columns: str,
+        text_query: Optional[str] = None,
+        filters: Optional[Dict[str, str]] = None,
+        before: Optional[Tuple[str, str]] = None,
+        limit: int = 20
+    ) -> list:
+        """
+        Page of analyses, newest first by (updated_at, id), optionally matching a
+        full-text query (websearch syntax) and case-insensitive substring filters
+        on facet columns. before is the (updated_at, id) of the previous page's last row.
+        """
+        try:
+            query = self.supabase.table("website_analyses").select(columns)
+            if text_query:
+                query = query.filter("search_vector", "wfts(english)", text_query)
+            for column, value in (filters or {}).items():
+                query = query.ilike(column, f"*{value}*")
+            if before is not None:
+                updated_at, row_id = before
+                query = query.or_(
+                    f'updated_at.lt."{updated_at}",and(updated_at.eq."{updated_at}",id.lt.{row_id})'
+                )
+            result = await self._execute(
+                query.order("updated_at", desc=True).order("id", desc=True).limit(limit)
+            )
+            return result.data if result.data else []
+        except Exception as e:
+            raise Exception(f"Database error: {str(e)}")
+    
+    async def upsert_rows(self, table: str, rows: List[Dict[str, Any]], on_conflict: str) -> int:
+        """
+        Insert a batch of rows in one request, updating rows that already exist
+        Returns the number of rows written
+        """
+        if not rows:
+            return 0
+        from postgrest.types import ReturnMethod
+
+        try:
+            # Minimal return: don't echo the batch (raw page content included) back
+            await self._execute(
+                self.supabase.table(table).upsert(rows, on_conflict=on_conflict, returning=ReturnMethod.minimal)
+            )
+            return len(rows)
+        except Exception as e:
+            raise Exception(f"Database error: {str(e)}")
+    
     async def store_conversation(
         self, 
         url: str, 
         query: str, 
-        response: str
+        response: str,
+        session_id: Optional[str] = None
     ) -> str:
         """
         Store conversation data in Supabase
@@ -69,23 +233,47 @@ class DatabaseService:
                 "query": query,
                 "response": response
             }
+            if session_id is not None:
+                data["session_id"] = session_id
             
-            result = self.supabase.table("conversations").insert(data).execute()
+            result = await self._execute(self.supabase.table("conversations").insert(data))
             return result.data[0]["id"]
             
         except Exception as e:
             raise Exception(f"Database error: {str(e)}")
     
-    async def get_conversation_history(self, url: str, limit: int = 10) -> list:
+    async def get_conversation_history(
+        self,
+        url: str,
+        limit: int = 10,
+        session_id: Optional[str] = None,
+        max_bytes: Optional[int] = None
+    ) -> list:
         """
-        Get recent conversation history for a URL
+        Get recent conversation history for a URL, newest first: the given
+        session's turns if session_id is set, and only as many turns as fit
+        in max_bytes of query and response text
         """
         try:
-            result = self.supabase.table("conversations").select("*").eq("url", url).order("created_at", desc=True).limit(limit).execute()
-            return result.data if result.data else []
+            query = self.supabase.table("conversations").select("id, query, response, created_at")
+            if session_id is not None:
+                # Served by idx_conversations_session_created_at
+                query = query.eq("session_id", session_id)
+            result = await self._execute(query.eq("url", url).order("created_at", desc=True).limit(limit))
+            rows = result.data if result.data else []
         except Exception as e:
             raise Exception(f"Database error: {str(e)}")
+        
+        if max_bytes is None:
+            max_bytes = settings.chat_history_max_bytes
+        history, used = [], 0
+        for row in rows:
+            used += len((row.get("query") or "").encode("utf-8")) + len((row.get("response") or "").encode("utf-8"))
+            if used > max_bytes:
+                break
+            history.append(row)
+        return history
 
 
 # Global database service instance
-db_service = DatabaseService()
+db_service = LazyService(DatabaseService)
@@ -0,0 +1,87 @@
+import re
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+
+# Insight fields and how much each says about what kind of company this is
+FIELD_WEIGHTS = {
+    "industry": 3.0,
+    "products_services": 2.0,
+    "target_audience": 1.5,
+    "usp": 1.0,
+    "company_size": 0.5,
+    "location": 0.5,
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the their they this to "
+    "was we with you your not available information company companies".split()
+)
+
+
+def embeddable(insights: Any) -> bool:
+    """
+    Whether insights are default business insights (not custom answers or an unparsed response)
+    """
+    return isinstance(insights, dict) and "raw_analysis" not in insights and "custom_answers" not in insights
+
+
+class HashingEmbedder:
+    """
+    CPU-only text embedder: hashes words and word bigrams into a fixed number of
+    signed buckets (the hashing trick) and L2-normalizes the result. Needs no
+    model or network and is stable across processes, so stored vectors stay valid.
+    """
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> List[str]:
+        words = [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+    def embed_fields(self, fields: Dict[str, float]) -> np.ndarray:
+        """
+        Embed weighted texts, given as text -> weight
+        """
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for text, weight in fields.items():
+            features = self._features(text)
+            if not features:
+                continue
+            # Each field contributes its weight regardless of its length
+            share = weight / np.sqrt(len(features))
+            for feature in features:
+                digest = zlib.crc32(feature.encode("utf-8"))
+                vector[digest % self.dimensions] += share if digest & 0x80000000 else -share
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed_insights(self, insights: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        Embedding of default business insights, or None if there is nothing to embed
+        """
+        if not embeddable(insights):
+            return None
+        fields: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            value = insights.get(field)
+            if isinstance(value, str) and value.strip():
+                fields[value] = fields.get(value, 0.0) + weight
+        vector = self.embed_fields(fields)
+        return vector if vector.any() else None
+
+
+def to_list(vector: np.ndarray) -> List[float]:
+    """
+    Vector as stored in the database (real[]); 5 decimals keep the payload small
+    """
+    return [round(float(value), 5) for value in vector]
+
+
+# Global embedder instance
+embedder = HashingEmbedder(settings.similarity_dimensions)
@@ -0,0 +1,129 @@
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class Caller:
+    """Who upstream work is done for: the API key's name and share, and its lane"""
+    key: str
+    weight: float = 1.0
+    interactive: bool = False
+
+
+# Work started outside a request (background refreshes) runs as this caller
+SYSTEM_CALLER = Caller(key="system")
+
+# Set per request by the API-key dependency; read where upstream slots are taken
+current_caller: ContextVar[Caller] = ContextVar("current_caller", default=SYSTEM_CALLER)
+
+# Queued job: (virtual finish tag, arrival order, waiter)
+_Entry = Tuple[float, int, asyncio.Future]
+
+
+class FairScheduler:
+    """
+    Admits upstream calls to a fixed number of concurrent slots. Waiting
+    interactive work (chat) is admitted first and may use every slot; other
+    work leaves reserved_interactive slots free for it. Within a lane, keys
+    share slots by weighted fair queueing: each job gets a virtual finish tag
+    of max(lane clock, key's last tag) + 1/weight and the lowest tag goes next,
+    so a key with hundreds of queued jobs doesn't delay one with a single job.
+    """
+
+    def __init__(self, name: str, concurrency: int, reserved_interactive: int = 0):
+        self.name = name
+        self.concurrency = max(concurrency, 1)
+        self.reserved_interactive = min(max(reserved_interactive, 0), self.concurrency - 1)
+        self.active = 0
+        self._queues: Dict[bool, List[_Entry]] = {True: [], False: []}
+        self._clock: Dict[bool, float] = {True: 0.0, False: 0.0}
+        self._last_tag: Dict[Tuple[bool, str], float] = {}
+        self._order = itertools.count()
+        self.stats: Dict[str, Any] = {"admitted": 0, "queued": 0, "max_waiting": 0, "by_key": {}}
+
+    def _limit(self, interactive: bool) -> int:
+        return self.concurrency if interactive else self.concurrency - self.reserved_interactive
+
+    def _waiting(self, interactive: bool) -> bool:
+        return any(not future.done() for _, _, future in self._queues[interactive])
+
+    def _can_start(self, caller: Caller) -> bool:
+        if self.active >= self._limit(caller.interactive):
+            return False
+        if caller.interactive:
+            return not self._waiting(True)
+        return not self._waiting(True) and not self._waiting(False)
+
+    def _count(self, caller: Caller):
+        self.stats["admitted"] += 1
+        self.stats["by_key"][caller.key] = self.stats["by_key"].get(caller.key, 0) + 1
+
+    async def acquire(self, caller: Caller):
+        if self._can_start(caller):
+            self.active += 1
+            self._count(caller)
+            return
+
+        lane = caller.interactive
+        tag = max(self._clock[lane], self._last_tag.get((lane, caller.key), 0.0)) + 1.0 / max(caller.weight, 1e-6)
+        self._last_tag[(lane, caller.key)] = tag
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queues[lane], (tag, next(self._order), future))
+        self.stats["queued"] += 1
+        self.stats["max_waiting"] = max(self.stats["max_waiting"], self.waiting)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the waiter was cancelled: pass the slot on
+                self.release()
+            else:
+                future.cancel()
+            raise
+        self._count(caller)
+
+    def release(self):
+        self.active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        for lane in (True, False):
+            queue = self._queues[lane]
+            while queue and self.active < self._limit(lane):
+                tag, _, future = heapq.heappop(queue)
+                if future.done():
+                    # Cancelled while waiting
+                    continue
+                self._clock[lane] = tag
+                self.active += 1
+                future.set_result(None)
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for queue in self._queues.values() for _, _, future in queue if not future.done())
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold one slot for the current request's caller
+        """
+        await self.acquire(current_caller.get())
+        try:
+            yield
+        finally:
+            self.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"concurrency": self.concurrency, "active": self.active, "waiting": self.waiting, **self.stats}
+
+
+# Global schedulers, one per upstream
+gemini_scheduler = FairScheduler("gemini", settings.gemini_concurrency, settings.interactive_reserved_slots)
+scraper_scheduler = FairScheduler("scraper", settings.scraper_concurrency, settings.interactive_reserved_slots)
@@ -1,131 +1,651 @@
-import google.generativeai as genai
-from typing import Dict, Any, Optional, List
+from typing import AsyncIterator, Callable, Dict, Any, Optional, List
+from pydantic import ValidationError
 from app.config import settings
+from app.models.schemas import BusinessInsights, StructuredAnalysis, StructuredInsights
+from app.services.answer_cache import chat_answer_cache, history_independent, normalize_question
+from app.services.context_cache import create_context_cache
+from app.services.fair_scheduler import gemini_scheduler
+from app.services.model_router import TASK_CHAT, TASK_INSIGHTS, model_router
+from app.services.prompt_builder import Section, estimate_tokens, prompt_builder
+from app.utils.cache import TTLCache, content_hash
+from app.utils.deadline import current_deadline
+from app.utils.lazy import LazyService
+from contextlib import aclosing
+import asyncio
 import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+CHAT_SYSTEM_INSTRUCTION = (
+    "You are a helpful assistant that answers questions about websites based on their content. "
+    "The website content you are answering about follows."
+)
+
+
+_STRING = {"type": "string"}
+_STRING_LIST = {"type": "array", "items": _STRING}
+
+# Gemini response schema (OpenAPI subset) for the default insights
+INSIGHTS_SCHEMA_PROPERTIES = {
+    "industry": _STRING,
+    "company_size": _STRING,
+    "location": _STRING,
+    "usp": _STRING,
+    "products_services": _STRING,
+    "target_audience": _STRING,
+    "contact_info": {
+        "type": "object",
+        "properties": {"emails": _STRING_LIST, "phones": _STRING_LIST, "social_media": _STRING_LIST},
+        "required": ["emails", "phones", "social_media"],
+    },
+}
+
+ANSWERS_SCHEMA_PROPERTY = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"question": _STRING, "answer": _STRING},
+        "required": ["question", "answer"],
+    },
+}
+
+
+def build_structured_schema(include_insights: bool, include_answers: bool) -> Dict[str, Any]:
+    """
+    Response schema for structured extraction
+    """
+    properties: Dict[str, Any] = {}
+    if include_insights:
+        properties.update(INSIGHTS_SCHEMA_PROPERTIES)
+    if include_answers:
+        properties["answers"] = ANSWERS_SCHEMA_PROPERTY
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
 
 class LLMService:
     def __init__(self):
-        genai.configure(api_key=settings.gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash-lite')
+        # Imported here: the SDK is slow to import and only needed once the service is used
+        import google.generativeai as genai
+
+        if settings.gemini_api_endpoint:
+            # Custom endpoints (proxies, local stand-ins) are only reachable over REST
+            genai.configure(
+                api_key=settings.gemini_api_key,
+                transport="rest",
+                client_options={"api_endpoint": settings.gemini_api_endpoint}
+            )
+        else:
+            genai.configure(api_key=settings.gemini_api_key)
+        # One client per routed model; the first is the primary (also used for cached chat context)
+        self.models = {route.name: genai.GenerativeModel(route.name) for route in model_router.routes}
+        self.model_name = model_router.primary.name
+        self.model = self.models[self.model_name]
+        self.context_cache = create_context_cache(self.model)
+        # Structured-mode results keyed by content hash (insights) and (content hash, question)
+        self.insights_cache = TTLCache(
+            max_entries=settings.answer_cache_max_entries,
+            ttl_seconds=settings.answer_cache_ttl_seconds
+        )
+        self.answer_cache = TTLCache(
+            max_entries=settings.answer_cache_max_entries,
+            ttl_seconds=settings.answer_cache_ttl_seconds
+        )
     
-    async def extract_business_insights(self, content: str, custom_questions: Optional[List[str]] = None) -> Dict[str, Any]:
+    async def _generate(self, model, prompt: str, **kwargs):
         """
-        Extract business insights from website content using Gemini 2.5 Flash
+        One Gemini call on a given model, admitted by the upstream scheduler
+        (chat first, then a fair share per API key)
         """
-        try:
-            if custom_questions:
-                # Handle custom questions
-                questions_text = "\n".join([f"- {q}" for q in custom_questions])
-                prompt = f"""
-                You are a business intelligence analyst. Analyze the following website content and answer the specific questions provided.
+        async with gemini_scheduler.slot():
+            return await self._call(model, prompt, **kwargs)
+
+    async def _call(self, model, prompt: str, timeout: Optional[float] = None, **kwargs):
+        """
+        The SDK call, run on a worker thread since it is blocking and would
+        otherwise hold the event loop for the whole request. It is bounded by
+        timeout and the request deadline (asyncio.TimeoutError when either runs
+        out); the SDK gets the same timeout, since the thread can't be cancelled
+        and that is what ends an abandoned call.
+        """
+        deadline = current_deadline.get()
+        if deadline is not None:
+            timeout = min(timeout, deadline.remaining()) if timeout is not None else deadline.remaining()
+        if timeout is None:
+            return await asyncio.to_thread(model.generate_content, prompt, **kwargs)
+        timeout = max(timeout, 1.0)
+        kwargs.setdefault("request_options", {"timeout": timeout})
+        return await asyncio.wait_for(asyncio.to_thread(model.generate_content, prompt, **kwargs), timeout)
+
+    async def _complete(self, task: str, build_prompt: Callable[[str], str], prompt_tokens: int, **kwargs):
+        """
+        Run a prompt on the models the router picks for its task and size, in
+        order: a call that errors or times out falls back to the next model.
+        build_prompt(model_name) builds the prompt for a model, since content is
+        trimmed to each model's own token budget.
+        """
+        candidates = model_router.candidates(task, prompt_tokens)
+        for attempt, route in enumerate(candidates):
+            async with gemini_scheduler.slot():
+                started = time.monotonic()
+                try:
+                    response = await self._call(
+                        self.models[route.name], build_prompt(route.name),
+                        timeout=model_router.timeout_for(route), **kwargs
+                    )
+                except asyncio.TimeoutError:
+                    deadline = current_deadline.get()
+                    if deadline is not None and deadline.expired:
+                        # The request ran out of time, not the model
+                        raise
+                    model_router.record(route.name, time.monotonic() - started, ok=False, timed_out=True)
+                    error = Exception(f"{route.name} timed out")
+                except Exception as e:
+                    model_router.record(route.name, time.monotonic() - started, ok=False)
+                    error = e
+                else:
+                    model_router.record(route.name, time.monotonic() - started, ok=True)
+                    return response
+            if attempt + 1 < len(candidates):
+                model_router.record_fallback(route.name)
+                logger.warning(f"{route.name} failed ({str(error)}), falling back to {candidates[attempt + 1].name}")
+        raise error
+    
+    def _build_insights_prompt(self, content: str, custom_questions: Optional[List[str]] = None) -> str:
+        """
+        Build the analysis prompt for default insights or custom questions
+        """
+        if custom_questions:
+            # Handle custom questions
+            questions_text = "\n".join([f"- {q}" for q in custom_questions])
+            return f"""
+            You are a business intelligence analyst. Analyze the following website content and answer the specific questions provided.
 
-                Website Content:
-                {content}
+            Website Content:
+            {content}
 
-                Questions to answer:
-                {questions_text}
+            Questions to answer:
+            {questions_text}
 
-                Please provide detailed, accurate answers based on the content. If information is not available, state "Not specified" or "Cannot be determined from the content".
-                """
-            else:
-                # Extract default 7 core insights
-                prompt = f"""
-                You are a business intelligence analyst. Analyze the following website content and extract key business insights.
-
-                Website Content:
-                {content}
-
-                Please extract and provide the following information in JSON format:
-                {{
-                    "industry": "Primary industry/sector (infer if not explicitly stated)",
-                    "company_size": "Approximate size (small/medium/large or employee count range if mentioned)",
-                    "location": "Headquarters or primary location (if mentioned)",
-                    "usp": "Unique Selling Proposition - what makes this company stand out",
-                    "products_services": "Concise summary of main offerings",
-                    "target_audience": "Primary customer demographic (infer from content)",
-                    "contact_info": {{
-                        "emails": ["list of email addresses found"],
-                        "phones": ["list of phone numbers found"],
-                        "social_media": ["list of social media links found"]
-                    }}
+            Please provide detailed, accurate answers based on the content. If information is not available, state "Not specified" or "Cannot be determined from the content".
+            """
+
+        # Extract default 7 core insights
+        return f"""
+            You are a business intelligence analyst. Analyze the following website content and extract key business insights.
+
+            Website Content:
+            {content}
+
+            Please extract and provide the following information in JSON format:
+            {{
+                "industry": "Primary industry/sector (infer if not explicitly stated)",
+                "company_size": "Approximate size (small/medium/large or employee count range if mentioned)",
+                "location": "Headquarters or primary location (if mentioned)",
+                "usp": "Unique Selling Proposition - what makes this company stand out",
+                "products_services": "Concise summary of main offerings",
+                "target_audience": "Primary customer demographic (infer from content)",
+                "contact_info": {{
+                    "emails": ["list of email addresses found"],
+                    "phones": ["list of phone numbers found"],
+                    "social_media": ["list of social media links found"]
                 }}
+            }}
+
+            Rules:
+            - Use "Not specified" if information is not available
+            - Make reasonable inferences based on content context
+            - Keep answers concise but informative
+            - Extract contact information accurately
+            - Return valid JSON only
+            """
+
+    def _build_structured_prompt(self, content: str, questions: List[str], include_insights: bool) -> str:
+        """
+        Build the prompt for schema-constrained extraction of insights and/or answers
+        """
+        tasks = []
+        if include_insights:
+            tasks.append(
+                "Extract the core business insights: industry (infer if not explicitly stated), "
+                "company_size (small/medium/large or employee count range if mentioned), location "
+                "(headquarters or primary location), usp (what makes this company stand out), "
+                "products_services (concise summary of main offerings), target_audience (primary "
+                "customer demographic) and contact_info (emails, phones and social media links found)."
+            )
+        if questions:
+            questions_text = "\n".join([f"- {q}" for q in questions])
+            tasks.append(
+                "Answer each of the following questions. Return one entry per question in `answers`, "
+                f"repeating the question verbatim:\n{questions_text}"
+            )
+        task_text = "\n\n".join(tasks)
+        return f"""
+            You are a business intelligence analyst. Analyze the following website content.
+
+            Website Content:
+            {content}
+
+            {task_text}
+
+            Rules:
+            - Use "Not specified" if information is not available
+            - Make reasonable inferences based on content context
+            - Keep answers concise but informative
+            - Extract contact information accurately
+            """
+
+    def _build_update_prompt(
+        self,
+        previous_insights: Dict[str, Any],
+        changed_content: str,
+        removed_titles: List[str]
+    ) -> str:
+        """
+        Build the prompt that revises existing insights from changed page sections only
+        """
+        removed_text = "\n".join([f"- {title or '(untitled section)'}" for title in removed_titles]) or "- None"
+        return f"""
+            You are a business intelligence analyst. You previously extracted these business insights from a website:
+            {json.dumps(previous_insights, indent=2)}
 
-                Rules:
-                - Use "Not specified" if information is not available
-                - Make reasonable inferences based on content context
-                - Keep answers concise but informative
-                - Extract contact information accurately
-                - Return valid JSON only
-                """
+            The website has since changed. These sections are new or were edited:
+            {changed_content}
+
+            These sections were removed or replaced:
+            {removed_text}
+
+            Update the insights to reflect the changes and return the complete insights in the same JSON format.
+
+            Rules:
+            - Keep a field unchanged unless the changes affect it
+            - Drop details that only appeared in removed sections
+            - Use "Not specified" if information is not available
+            - Return valid JSON only
+            """
+
+    def _parse_insights_response(self, text: str) -> Dict[str, Any]:
+        """
+        Parse the JSON insights returned by the model, tolerating ```json fences
+        """
+        try:
+            # Clean the response text to extract JSON
+            response_text = text.strip()
+            if response_text.startswith('```json'):
+                response_text = response_text[7:]
+            if response_text.endswith('```'):
+                response_text = response_text[:-3]
+            
+            return json.loads(response_text)
+        except json.JSONDecodeError:
+            logger.warning("Failed to parse JSON response, returning raw text")
+            return {"raw_analysis": text}
+
+    def _build_chat_prompt(
+        self,
+        content: Optional[str],
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        """
+        Build the conversational prompt from site content, history and the question.
+        With content=None the site content is assumed to come from a cached context.
+        """
+        # Build conversation context
+        context = f"Website Content:\n{content}\n\n" if content is not None else ""
+        
+        if conversation_history:
+            context += "Previous Conversation:\n"
+            for msg in conversation_history:
+                context += f"User: {msg.get('query', '')}\n"
+                context += f"Assistant: {msg.get('response', '')}\n"
+            context += "\n"
+        
+        context += f"Current Question: {query}\n\n"
+        
+        if content is None:
+            return f"""
+            {context}
+            
+            Please provide a helpful, accurate answer based on the website content and conversation history.
+            If the information is not available in the content, clearly state that.
+            Be conversational and informative in your response.
+            """
+        
+        return f"""
+            You are a helpful assistant that answers questions about websites based on their content.
             
-            response = self.model.generate_content(prompt)
+            {context}
+            
+            Please provide a helpful, accurate answer based on the website content and conversation history.
+            If the information is not available in the content, clearly state that.
+            Be conversational and informative in your response.
+            """
+
+    def _fit_content(
+        self,
+        content: str,
+        task: str,
+        prompt_overhead: str,
+        query: Optional[str] = None,
+        sections: Optional[List[Section]] = None,
+        model_name: Optional[str] = None
+    ) -> str:
+        """
+        Trim content to the model's token budget, leaving room for the rest of the prompt
+        """
+        return prompt_builder.fit(
+            content,
+            task=task,
+            model_name=model_name or self.model_name,
+            reserved_tokens=estimate_tokens(prompt_overhead),
+            query=query,
+            sections=sections
+        )
+
+    async def extract_business_insights(
+        self,
+        content: str,
+        custom_questions: Optional[List[str]] = None,
+        sections: Optional[List[Section]] = None
+    ) -> Dict[str, Any]:
+        """
+        Extract business insights from website content using Gemini 2.5 Flash
+        """
+        try:
+            overhead = self._build_insights_prompt("", custom_questions)
+
+            def build_prompt(model_name: str) -> str:
+                fitted = self._fit_content(content, "insights", overhead, sections=sections, model_name=model_name)
+                return self._build_insights_prompt(fitted, custom_questions)
+
+            response = await self._complete(
+                TASK_INSIGHTS, build_prompt, estimate_tokens(content) + estimate_tokens(overhead)
+            )
             
             if custom_questions:
                 # Return custom Q&A format
                 return {"custom_answers": response.text}
             else:
                 # Parse JSON response for default insights
-                try:
-                    # Clean the response text to extract JSON
-                    response_text = response.text.strip()
-                    if response_text.startswith('```json'):
-                        response_text = response_text[7:]
-                    if response_text.endswith('```'):
-                        response_text = response_text[:-3]
-                    
-                    insights = json.loads(response_text)
-                    return insights
-                except json.JSONDecodeError:
-                    logger.warning("Failed to parse JSON response, returning raw text")
-                    return {"raw_analysis": response.text}
+                return self._parse_insights_response(response.text)
                     
         except Exception as e:
             logger.error(f"LLM analysis error: {str(e)}")
             raise Exception(f"Analysis error: {str(e)}")
     
+    async def update_business_insights(
+        self,
+        previous_insights: Dict[str, Any],
+        changed_content: str,
+        removed_titles: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Revise previously extracted default insights using only the changed sections
+        """
+        try:
+            removed_titles = removed_titles or []
+            overhead = self._build_update_prompt(previous_insights, "", removed_titles)
+
+            def build_prompt(model_name: str) -> str:
+                fitted = self._fit_content(changed_content, "insights", overhead, model_name=model_name)
+                return self._build_update_prompt(previous_insights, fitted, removed_titles)
+
+            response = await self._complete(
+                TASK_INSIGHTS, build_prompt, estimate_tokens(changed_content) + estimate_tokens(overhead)
+            )
+            updated = self._parse_insights_response(response.text)
+            if "raw_analysis" in updated:
+                raise Exception("could not parse updated insights")
+            return {**previous_insights, **updated}
+
+        except Exception as e:
+            logger.error(f"LLM incremental analysis error: {str(e)}")
+            raise Exception(f"Analysis error: {str(e)}")
+
+    async def extract_structured_insights(
+        self,
+        content: str,
+        questions: Optional[List[str]] = None,
+        sections: Optional[List[Section]] = None
+    ) -> StructuredAnalysis:
+        """
+        Extract the default insights and answer custom questions in a single
+        schema-constrained call. Insights and per-question answers are cached by
+        content hash, so only what is missing for this content is requested.
+        """
+        try:
+            questions = questions or []
+            digest = content_hash(content)
+
+            insights = self.insights_cache.get(digest)
+            answers: Dict[str, str] = {}
+            missing: List[str] = []
+            for question in questions:
+                cached = self.answer_cache.get((digest, normalize_question(question)))
+                if cached is not None:
+                    answers[question] = cached
+                elif question not in missing:
+                    missing.append(question)
+
+            if insights is not None and not missing:
+                return StructuredAnalysis(insights=insights, answers=answers)
+
+            include_insights = insights is None
+            overhead = self._build_structured_prompt("", missing, include_insights)
+
+            def build_prompt(model_name: str) -> str:
+                fitted = self._fit_content(content, "insights", overhead, sections=sections, model_name=model_name)
+                return self._build_structured_prompt(fitted, missing, include_insights)
+
+            import google.generativeai as genai
+
+            response = await self._complete(
+                TASK_INSIGHTS,
+                build_prompt,
+                estimate_tokens(content) + estimate_tokens(overhead),
+                generation_config=genai.GenerationConfig(
+                    response_mime_type="application/json",
+                    response_schema=build_structured_schema(include_insights, bool(missing))
+                )
+            )
+            output = StructuredInsights.model_validate_json(response.text)
+
+            if include_insights:
+                insights = BusinessInsights(**output.model_dump(exclude={"answers"}))
+                self.insights_cache.set(digest, insights)
+
+            by_question = {normalize_question(a.question): a.answer for a in output.answers}
+            for index, question in enumerate(missing):
+                answer = by_question.get(normalize_question(question))
+                if answer is None and index < len(output.answers):
+                    # Fall back to position when the model paraphrased the question
+                    answer = output.answers[index].answer
+                if answer is None:
+                    continue
+                answers[question] = answer
+                self.answer_cache.set((digest, normalize_question(question)), answer)
+
+            return StructuredAnalysis(insights=insights, answers=answers)
+
+        except ValidationError as e:
+            logger.error(f"Structured response failed validation: {str(e)}")
+            raise Exception(f"Analysis error: invalid structured response: {str(e)}")
+        except Exception as e:
+            logger.error(f"LLM structured analysis error: {str(e)}")
+            raise Exception(f"Analysis error: {str(e)}")
+    
     async def answer_conversational_query(
         self, 
         content: str, 
         query: str, 
-        conversation_history: Optional[List[Dict[str, str]]] = None
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        url: Optional[str] = None,
+        sections: Optional[List[Section]] = None
     ) -> str:
         """
-        Answer conversational questions about website content
+        Answer conversational questions about website content. Questions that
+        don't depend on the conversation are answered from the chat answer cache
+        when the same (or a near-identical) question was asked about this
+        version of the site before.
+        """
+        cacheable = bool(url) and settings.chat_answer_cache_enabled and \
+            history_independent(query, conversation_history)
+        if cacheable:
+            digest = content_hash(content)
+            cached = chat_answer_cache.get(url, digest, query)
+            if cached is not None:
+                return cached
+
+        answer = await self._answer_query(content, query, conversation_history, url, sections)
+        if cacheable:
+            chat_answer_cache.set(url, digest, query, answer)
+        return answer
+
+    async def _answer_query(
+        self,
+        content: str,
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        url: Optional[str],
+        sections: Optional[List[Section]]
+    ) -> str:
+        """
+        Ask the model. When a URL is given and context caching is enabled, the
+        site content is sent once as cached context and each turn only sends
+        history + question.
         """
         try:
-            # Build conversation context
-            context = f"Website Content:\n{content}\n\n"
-            
-            if conversation_history:
-                context += "Previous Conversation:\n"
-                for msg in conversation_history:
-                    context += f"User: {msg.get('query', '')}\n"
-                    context += f"Assistant: {msg.get('response', '')}\n"
-                context += "\n"
-            
-            context += f"Current Question: {query}\n\n"
-            
-            prompt = f"""
-            You are a helpful assistant that answers questions about websites based on their content.
-            
-            {context}
-            
-            Please provide a helpful, accurate answer based on the website content and conversation history.
-            If the information is not available in the content, clearly state that.
-            Be conversational and informative in your response.
-            """
+            if url and self.context_cache:
+                # Query-independent trim so the cached prefix is stable across turns
+                cached_content = self._fit_content(content, "chat", CHAT_SYSTEM_INSTRUCTION, sections=sections)
+                cached_model = await self.context_cache.get_model(
+                    url, cached_content, self.model_name, CHAT_SYSTEM_INSTRUCTION
+                )
+                if cached_model is not None:
+                    try:
+                        response = await self._generate(
+                            cached_model, self._build_chat_prompt(None, query, conversation_history)
+                        )
+                        return response.text
+                    except Exception as e:
+                        # Expired or evicted upstream: drop the handle and answer uncached
+                        logger.warning(f"Cached context call failed for {url}: {str(e)}")
+                        await self.context_cache.invalidate(url)
             
-            response = self.model.generate_content(prompt)
+            overhead = self._build_chat_prompt("", query, conversation_history)
+
+            def build_prompt(model_name: str) -> str:
+                fitted = self._fit_content(
+                    content, "chat", overhead, query=query, sections=sections, model_name=model_name
+                )
+                return self._build_chat_prompt(fitted, query, conversation_history)
+
+            response = await self._complete(
+                TASK_CHAT, build_prompt, estimate_tokens(content) + estimate_tokens(overhead)
+            )
             return response.text
             
         except Exception as e:
             logger.error(f"LLM conversation error: {str(e)}")
             raise Exception(f"Conversation error: {str(e)}")
 
+    async def stream_conversational_query(
+        self,
+        content: str,
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        url: Optional[str] = None,
+        sections: Optional[List[Section]] = None
+    ) -> AsyncIterator[str]:
+        """
+        answer_conversational_query, yielding the answer in pieces as the model
+        writes it. If the stream fails before anything was sent, the question is
+        answered without streaming (with model fallback) instead.
+        """
+        cacheable = bool(url) and settings.chat_answer_cache_enabled and \
+            history_independent(query, conversation_history)
+        if cacheable:
+            digest = content_hash(content)
+            cached = chat_answer_cache.get(url, digest, query)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks: List[str] = []
+        try:
+            # Closing this generator (client gone) closes the stream and frees its Gemini slot
+            async with aclosing(self._stream_answer(content, query, conversation_history, url, sections)) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+        except Exception as e:
+            if chunks:
+                logger.error(f"LLM conversation stream error: {str(e)}")
+                raise Exception(f"Conversation error: {str(e)}")
+            logger.warning(f"Streaming failed, answering without it: {str(e)}")
+            if url and self.context_cache:
+                await self.context_cache.invalidate(url)
+            chunks.append(await self._answer_query(content, query, conversation_history, url, sections))
+            yield chunks[-1]
+
+        if cacheable:
+            chat_answer_cache.set(url, digest, query, "".join(chunks))
+
+    async def _stream_answer(
+        self,
+        content: str,
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        url: Optional[str],
+        sections: Optional[List[Section]]
+    ) -> AsyncIterator[str]:
+        """
+        Stream one answer from the cached-context model if there is one, else
+        from the model the router picks first
+        """
+        model, prompt, route = None, None, None
+        if url and self.context_cache:
+            cached_content = self._fit_content(content, "chat", CHAT_SYSTEM_INSTRUCTION, sections=sections)
+            model = await self.context_cache.get_model(url, cached_content, self.model_name, CHAT_SYSTEM_INSTRUCTION)
+            prompt = self._build_chat_prompt(None, query, conversation_history)
+        if model is None:
+            overhead = self._build_chat_prompt("", query, conversation_history)
+            route = model_router.candidates(TASK_CHAT, estimate_tokens(content) + estimate_tokens(overhead))[0]
+            fitted = self._fit_content(content, "chat", overhead, query=query, sections=sections, model_name=route.name)
+            model, prompt = self.models[route.name], self._build_chat_prompt(fitted, query, conversation_history)
+
+        timeout = model_router.timeout_for(route or model_router.primary)
+        async with gemini_scheduler.slot():
+            started = time.monotonic()
+            try:
+                response = await asyncio.to_thread(
+                    model.generate_content, prompt, stream=True, request_options={"timeout": timeout}
+                )
+                chunks = iter(response)
+                while True:
+                    chunk = await asyncio.to_thread(next, chunks, None)
+                    if chunk is None:
+                        break
+                    text = _chunk_text(chunk)
+                    if text:
+                        yield text
+            except Exception:
+                if route is not None:
+                    model_router.record(route.name, time.monotonic() - started, ok=False)
+                raise
+            if route is not None:
+                model_router.record(route.name, time.monotonic() - started, ok=True)
+
+
+def _chunk_text(chunk) -> str:
+    """Text of a streamed response chunk; the last chunk may carry only the finish reason"""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
 
 # Global LLM service instance
-llm_service = LLMService()
+llm_service = LazyService(LLMService)
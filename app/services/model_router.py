@@ -0,0 +1,108 @@
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.config import ModelRouteConfig, settings
+
+# Task types routed separately: analysis can wait, chat is interactive
+TASK_INSIGHTS = "insights"
+TASK_CHAT = "chat"
+
+
+@dataclass
+class ModelStats:
+    """Recent behaviour of one model, smoothed so a single slow call doesn't flip routing"""
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    fallbacks: int = 0
+    latency_ewma: Optional[float] = None
+    error_ewma: float = 0.0
+    cooldown_until: float = 0.0
+    last_call: float = 0.0
+
+
+class ModelRouter:
+    """
+    Picks the order in which configured models are tried for a prompt. Models
+    serving the task whose max_prompt_tokens fits the prompt come first, in
+    configured (preference) order; models cooling down after repeated errors,
+    or whose recent latency is over the task's target, are moved behind the
+    rest. Models too small for the prompt are kept as last resorts, largest
+    first, since the content can still be trimmed to fit them.
+    """
+
+    def __init__(self, routes: List[ModelRouteConfig]):
+        self.routes = routes or [ModelRouteConfig(name="gemini-2.5-flash-lite")]
+        self.stats: Dict[str, ModelStats] = {route.name: ModelStats() for route in self.routes}
+
+    @property
+    def primary(self) -> ModelRouteConfig:
+        return self.routes[0]
+
+    def timeout_for(self, route: ModelRouteConfig) -> float:
+        return route.timeout_seconds or settings.llm_timeout_seconds
+
+    def _demoted(self, route: ModelRouteConfig, task: str, now: float) -> bool:
+        stats = self.stats[route.name]
+        if stats.cooldown_until > now:
+            return True
+        # Slowness is only held against a model for a cooldown, so it gets tried again
+        target = settings.llm_latency_targets.get(task)
+        return target is not None and stats.latency_ewma is not None and stats.latency_ewma > target and \
+            now - stats.last_call < settings.llm_cooldown_seconds
+
+    def candidates(self, task: str, prompt_tokens: int) -> List[ModelRouteConfig]:
+        """Models to try for a prompt, best first"""
+        serving = [route for route in self.routes if task in route.tasks] or self.routes
+        fitting = [
+            route for route in serving
+            if route.max_prompt_tokens is None or prompt_tokens <= route.max_prompt_tokens
+        ]
+        too_small = sorted(
+            (route for route in serving if route not in fitting),
+            key=lambda route: -(route.max_prompt_tokens or math.inf)
+        )
+        now = time.monotonic()
+        # Stable sort: preference order is kept within each group
+        return sorted(fitting, key=lambda route: self._demoted(route, task, now)) + too_small
+
+    def record(self, name: str, latency: float, ok: bool, timed_out: bool = False):
+        """Account one finished call"""
+        stats = self.stats[name]
+        alpha = settings.llm_ewma_alpha
+        stats.calls += 1
+        stats.last_call = time.monotonic()
+        stats.latency_ewma = latency if stats.latency_ewma is None else \
+            alpha * latency + (1 - alpha) * stats.latency_ewma
+        stats.error_ewma = alpha * (0.0 if ok else 1.0) + (1 - alpha) * stats.error_ewma
+        if ok:
+            return
+        stats.errors += 1
+        if timed_out:
+            stats.timeouts += 1
+        if stats.error_ewma >= settings.llm_error_rate_threshold:
+            stats.cooldown_until = time.monotonic() + settings.llm_cooldown_seconds
+
+    def record_fallback(self, name: str):
+        self.stats[name].fallbacks += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            name: {
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "timeouts": stats.timeouts,
+                "fallbacks": stats.fallbacks,
+                "latency_ewma_seconds": round(stats.latency_ewma, 3) if stats.latency_ewma is not None else None,
+                "error_rate": round(stats.error_ewma, 3),
+                "cooling_down": stats.cooldown_until > now
+            }
+            for name, stats in self.stats.items()
+        }
+
+
+# Global model router instance
+model_router = ModelRouter(settings.llm_models)
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _ready() -> bool:
+    return True
+
+
+class ContentOffload:
+    """
+    Runs CPU-bound content transforms (enhancement, crawl merging, section
+    splitting) off the event loop. Content below min_chars is processed inline,
+    where a process hop would cost more than the work; larger content goes to a
+    process pool so one big page doesn't stall every other request on the worker.
+
+    Jobs and their arguments are pickled: pass bound methods of module-level
+    services or plain functions, and prefer results that refer to the content
+    (offsets, digests) over copies of it.
+    """
+
+    def __init__(self, workers: int, min_chars: int):
+        self.workers = workers
+        self.min_chars = min_chars
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Offloaded jobs submitted and not finished (running or queued for a worker)
+        self.pending = 0
+        self.stats: Dict[str, Any] = {
+            "inline": 0, "offloaded": 0, "max_pending": 0, "fallbacks": 0, "offload_seconds": 0.0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs threads (asyncio.to_thread, SDK clients) isn't safe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def run(self, fn: Callable[..., T], *args, size: int) -> T:
+        """
+        fn(*args), in the process pool when size (characters of content
+        handed over) reaches min_chars, otherwise inline
+        """
+        if not self.enabled or size < self.min_chars:
+            self.stats["inline"] += 1
+            return fn(*args)
+
+        self.pending += 1
+        self.stats["max_pending"] = max(self.stats["max_pending"], self.pending)
+        started = time.perf_counter()
+        try:
+            try:
+                future = asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+            except RuntimeError as e:
+                # submit() on a pool shut down under us ("cannot schedule new futures after shutdown")
+                raise BrokenProcessPool(str(e)) from e
+            result = await future
+        except BrokenProcessPool as e:
+            # A crashed worker or a closed pool: replace it, do this one on a thread (it's
+            # large, so not on the loop). Errors raised by fn itself propagate unchanged
+            logger.warning(f"Content offload unavailable, processing on a thread: {str(e)}")
+            self.stats["fallbacks"] += 1
+            self.shutdown(wait=False)
+            return await asyncio.to_thread(fn, *args)
+        finally:
+            self.pending -= 1
+        self.stats["offloaded"] += 1
+        self.stats["offload_seconds"] += time.perf_counter() - started
+        return result
+
+    async def start(self):
+        """
+        Start the workers ahead of the first large page (each imports the app)
+        """
+        if not self.enabled:
+            return
+        try:
+            pool = self._pool()
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(pool, _ready) for _ in range(self.workers)))
+        except Exception as e:
+            logger.error(f"Content offload warm-up failed: {str(e)}")
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "min_chars": self.min_chars,
+            "queue_depth": self.pending,
+            **self.stats,
+            "offload_seconds": round(self.stats["offload_seconds"], 3)
+        }
+
+
+# Global content offload instance
+content_offload = ContentOffload(workers=settings.offload_workers, min_chars=settings.offload_min_chars)
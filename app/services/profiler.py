@@ -0,0 +1,324 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+import weakref
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers
+
+from app.config import settings
+from app.utils.auth import api_key_for
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "x-profile-id"
+
+# The profile collecting the current request's tasks, if it is being profiled
+_current_profile: ContextVar[Optional["Profile"]] = ContextVar("current_profile", default=None)
+
+
+def _frame_label(frame) -> str:
+    # ";" separates frames in the folded format
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+    return f"{code.co_qualname} ({module}:{frame.f_lineno})".replace(";", ",")
+
+
+def _thread_stack(frame, stop_at=None) -> List[str]:
+    """Labels of a thread's frames, outermost first, up to (from) stop_at if it is on the stack"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        if frame is stop_at:
+            break
+        frame = frame.f_back
+    return labels[::-1]
+
+
+def _await_stack(coro) -> List[str]:
+    """
+    Labels of a suspended coroutine's await chain, outermost first, ending in
+    what it waits for (e.g. a Future set by a worker thread)
+    """
+    labels = []
+    awaited = coro
+    while awaited is not None:
+        frame = getattr(awaited, "cr_frame", None) or getattr(awaited, "gi_frame", None) or \
+            getattr(awaited, "ag_frame", None)
+        if frame is None:
+            break
+        labels.append(_frame_label(frame))
+        awaited = getattr(awaited, "cr_await", None) or getattr(awaited, "gi_yieldfrom", None) or \
+            getattr(awaited, "ag_await", None)
+    if awaited is not None:
+        # A C Future's await iterator stands for the Future itself
+        kind = type(awaited).__name__
+        labels.append(f"[awaiting {'Future' if kind == 'FutureIter' else kind}]")
+    return labels
+
+
+class Profile:
+    """
+    A wall-clock sampling profile: every interval, the stack of each task
+    being profiled is recorded, whether it is running (its thread's frames)
+    or waiting (its await chain), so time spent waiting on upstreams shows as
+    clearly as CPU time. A request profile follows the request's task and the
+    tasks it starts; a worker profile samples every task and thread. Stacks
+    are kept in the folded format flame graph tools read ("a;b;c count"). An
+    allocation snapshot diff (tracemalloc) is taken over the same period.
+    """
+
+    def __init__(self, label: str, interval: float, whole_worker: bool, top_allocations: int):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.interval = interval
+        self.whole_worker = whole_worker
+        self.top_allocations = top_allocations
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.allocations: List[str] = []
+        self.started_at = time.time()
+        self.duration: Optional[float] = None
+        self.tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._own_task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.duration is not None
+
+    def _tasks(self) -> List[asyncio.Task]:
+        if not self.whole_worker:
+            return list(self.tasks)
+        return [task for task in asyncio.all_tasks(self._loop) if task is not self._own_task]
+
+    def sample(self):
+        """Record one sample of every profiled task (and, for the worker, every thread)"""
+        frames = sys._current_frames()
+        loop_frame = frames.get(self._loop_thread)
+        running = _running_tasks().get(self._loop)
+        for task in self._tasks():
+            if task.done():
+                continue
+            coro = task.get_coro()
+            root = f"task {getattr(coro, '__qualname__', type(coro).__name__)}"
+            if task is running and loop_frame is not None:
+                stack = _thread_stack(loop_frame, stop_at=getattr(coro, "cr_frame", None))
+            else:
+                stack = _await_stack(coro)
+            self.stacks[";".join([root] + stack)] += 1
+        if self.whole_worker:
+            for thread in threading.enumerate():
+                frame = frames.get(thread.ident)
+                if frame is None or thread.ident == threading.get_ident():
+                    continue
+                # The loop thread's stack only says something when no task runs on it
+                if thread.ident == self._loop_thread and running is not None:
+                    continue
+                self.stacks[";".join([f"thread {thread.name}"] + _thread_stack(frame))] += 1
+        self.samples += 1
+
+    def _run_sampler(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                # Tasks and frames change under the sampler; skip the sample
+                logger.debug(f"Profile sample skipped: {str(e)}")
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._own_task = asyncio.current_task()
+        _tracing.acquire()
+        self._sampler = threading.Thread(target=self._run_sampler, name=f"profiler-{self.id[:8]}", daemon=True)
+        self._sampler.start()
+
+    def take_baseline(self):
+        """Allocation snapshot the profile's diff starts from (blocking: run off the loop)"""
+        self._snapshot = tracemalloc.take_snapshot()
+
+    def stop(self):
+        """Stop sampling and diff allocations (blocking: run off the loop)"""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(self.interval * 10)
+        try:
+            if self._snapshot is not None:
+                after = tracemalloc.take_snapshot()
+                self.allocations = [
+                    str(stat) for stat in after.compare_to(self._snapshot, "lineno")[:self.top_allocations]
+                ]
+        finally:
+            self._snapshot = None
+            _tracing.release()
+        self.duration = time.time() - self.started_at
+
+    def folded(self) -> str:
+        """Stacks in the folded format (flamegraph.pl, speedscope, inferno)"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def allocations_report(self) -> str:
+        header = f"# Allocations during {self.label} ({self.duration or 0:.2f}s), by line, largest growth first\n"
+        return header + "".join(f"{line}\n" for line in self.allocations)
+
+
+def _running_tasks() -> Dict[asyncio.AbstractEventLoop, asyncio.Task]:
+    # The task each event loop is running right now (readable from the sampler thread)
+    return getattr(asyncio.tasks, "_current_tasks", {})
+
+
+class _Tracing:
+    """tracemalloc shared by overlapping profiles: on while any is running"""
+
+    def __init__(self):
+        self._users = 0
+        self._ours = False
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._ours = True
+            self._users += 1
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            if self._users == 0 and self._ours:
+                tracemalloc.stop()
+                self._ours = False
+
+
+_tracing = _Tracing()
+
+
+class Profiler:
+    """
+    On-demand profiling of live requests (X-Profile header) or of the whole
+    worker for a few seconds. Nothing is installed until a profile starts:
+    the task factory that attributes new tasks to the request being profiled,
+    the sampler thread and tracemalloc all run only while one is active.
+    """
+
+    def __init__(self, keep: int):
+        self.profiles = TTLCache(max_entries=keep, ttl_seconds=3600)
+        self._active = 0
+        self._previous_factory = None
+
+    def _task_factory(self, loop, coro, **kwargs):
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        # Called in the creating task's context: tasks started by a profiled request are profiled
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.tasks.add(task)
+        return task
+
+    def _install(self):
+        if self._active == 0:
+            loop = asyncio.get_running_loop()
+            self._previous_factory = loop.get_task_factory()
+            loop.set_task_factory(self._task_factory)
+        self._active += 1
+
+    def _uninstall(self):
+        self._active -= 1
+        if self._active == 0:
+            asyncio.get_running_loop().set_task_factory(self._previous_factory)
+            self._previous_factory = None
+
+    async def start(self, label: str, whole_worker: bool = False) -> Profile:
+        profile = Profile(
+            label,
+            interval=settings.profiling_sample_interval_seconds,
+            whole_worker=whole_worker,
+            top_allocations=settings.profiling_top_allocations
+        )
+        if not whole_worker:
+            self._install()
+            profile.tasks.add(asyncio.current_task())
+            _current_profile.set(profile)
+        profile.start()
+        self.profiles.set(profile.id, profile)
+        # Snapshots walk every traced allocation: seconds on a large heap, so
+        # they (and the sampler join and diff on stop) stay off the event loop
+        try:
+            await asyncio.to_thread(profile.take_baseline)
+        except BaseException:
+            # e.g. the client went away: don't leave the factory or tracemalloc on
+            await self.stop(profile)
+            raise
+        return profile
+
+    async def stop(self, profile: Profile):
+        if not profile.whole_worker:
+            _current_profile.set(None)
+            self._uninstall()
+        await asyncio.to_thread(profile.stop)
+        logger.info(f"Profile {profile.id} of {profile.label}: {profile.samples} samples")
+
+    async def capture(self, seconds: float) -> Profile:
+        """Profile the whole worker for a number of seconds"""
+        profile = await self.start(f"worker for {seconds:g}s", whole_worker=True)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await self.stop(profile)
+        return profile
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self.profiles.get(profile_id)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a request carrying an X-Profile header and a valid API key, when
+    profiling is enabled; the response's X-Profile-Id names the profile to
+    download. Every other request passes straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.profiling_enabled:
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if PROFILE_HEADER not in headers or scheme.lower() != "bearer" or api_key_for(token) is None:
+            return await self.app(scope, receive, send)
+
+        profile = await profiler.start(f"{scope['method']} {scope['path']}")
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (PROFILE_ID_HEADER.encode(), profile.id.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            await profiler.stop(profile)
+
+
+# Global profiler instance
+profiler = Profiler(keep=settings.profiling_keep)
@@ -0,0 +1,188 @@
+import hashlib
+import math
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.config import settings
+
+_HEADING = re.compile(r"^#{1,6}\s+(.*)$", re.MULTILINE)
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Keywords that identify the kinds of sections business analysis cares about
+SECTION_KEYWORDS: Dict[str, Sequence[str]] = {
+    "contact": ("contact", "email", "phone", "address", "get in touch", "reach us", "support"),
+    "about": ("about", "company", "team", "who we are", "mission", "history", "headquarters",
+              "founded", "employees", "careers", "leadership", "locations", "office"),
+    "pricing": ("pricing", "price", "plans", "cost", "subscription", "per month", "billing"),
+    "products": ("product", "service", "solution", "features", "platform", "offering", "use cases"),
+}
+
+_KEYWORD_PATTERNS = {
+    kind: re.compile("|".join(re.escape(keyword) for keyword in keywords))
+    for kind, keywords in SECTION_KEYWORDS.items()
+}
+_MAX_KEYWORD_HITS = 5
+# Keyword density is judged on the start of a section, where its topic is set
+_KEYWORD_SCAN_CHARS = 2000
+
+# Relative importance of each section kind per task
+TASK_PRIORITIES: Dict[str, Dict[str, float]] = {
+    "insights": {"contact": 3.0, "about": 3.0, "products": 2.5, "pricing": 1.5},
+    "chat": {"contact": 2.0, "about": 2.0, "products": 2.0, "pricing": 2.0},
+}
+
+
+@dataclass
+class Section:
+    """A heading-delimited slice of page content, stored as offsets into it"""
+    title: str
+    start: int
+    end: int
+    tokens: int
+    # Fingerprint of the section text, used to diff re-scraped content
+    hash: str = ""
+
+    def text(self, content: str) -> str:
+        return content[self.start:self.end]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Section":
+        return cls(
+            title=data["title"],
+            start=data["start"],
+            end=data["end"],
+            tokens=data["tokens"],
+            hash=data.get("hash", "")
+        )
+
+
+def section_hash(text: str) -> str:
+    """
+    Short fingerprint of a section's text, insensitive to surrounding whitespace
+    """
+    return hashlib.sha1(text.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate Gemini token count from character length
+    """
+    return math.ceil(len(text) / settings.chars_per_token) if text else 0
+
+
+class PromptBuilder:
+    """
+    Fits page content into a per-model token budget by keeping the sections most
+    relevant to the task (contact, about, pricing, products) in page order.
+    """
+
+    def __init__(self, max_section_tokens: int = 2000):
+        self.max_section_tokens = max_section_tokens
+
+    def split_sections(self, content: str) -> List[Section]:
+        """
+        Split content on markdown headings; oversized sections are chunked on paragraph breaks
+        """
+        boundaries = [m.start() for m in _HEADING.finditer(content)]
+        if not boundaries or boundaries[0] != 0:
+            boundaries.insert(0, 0)
+        boundaries.append(len(content))
+
+        sections: List[Section] = []
+        for start, end in zip(boundaries, boundaries[1:]):
+            if start == end:
+                continue
+            match = _HEADING.match(content, start)
+            title = match.group(1).strip() if match else ""
+            sections.extend(self._chunk(content, title, start, end))
+        return sections
+
+    def _chunk(self, content: str, title: str, start: int, end: int) -> List[Section]:
+        max_chars = int(self.max_section_tokens * settings.chars_per_token)
+        chunks = []
+        while end - start > max_chars:
+            cut = content.rfind("\n\n", start, start + max_chars)
+            if cut <= start:
+                cut = start + max_chars
+            chunks.append(self._section(content, title, start, cut))
+            start = cut
+        chunks.append(self._section(content, title, start, end))
+        return chunks
+
+    def _section(self, content: str, title: str, start: int, end: int) -> Section:
+        text = content[start:end]
+        return Section(title, start, end, estimate_tokens(text), section_hash(text))
+
+    def budget_for(self, model_name: str) -> int:
+        return settings.prompt_token_budgets.get(model_name, settings.default_prompt_token_budget)
+
+    def score(self, section: Section, text: str, task: str, query_terms: Optional[set] = None) -> float:
+        priorities = TASK_PRIORITIES.get(task, TASK_PRIORITIES["chat"])
+        title = section.title.lower()
+        body = text.lower()
+        score = 0.0
+        for kind, pattern in _KEYWORD_PATTERNS.items():
+            weight = priorities.get(kind, 1.0)
+            if pattern.search(title):
+                score += 3 * weight
+            hits = 0
+            for _ in pattern.finditer(body, 0, _KEYWORD_SCAN_CHARS):
+                hits += 1
+                if hits == _MAX_KEYWORD_HITS:
+                    break
+            score += weight * hits * 0.2
+        if query_terms:
+            score += 4.0 * sum(1 for term in query_terms if term in title or term in body)
+        # Prefer dense sections: a long section must earn its budget
+        return score / math.sqrt(max(section.tokens, 1) / 100 + 1)
+
+    def fit(
+        self,
+        content: str,
+        task: str,
+        model_name: str,
+        reserved_tokens: int = 0,
+        query: Optional[str] = None,
+        sections: Optional[List[Section]] = None
+    ) -> str:
+        """
+        Return content that fits the model's prompt budget minus reserved tokens.
+        Content already within budget is returned unchanged.
+        """
+        budget = self.budget_for(model_name) - reserved_tokens - settings.prompt_response_reserve_tokens
+        sections = sections if sections is not None else self.split_sections(content)
+        if sum(s.tokens for s in sections) <= budget:
+            return content
+        budget = max(budget, 0)
+
+        query_terms = {w for w in _WORD.findall(query.lower()) if len(w) > 2} if query else None
+        ranked = sorted(
+            range(len(sections)),
+            key=lambda i: (-(self.score(sections[i], sections[i].text(content), task, query_terms)
+                             + (1.0 if i == 0 else 0.0)), i)
+        )
+
+        chosen, used = [], 0
+        for index in ranked:
+            if used + sections[index].tokens <= budget:
+                chosen.append(index)
+                used += sections[index].tokens
+        if not chosen and sections:
+            # Nothing fits whole: keep the best section, truncated
+            best = sections[ranked[0]]
+            max_chars = int(budget * settings.chars_per_token)
+            return best.text(content)[:max_chars]
+
+        omitted = len(sections) - len(chosen)
+        parts = [sections[i].text(content).strip() for i in sorted(chosen)]
+        if omitted:
+            parts.append(f"[{omitted} lower-priority sections omitted to fit the token budget]")
+        return "\n\n".join(parts)
+
+
+# Global prompt builder instance
+prompt_builder = PromptBuilder()
@@ -0,0 +1,216 @@
+import asyncio
+import contextvars
+import heapq
+import logging
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.services.answer_cache import chat_answer_cache
+from app.services.chat_sessions import chat_sessions
+from app.services.analyzer import MODE_UNCHANGED, parse_timestamp, website_analyzer
+from app.services.crawler import is_crawled_content, site_crawler
+from app.services.database import db_service
+from app.services.embeddings import embedder, to_list
+from app.services.offload import content_offload
+from app.services.prompt_builder import prompt_builder
+from app.services.scraper import scraper_service
+from app.services.similarity import similarity_service
+from app.utils.cache import content_hash
+from app.utils.token_bucket import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_priority(age_seconds: float, chat_count: int, max_age_seconds: float) -> float:
+    """
+    Staleness in units of max age, boosted logarithmically by recent chat activity
+    so busy sites are refreshed first without starving quiet ones
+    """
+    return (age_seconds / max_age_seconds) * (1 + math.log1p(chat_count))
+
+
+class FreshnessScheduler:
+    """
+    Keeps stored analyses fresh in the background. Every interval it queues
+    analyses older than max_age by priority (staleness x chat activity),
+    re-scrapes as many as the upstream page budget allows, and only calls
+    the LLM for pages whose content changed.
+    """
+
+    def __init__(
+        self,
+        max_age_seconds: float,
+        interval_seconds: float,
+        pages_per_hour: float,
+        concurrency: int,
+        activity_window_seconds: float,
+        scan_limit: int
+    ):
+        self.max_age_seconds = max_age_seconds
+        self.interval_seconds = interval_seconds
+        self.concurrency = concurrency
+        self.activity_window_seconds = activity_window_seconds
+        self.scan_limit = scan_limit
+        # Unused budget carries over for at most one interval
+        self.budget = TokenBucket(
+            rate=pages_per_hour / 3600,
+            capacity=max(pages_per_hour * interval_seconds / 3600, settings.crawl_max_pages)
+        )
+        self._queue: List[Tuple[float, str]] = []
+        self._task: Optional[asyncio.Task] = None
+        # URLs being refreshed right now, by the scheduler or an on-demand revalidation
+        self._in_flight: Set[str] = set()
+        self.stats: Dict[str, int] = {"refreshed": 0, "unchanged": 0, "failed": 0}
+
+    async def plan(self) -> int:
+        """
+        Rebuild the refresh queue from the database; returns the number of stale analyses
+        """
+        now = datetime.now(timezone.utc)
+        cutoff = (now - timedelta(seconds=self.max_age_seconds)).isoformat()
+        since = (now - timedelta(seconds=self.activity_window_seconds)).isoformat()
+
+        records = await db_service.get_analyses_updated_before(cutoff, self.scan_limit)
+        activity = await db_service.get_chat_activity(since)
+
+        queue: List[Tuple[float, str]] = []
+        for record in records:
+            if record["url"] in self._in_flight:
+                continue
+            updated_at = parse_timestamp(record.get("updated_at"))
+            age = (now - updated_at).total_seconds() if updated_at else self.max_age_seconds
+            priority = refresh_priority(age, activity.get(record["url"], 0), self.max_age_seconds)
+            heapq.heappush(queue, (-priority, record["url"]))
+        self._queue = queue
+        return len(queue)
+
+    async def run_once(self) -> int:
+        """
+        Plan, then refresh the most urgent analyses the budget allows; returns how many were started
+        """
+        await self.plan()
+
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+        while self._queue:
+            url = self._queue[0][1]
+            previous = await db_service.get_website_analysis(url)
+            if not previous:
+                heapq.heappop(self._queue)
+                continue
+            # Crawled sites are re-crawled, which costs up to one upstream read per page
+            cost = settings.crawl_max_pages if is_crawled_content(previous.get("raw_content") or "") else 1
+            if not self.budget.try_acquire(cost):
+                break
+            heapq.heappop(self._queue)
+            batch.append((url, previous))
+
+        if not batch:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def guarded(url: str, previous: Dict[str, Any]) -> str:
+            async with semaphore:
+                self._in_flight.add(url)
+                try:
+                    return await self.refresh(url, previous)
+                finally:
+                    self._in_flight.discard(url)
+
+        results = await asyncio.gather(*(guarded(url, previous) for url, previous in batch), return_exceptions=True)
+        for (url, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                self.stats["failed"] += 1
+                logger.warning(f"Freshness refresh failed for {url}: {str(result)}")
+        return len(batch)
+
+    async def refresh(self, url: str, previous: Dict[str, Any]) -> str:
+        """
+        Re-scrape one stored analysis; returns how its insights were produced
+        """
+        if is_crawled_content(previous.get("raw_content") or ""):
+            content = await site_crawler.crawl_website(url)
+        else:
+            content = await scraper_service.scrape_website(url)
+        digest = content_hash(content)
+
+        if digest == previous.get("content_hash") and previous.get("insights"):
+            await db_service.touch_website_analysis(url)
+            self.stats["unchanged"] += 1
+            return MODE_UNCHANGED
+
+        sections = await content_offload.run(prompt_builder.split_sections, content, size=len(content))
+        insights, mode = await website_analyzer.extract_insights(content, sections, previous)
+        embedding = embedder.embed_insights(insights)
+        await db_service.store_website_analysis(
+            url=url,
+            raw_content=content,
+            insights=insights,
+            token_count=sum(section.tokens for section in sections),
+            sections=[section.to_dict() for section in sections],
+            content_hash=digest,
+            embedding=to_list(embedding) if embedding is not None else None
+        )
+        similarity_service.update(url, embedding)
+        chat_answer_cache.invalidate(url)
+        chat_sessions.invalidate(url)
+        self.stats["unchanged" if mode == MODE_UNCHANGED else "refreshed"] += 1
+        logger.info(f"Refreshed {url} ({mode})")
+        return mode
+
+    async def revalidate(self, url: str) -> None:
+        """
+        Refresh one analysis on demand (after a stale read); concurrent requests
+        for the same URL trigger a single refresh
+        """
+        if url in self._in_flight:
+            return
+        self._in_flight.add(url)
+        # Started from the stale read's context, it would inherit that request's
+        # deadline and API key: run it in a fresh one (no deadline, system caller)
+        await asyncio.create_task(self._revalidate(url), context=contextvars.Context())
+
+    async def _revalidate(self, url: str) -> None:
+        try:
+            previous = await db_service.get_website_analysis(url)
+            if previous:
+                await self.refresh(url, previous)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.warning(f"Revalidation failed for {url}: {str(e)}")
+        finally:
+            self._in_flight.discard(url)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Freshness scheduler error: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global freshness scheduler instance
+freshness_scheduler = FreshnessScheduler(
+    max_age_seconds=settings.freshness_max_age_seconds,
+    interval_seconds=settings.freshness_interval_seconds,
+    pages_per_hour=settings.freshness_pages_per_hour,
+    concurrency=settings.freshness_concurrency,
+    activity_window_seconds=settings.freshness_activity_window_seconds,
+    scan_limit=settings.freshness_scan_limit
+)
@@ -0,0 +1,82 @@
+import base64
+import json
+import re
+import uuid
+from datetime import datetime
+from typing import Optional, Tuple
+
+from app.models.schemas import AnalysisListResponse, AnalysisSummary
+from app.services.database import db_service
+
+# Only these columns are read for listings; raw_content and insights stay on disk
+SUMMARY_COLUMNS = "id, url, industry, location, company_size, updated_at"
+
+# PostgREST wildcards and logic-tree delimiters are not allowed in facet values
+_FACET_UNSAFE = re.compile(r'[*%,()"\\]')
+
+
+def encode_cursor(updated_at: str, row_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([updated_at, row_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a listing cursor; raises ValueError if it is malformed. Both values
+    end up in a PostgREST filter, so they are parsed (a timestamp and a UUID)
+    and re-serialized rather than passed through as given.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(updated_at).isoformat(), str(uuid.UUID(row_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class SearchService:
+    """
+    Listing and full-text/faceted search over stored analyses. Pages are keyset
+    paginated newest first, so deep pages cost the same as the first one.
+    """
+
+    async def list_analyses(
+        self,
+        text_query: Optional[str] = None,
+        industry: Optional[str] = None,
+        location: Optional[str] = None,
+        company_size: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> AnalysisListResponse:
+        """
+        One page of analyses matching the query and facet filters
+        """
+        facets = {"industry": industry, "location": location, "company_size": company_size}
+        filters = {}
+        for column, value in facets.items():
+            value = _FACET_UNSAFE.sub(" ", value or "").strip()
+            if value:
+                filters[column] = value
+
+        rows = await db_service.search_analyses(
+            SUMMARY_COLUMNS,
+            text_query=(text_query or "").strip() or None,
+            filters=filters,
+            before=decode_cursor(cursor) if cursor else None,
+            # One extra row tells whether another page exists
+            limit=limit + 1
+        )
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
+
+        return AnalysisListResponse(
+            items=[AnalysisSummary(**row) for row in rows],
+            next_cursor=next_cursor
+        )
+
+
+# Global search service instance
+search_service = SearchService()
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.bulk import bulk_service
+from app.services.database import db_service
+from app.services.embeddings import embeddable, embedder
+from app.utils.vector_index import IVFIndex
+
+logger = logging.getLogger(__name__)
+
+# Columns read when loading the index at startup
+INDEX_COLUMNS = ["id", "url", "insights", "embedding", "updated_at"]
+
+
+class SimilarityService:
+    """
+    "Companies like this one": every analysis with default insights is embedded
+    locally and kept in an in-process vector index. The index is loaded from the
+    stored embeddings at startup and updated as analyses are stored.
+    """
+
+    def __init__(self, dimensions: int, nprobe: int):
+        self.index = IVFIndex(dimensions, nprobe=nprobe)
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+        self._training: Optional[asyncio.Task] = None
+
+    def _vector(self, row: Dict[str, Any]) -> Optional[np.ndarray]:
+        if not embeddable(row.get("insights")):
+            return None
+        stored = row.get("embedding")
+        if stored and len(stored) == self.index.dim:
+            return np.asarray(stored, dtype=np.float32)
+        # Stored before embeddings existed, or with other dimensions
+        return embedder.embed_insights(row.get("insights"))
+
+    async def load(self) -> int:
+        """
+        Build the index from all stored analyses; returns the number indexed
+        """
+        async for rows in bulk_service.iter_batches("website_analyses", columns=INDEX_COLUMNS):
+            items = []
+            for row in rows:
+                vector = self._vector(row)
+                if vector is not None:
+                    items.append((row["url"], vector))
+            self.index.add_many(items)
+        if self.index.needs_training:
+            await asyncio.to_thread(self.index.train)
+        self.ready = True
+        logger.info(f"Similarity index loaded: {len(self.index)} analyses")
+        return len(self.index)
+
+    async def _load(self):
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Similarity index load error: {str(e)}")
+
+    async def _train(self):
+        try:
+            await asyncio.to_thread(self.index.train)
+        except Exception as e:
+            logger.error(f"Similarity index training error: {str(e)}")
+
+    def update(self, url: str, vector: Optional[np.ndarray]):
+        """
+        Index the embedding of a freshly stored analysis (None removes the URL);
+        nothing is kept while similar-company search is disabled
+        """
+        if not settings.similarity_enabled:
+            return
+        if vector is None:
+            self.index.remove(url)
+            return
+        self.index.add(url, vector)
+        # Re-partition in the background once the index has outgrown its partitions
+        if self.ready and self.index.needs_training and (self._training is None or self._training.done()):
+            self._training = asyncio.get_running_loop().create_task(self._train())
+
+    async def find_similar(self, url: str, limit: int = 10) -> Optional[List[Tuple[str, float]]]:
+        """
+        The analyses most similar to url as (url, score), best first, or None if
+        url has no embeddable analysis
+        """
+        vector = self.index.get(url)
+        if vector is None:
+            record = await db_service.get_website_analysis(url, columns="url, insights")
+            vector = embedder.embed_insights((record or {}).get("insights"))
+            if vector is None:
+                return None
+        return self.index.search(vector, limit, exclude=url)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._load())
+
+    async def stop(self):
+        for task in (self._task, self._training):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+
+# Global similarity service instance
+similarity_service = SimilarityService(settings.similarity_dimensions, settings.similarity_nprobe)
@@ -0,0 +1,253 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.database import db_service, website_analysis_row
+
+logger = logging.getLogger(__name__)
+
+# One queued write: (table, conflict column, row)
+Write = Tuple[str, str, Dict[str, Any]]
+
+
+def coalesce(writes: List[Write]) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+    """
+    Group writes into bulk upserts per table. Writes to the same row are merged
+    (later values win), since one upsert can't touch a row twice; rows are then
+    split by column set, as a bulk insert takes its columns from the first row.
+    """
+    merged: Dict[Tuple[str, str], Dict[Any, Dict[str, Any]]] = {}
+    for table, on_conflict, row in writes:
+        rows = merged.setdefault((table, on_conflict), {})
+        key = row[on_conflict]
+        rows[key] = {**rows[key], **row} if key in rows else dict(row)
+
+    groups = []
+    for (table, on_conflict), rows in merged.items():
+        by_columns: Dict[frozenset, List[Dict[str, Any]]] = {}
+        for row in rows.values():
+            by_columns.setdefault(frozenset(row), []).append(row)
+        groups.extend((table, on_conflict, batch) for batch in by_columns.values())
+    return groups
+
+
+def _spool_line(write: Write) -> str:
+    table, on_conflict, row = write
+    return json.dumps({"table": table, "on_conflict": on_conflict, "row": row}, default=str) + "\n"
+
+
+class WriteBehindQueue:
+    """
+    Acknowledges non-critical writes immediately and persists them in the
+    background as batched upserts. When the database is unreachable, batches
+    are appended to a local spool file and replayed, in order, once it is back;
+    while the spool holds anything, new batches go behind it so an older write
+    never overwrites a newer one. Queued writes are kept in memory until
+    flushed, so a crash can lose up to one flush interval of writes; past
+    max_pending, callers wait for a flush (backpressure).
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        flush_interval_seconds: float,
+        batch_size: int,
+        max_pending: int,
+        spool_path: str
+    ):
+        self.enabled = enabled
+        self.flush_interval_seconds = flush_interval_seconds
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.spool_path = spool_path
+        self._pending: List[Write] = []
+        # Batch being written right now; still visible to pending_rows()
+        self._flushing: List[Write] = []
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Replay backoff while the database is unreachable
+        self._retry_delay = flush_interval_seconds
+        self._retry_at = 0.0
+        self.stats: Dict[str, int] = {"written": 0, "batches": 0, "spooled": 0, "replayed": 0, "failures": 0}
+
+    async def enqueue(self, table: str, row: Dict[str, Any], on_conflict: str):
+        self._pending.append((table, on_conflict, row))
+        if len(self._pending) >= self.max_pending:
+            # The flusher can't keep up: write on the caller's time
+            await self.flush()
+        elif len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def pending_rows(self, table: str, **match) -> List[Dict[str, Any]]:
+        """
+        Queued rows of table whose columns equal match, oldest first
+        (read-your-writes for rows not yet in the database)
+        """
+        return [
+            row for queued_table, _, row in self._flushing + self._pending
+            if queued_table == table and all(row.get(column) == value for column, value in match.items())
+        ]
+
+    def pending_row(self, table: str, key_column: str, key: Any) -> Optional[Dict[str, Any]]:
+        """
+        Merged queued columns for one row, or None if nothing is queued for it
+        """
+        rows = self.pending_rows(table, **{key_column: key})
+        if not rows:
+            return None
+        merged: Dict[str, Any] = {}
+        for row in rows:
+            merged.update(row)
+        return merged
+
+    async def store_website_analysis(self, url: str, raw_content: str, **fields) -> Optional[str]:
+        """
+        Queue db_service.store_website_analysis; writes directly when disabled
+        """
+        if not self.enabled:
+            return await db_service.store_website_analysis(url=url, raw_content=raw_content, **fields)
+        await self.enqueue("website_analyses", website_analysis_row(url, raw_content, **fields), on_conflict="url")
+        return None
+
+    async def store_conversation(self, url: str, query: str, response: str, session_id: Optional[str] = None) -> str:
+        """
+        Queue db_service.store_conversation; writes directly when disabled
+        """
+        if not self.enabled:
+            return await db_service.store_conversation(url=url, query=query, response=response, session_id=session_id)
+        # IDs are assigned here so replaying a spooled batch is idempotent
+        row = {
+            "id": str(uuid.uuid4()),
+            "url": url,
+            "session_id": session_id,
+            "query": query,
+            "response": response,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        await self.enqueue("conversations", row, on_conflict="id")
+        return row["id"]
+
+    async def _write(self, writes: List[Write]):
+        for table, on_conflict, rows in coalesce(writes):
+            for begin in range(0, len(rows), self.batch_size):
+                self.stats["written"] += await db_service.upsert_rows(
+                    table, rows[begin:begin + self.batch_size], on_conflict=on_conflict
+                )
+                self.stats["batches"] += 1
+
+    # Spool file IO (appends with fsync, full reads and rewrites) blocks: it runs on
+    # a worker thread, under the flush lock so only one touches the file at a time
+    def _spool(self, writes: List[Write]):
+        with open(self.spool_path, "a", encoding="utf-8") as spool:
+            spool.writelines(_spool_line(write) for write in writes)
+            spool.flush()
+            os.fsync(spool.fileno())
+        self.stats["spooled"] += len(writes)
+
+    def _has_spool(self) -> bool:
+        return os.path.exists(self.spool_path) and os.path.getsize(self.spool_path) > 0
+
+    def _read_spool(self) -> List[Write]:
+        writes = []
+        with open(self.spool_path, encoding="utf-8") as spool:
+            for line in spool:
+                try:
+                    entry = json.loads(line)
+                    writes.append((entry["table"], entry["on_conflict"], entry["row"]))
+                except (ValueError, KeyError, TypeError):
+                    # A torn last line from a crash mid-append
+                    logger.warning(f"Skipping unreadable write-behind spool line: {line[:80]!r}")
+        return writes
+
+    def _rewrite_spool(self, writes: List[Write]):
+        """Replace the spool with what is left, atomically"""
+        temporary = f"{self.spool_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as spool:
+            spool.writelines(_spool_line(write) for write in writes)
+        os.replace(temporary, self.spool_path)
+
+    async def _replay(self):
+        """
+        Write spooled batches in order; whatever fails stays spooled
+        """
+        writes = await asyncio.to_thread(self._read_spool)
+        done = 0
+        try:
+            for begin in range(0, len(writes), self.batch_size):
+                await self._write(writes[begin:begin + self.batch_size])
+                done = begin + self.batch_size
+        finally:
+            self.stats["replayed"] += min(done, len(writes))
+            await asyncio.to_thread(self._rewrite_spool, writes[done:])
+        logger.info(f"Replayed {len(writes)} spooled writes")
+
+    async def flush(self):
+        """
+        Write everything queued; on failure it is spooled for replay
+        """
+        async with self._lock:
+            self._flushing, self._pending = self._pending, []
+            spooled = False
+            try:
+                if await asyncio.to_thread(self._has_spool):
+                    # Keep order: new writes go behind the spooled ones
+                    if self._flushing:
+                        await asyncio.to_thread(self._spool, self._flushing)
+                        spooled = True
+                    if time.monotonic() >= self._retry_at:
+                        await self._replay()
+                elif self._flushing:
+                    await self._write(self._flushing)
+                self._retry_delay = self.flush_interval_seconds
+            except Exception as e:
+                self.stats["failures"] += 1
+                self._retry_delay = min(self._retry_delay * 2, 30.0)
+                self._retry_at = time.monotonic() + self._retry_delay
+                logger.warning(f"Write-behind flush failed, spooling to {self.spool_path}: {str(e)}")
+                if self._flushing and not spooled:
+                    await asyncio.to_thread(self._spool, self._flushing)
+            finally:
+                self._flushing = []
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the flusher and write (or spool) whatever is still queued
+        """
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self.enabled:
+            await self.flush()
+
+
+# Global write-behind queue instance
+write_behind = WriteBehindQueue(
+    enabled=settings.write_behind_enabled,
+    flush_interval_seconds=settings.write_behind_flush_interval_seconds,
+    batch_size=settings.write_behind_batch_size,
+    max_pending=settings.write_behind_max_pending,
+    spool_path=settings.write_behind_spool_path
+)
@@ -0,0 +1,107 @@
+import asyncio
+import math
+from collections import deque
+from typing import Any, Deque, Dict
+
+from fastapi import HTTPException, status
+
+
+class Saturated(Exception):
+    """The endpoint's in-flight limit and wait queue are both full (or the wait timed out)"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("saturated")
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """
+    Bounds one endpoint's concurrent requests: up to max_in_flight run, up to
+    max_queue more wait in arrival order for at most queue_timeout seconds, and
+    the rest are turned away at once. An overloaded worker then answers 503
+    quickly instead of holding thousands of requests on slow upstreams.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_queue = max(max_queue, 0)
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.stats: Dict[str, int] = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    @property
+    def retry_after(self) -> int:
+        return max(math.ceil(self.queue_timeout), 1)
+
+    async def acquire(self):
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            return
+        if self.queued >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise Saturated(self.retry_after)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise Saturated(self.retry_after)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Handed a slot just as the client went away: pass it on
+                self.release()
+            raise
+        finally:
+            self.queued -= 1
+        self.stats["admitted"] += 1
+
+    def release(self):
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self.max_in_flight:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    @property
+    def saturation(self) -> float:
+        """Share of the wait queue in use (1.0 = new requests are rejected)"""
+        return self.queued / self.max_queue if self.max_queue else float(self.in_flight >= self.max_in_flight)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            **self.stats
+        }
+
+
+def admission(gate: AdmissionGate):
+    """
+    Route dependency holding one of the gate's slots for the whole request;
+    503 with Retry-After when the endpoint is saturated
+    """
+    async def dependency():
+        try:
+            await gate.acquire()
+        except Saturated as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Server busy: too many {gate.name} requests in progress, retry later",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        try:
+            yield
+        finally:
+            gate.release()
+
+    return dependency
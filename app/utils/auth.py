@@ -1,19 +1,93 @@
-from fastapi import HTTPException, status, Depends
+import hmac
+import math
+from typing import Dict, Optional
+from fastapi import HTTPException, WebSocket, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.config import settings
+from app.config import ApiKeyConfig, settings
+from app.services.fair_scheduler import Caller, current_caller
+from app.utils.token_bucket import TokenBucket
 
 
 security = HTTPBearer()
 
+# Per-key request quotas, created on first use
+_quotas: Dict[str, TokenBucket] = {}
+
+
+def configured_keys() -> Dict[str, ApiKeyConfig]:
+    """
+    Accepted API keys by secret: the named keys plus the shared api_secret_key
+    """
+    keys = dict(settings.api_keys)
+    # An unset key must not accept an empty token
+    if settings.api_secret_key:
+        keys.setdefault(settings.api_secret_key, ApiKeyConfig(name="default"))
+    return keys
+
+
+def api_key_for(token: str) -> Optional[ApiKeyConfig]:
+    match = None
+    for secret, key in configured_keys().items():
+        # Compare every key in constant time; don't stop at the first match
+        if hmac.compare_digest(secret.encode(), token.encode()):
+            match = key
+    return match
+
 
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Verify the bearer token for API authentication
     """
-    if credentials.credentials != settings.api_secret_key:
+    if api_key_for(credentials.credentials) is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
     return credentials.credentials
+
+
+def websocket_api_key(websocket: WebSocket) -> Optional[ApiKeyConfig]:
+    """
+    The API key of a WebSocket handshake: a Bearer Authorization header, or a
+    token query parameter (browsers can't set headers on WebSocket requests)
+    """
+    scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = websocket.query_params.get("token", "")
+    return api_key_for(token) if token else None
+
+
+def charge_quota(key: ApiKeyConfig):
+    """
+    Take one request from the key's per-minute quota; 429 when it is used up
+    """
+    if key.requests_per_minute is None:
+        return
+    bucket = _quotas.get(key.name)
+    if bucket is None or bucket.capacity != key.requests_per_minute:
+        bucket = _quotas[key.name] = TokenBucket(
+            rate=key.requests_per_minute / 60.0, capacity=key.requests_per_minute
+        )
+    if not bucket.try_acquire():
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Quota of {key.requests_per_minute} requests per minute exceeded for API key '{key.name}'",
+            headers={"Retry-After": str(max(math.ceil(bucket.time_until()), 1))},
+        )
+
+
+def upstream_caller(interactive: bool):
+    """
+    Dependency for endpoints that call Gemini/Jina: authenticates, charges the
+    key's quota and schedules this request's upstream calls as the key's work
+    (chat in the interactive lane)
+    """
+    async def dependency(token: str = Depends(verify_token)) -> Caller:
+        key = api_key_for(token)
+        charge_quota(key)
+        caller = Caller(key=key.name, weight=key.weight, interactive=interactive)
+        current_caller.set(caller)
+        return caller
+
+    return dependency
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimeout(Exception):
+    """A stage didn't finish within its own timeout"""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"stage {stage} timed out after {timeout:g}s")
+        self.stage = stage
+
+
+@dataclass
+class Stage:
+    """
+    One step of a pipeline: fn is called with the results so far (by stage
+    name) once every stage in after has finished
+    """
+    name: str
+    fn: Callable[[Dict[str, Any]], Awaitable[Any]]
+    after: Tuple[str, ...] = ()
+    # Per-attempt timeout; None = no limit
+    timeout: Optional[float] = None
+    # Extra attempts after a failure of one of these types
+    retries: int = 0
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,)
+    retry_delay: float = 0.1
+
+
+@dataclass
+class StageTiming:
+    """When a stage ran, in seconds since the pipeline started"""
+    start: float
+    end: Optional[float] = None
+    attempts: int = 0
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else self.start) - self.start
+
+
+@dataclass
+class Dag:
+    """
+    Runs a pipeline's stages as soon as their dependencies are done, so
+    independent stages overlap. The first stage to fail (after its retries)
+    cancels the rest and its error is raised. Timings are kept per stage,
+    from which the critical path (the chain of stages that decided the total
+    time) is reported.
+    """
+    stages: Sequence[Stage]
+    results: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, StageTiming] = field(default_factory=dict)
+    failed: Optional[str] = None
+
+    def __post_init__(self):
+        self._by_name = {stage.name: stage for stage in self.stages}
+        if len(self._by_name) != len(self.stages):
+            raise ValueError("Duplicate stage names")
+        for stage in self.stages:
+            unknown = [name for name in stage.after if name not in self._by_name]
+            if unknown:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {', '.join(unknown)}")
+        self._order = self._topological_order()
+
+    def _topological_order(self) -> List[Stage]:
+        waiting = {stage.name: set(stage.after) for stage in self.stages}
+        order: List[Stage] = []
+        while waiting:
+            ready = [name for name, after in waiting.items() if not after]
+            if not ready:
+                raise ValueError(f"Stages depend on each other in a cycle: {', '.join(waiting)}")
+            for name in ready:
+                del waiting[name]
+                order.append(self._by_name[name])
+            for after in waiting.values():
+                after.difference_update(ready)
+        return order
+
+    async def _attempt(self, stage: Stage) -> Any:
+        if stage.timeout is None:
+            return await stage.fn(self.results)
+        try:
+            return await asyncio.wait_for(stage.fn(self.results), stage.timeout)
+        except asyncio.TimeoutError:
+            raise StageTimeout(stage.name, stage.timeout)
+
+    async def _run_stage(self, stage: Stage, tasks: Dict[str, asyncio.Task], started: float):
+        if stage.after:
+            # A failed dependency fails this stage too, with the same error
+            await asyncio.gather(*(tasks[name] for name in stage.after))
+        timing = self.timings[stage.name] = StageTiming(start=time.perf_counter() - started)
+        try:
+            while True:
+                timing.attempts += 1
+                try:
+                    self.results[stage.name] = await self._attempt(stage)
+                    return
+                except stage.retry_on as e:
+                    if timing.attempts > stage.retries:
+                        raise
+                    logger.warning(f"Stage {stage.name} failed (attempt {timing.attempts}), retrying: {str(e)}")
+                    await asyncio.sleep(stage.retry_delay * timing.attempts)
+        except Exception:
+            if self.failed is None:
+                self.failed = stage.name
+            raise
+        finally:
+            timing.end = time.perf_counter() - started
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every stage; the results by stage name"""
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        for stage in self._order:
+            tasks[stage.name] = asyncio.ensure_future(self._run_stage(stage, tasks, started))
+        try:
+            await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+            if self.failed is not None:
+                raise tasks[self.failed].exception()
+            return self.results
+        finally:
+            pending = [task for task in tasks.values() if not task.done()]
+            for task in pending:
+                task.cancel()
+            # Collect every outcome, so no error goes unretrieved
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    def critical_path(self) -> List[str]:
+        """
+        Stages that decided the total time: the last to finish, preceded by
+        the dependency it waited for last, and so on
+        """
+        finished = {name: timing for name, timing in self.timings.items() if timing.end is not None}
+        if not finished:
+            return []
+        name = max(finished, key=lambda name: finished[name].end)
+        path = [name]
+        while True:
+            after = [dep for dep in self._by_name[name].after if dep in finished]
+            if not after:
+                break
+            name = max(after, key=lambda dep: finished[dep].end)
+            path.append(name)
+        return path[::-1]
+
+    def server_timing(self) -> str:
+        """Stage durations and the critical path as a Server-Timing header value"""
+        metrics = [
+            f"{name};dur={timing.duration * 1000:.1f}"
+            for name, timing in sorted(self.timings.items(), key=lambda item: item[1].start)
+            if timing.end is not None
+        ]
+        path = self.critical_path()
+        if path:
+            total = self.timings[path[-1]].end
+            metrics.append(f'critical;desc="{">".join(path)}";dur={total * 1000:.1f}')
+        return ", ".join(metrics)
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+from fastapi import Header, Request
+
+from app.config import settings
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """A pipeline stage ran out of its share of the request deadline"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready"""
+
+
+class Deadline:
+    """
+    Time budget for one request. Each stage gets at most its share of the
+    total, and never more than what is left, so a slow scrape leaves the LLM
+    stage less time instead of pushing the response past the deadline.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def budget(self, share: float = 1.0) -> float:
+        return min(self.remaining(), self.seconds * share)
+
+    async def run(self, stage: str, awaitable: Awaitable[T], share: float = 1.0) -> T:
+        """Await one stage, cancelling it when its budget runs out"""
+        try:
+            return await asyncio.wait_for(awaitable, self.budget(share))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage)
+
+
+# Deadline of the request being served; upstream clients read it to bound their own timeouts
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+async def request_deadline(
+    x_request_timeout: Optional[float] = Header(
+        None, gt=0, description="Seconds the client will wait for the response"
+    )
+) -> Deadline:
+    """Route dependency: the request's deadline, from X-Request-Timeout or the configured default"""
+    seconds = x_request_timeout or settings.analyze_deadline_seconds
+    deadline = Deadline(min(seconds, settings.analyze_max_deadline_seconds))
+    current_deadline.set(deadline)
+    return deadline
+
+
+async def until_disconnected(request: Request, awaitable: Awaitable[T], poll_interval: float) -> T:
+    """
+    Run the request's work as a task and cancel it if the client disconnects,
+    so abandoned requests stop scraping and calling the model
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise ClientDisconnected()
+    finally:
+        # Cancelled ourselves (e.g. server shutdown): take the work down with us
+        if not task.done():
+            task.cancel()
+
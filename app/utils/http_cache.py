@@ -0,0 +1,75 @@
+import gzip
+import hashlib
+from typing import Dict, Optional
+
+
+def brotli_available() -> bool:
+    try:
+        import brotli  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def strong_etag(*parts) -> str:
+    """
+    Quoted ETag over parts that change whenever the representation does
+    """
+    digest = hashlib.sha256("\x1f".join("" if part is None else str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def variant_etag(etag: str, encoding: Optional[str]) -> str:
+    """
+    ETag of an encoded variant: its bytes differ, so a strong ETag must too
+    """
+    return f'"{etag.strip(chr(34))}-{encoding}"' if encoding else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match check (weak comparison, as RFC 9110 specifies for it);
+    any encoded variant of etag matches
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        tag = candidate.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"').split("-")[0] == opaque:
+            return True
+    return False
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Preferred supported content coding from Accept-Encoding (br, then gzip), or None
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        if params.strip().startswith("q="):
+            try:
+                weight = float(params.strip()[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    supported = ["br", "gzip"] if brotli_available() else ["gzip"]
+    accepted = [coding for coding in supported if weights.get(coding, weights.get("*", 0.0)) > 0]
+    return max(accepted, key=lambda coding: weights.get(coding, weights.get("*", 0.0)), default=None)
+
+
+def encode_body(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "br":
+        import brotli
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
@@ -0,0 +1,91 @@
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+# The proxy's own state; anything else in its __dict__ is set for the instance
+_PROXY_ATTRIBUTES = ("_factory", "_instance", "_lock")
+
+
+class LazyService(Generic[T]):
+    """
+    Stand-in for a module-level service instance that is only constructed on
+    first use, so importing the app doesn't import SDKs or build clients.
+    Attribute reads go to the real instance. Until it exists, the service
+    class's methods are handed out as calls that construct it when made, and
+    attribute writes are kept on the proxy and moved onto the instance when it
+    is built; so `from module import service` and
+    `patch("module.service.method")` work without constructing anything.
+    Private (underscore) attributes are not forwarded.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def resolve(self) -> T:
+        """
+        The service instance, constructing it if needed (thread-safe)
+        """
+        instance: Optional[T] = object.__getattribute__(self, "_instance")
+        if instance is None:
+            with object.__getattribute__(self, "_lock"):
+                instance = object.__getattribute__(self, "_instance")
+                if instance is None:
+                    instance = object.__getattribute__(self, "_factory")()
+                    # Attributes set (e.g. patched) before the instance existed
+                    overrides = object.__getattribute__(self, "__dict__")
+                    for name in [name for name in overrides if name not in _PROXY_ATTRIBUTES]:
+                        setattr(instance, name, overrides.pop(name))
+                    object.__setattr__(self, "_instance", instance)
+        return instance
+
+    @property
+    def resolved(self) -> bool:
+        return object.__getattribute__(self, "_instance") is not None
+
+    def _deferred(self, name: str) -> Any:
+        # A method of the service class, called on the instance once it is needed
+        factory = object.__getattribute__(self, "_factory")
+        method = inspect.getattr_static(factory, name, None) if isinstance(factory, type) else None
+        if not inspect.isfunction(method):
+            return None
+        if inspect.iscoroutinefunction(method):
+            async def call(*args, **kwargs):
+                return await getattr(self.resolve(), name)(*args, **kwargs)
+        else:
+            def call(*args, **kwargs):
+                return getattr(self.resolve(), name)(*args, **kwargs)
+        return functools.wraps(method)(call)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for names not set on the proxy itself
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if not self.resolved:
+            method = self._deferred(name)
+            if method is not None:
+                return method
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        if self.resolved:
+            setattr(self.resolve(), name, value)
+        else:
+            object.__setattr__(self, name, value)
+
+    def __delattr__(self, name: str):
+        if name in object.__getattribute__(self, "__dict__") and name not in _PROXY_ATTRIBUTES:
+            object.__delattr__(self, name)
+        elif self.resolved:
+            delattr(self.resolve(), name)
+        else:
+            raise AttributeError(name)
+
+    def __repr__(self) -> str:
+        factory = object.__getattribute__(self, "_factory")
+        state = "resolved" if self.resolved else "unresolved"
+        return f"<LazyService {getattr(factory, '__name__', factory)} ({state})>"
@@ -0,0 +1,47 @@
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """
+    Token bucket: holds up to capacity tokens, refilled continuously at rate per second.
+    Thread-safe so it can be shared between the event loop and worker threads.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens if available; never blocks"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def time_until(self, tokens: float = 1.0) -> float:
+        """Seconds until tokens would be available (0 if they already are)"""
+        with self._lock:
+            self._refill()
+            missing = tokens - self._tokens
+            if missing <= 0:
+                return 0.0
+            return missing / self.rate if self.rate > 0 else float("inf")
@@ -0,0 +1,227 @@
+import math
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 8, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means over unit vectors; returns k unit centroids
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        norms = np.linalg.norm(sums, axis=1)
+        # Empty clusters keep their previous centroid
+        filled = norms > 0
+        centroids[filled] = sums[filled] / norms[filled, None]
+    return centroids
+
+
+class IVFIndex:
+    """
+    Approximate nearest neighbours by inner product over unit vectors (inverted file).
+
+    Vectors are partitioned around k-means centroids; a query scores the centroids
+    and then only the vectors in the nprobe closest partitions. Below
+    train_threshold vectors the index is searched exhaustively. Adding a key that
+    already exists overwrites its vector in place (moving it to its new
+    partition), and slots of removed keys are reused by later additions, so
+    memory follows the number of keys rather than the number of updates.
+    """
+
+    def __init__(self, dim: int, nprobe: int = 16, train_threshold: int = 4096, sample_size: int = 65536):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.sample_size = sample_size
+        self._vectors = np.zeros((1024, dim), dtype=np.float32)
+        self._alive = np.zeros(1024, dtype=bool)
+        # Partition each slot is listed in; -1 = none
+        self._partitions = np.full(1024, -1, dtype=np.int64)
+        self._keys: List[Optional[str]] = []
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[array] = []
+        self._trained_size = 0
+        # Slots written or freed while train() runs, re-placed when it finishes
+        self._changed: Optional[set] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._slots
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def needs_training(self) -> bool:
+        """True once the index outgrew its partitions (or first reached train_threshold)"""
+        size = len(self._slots)
+        if self._centroids is None:
+            return size >= self.train_threshold
+        return size > 4 * self._trained_size
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        slot = self._slots.get(key)
+        return None if slot is None else self._vectors[slot].copy()
+
+    def _grow(self, needed: int):
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:len(self._keys)] = self._vectors[:len(self._keys)]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self._keys)] = self._alive[:len(self._keys)]
+        partitions = np.full(capacity, -1, dtype=np.int64)
+        partitions[:len(self._keys)] = self._partitions[:len(self._keys)]
+        self._vectors, self._alive, self._partitions = vectors, alive, partitions
+
+    def _unlist(self, slot: int):
+        partition = self._partitions[slot]
+        if partition >= 0:
+            self._lists[partition].remove(slot)
+            self._partitions[slot] = -1
+
+    def add_many(self, items: Iterable[Tuple[str, np.ndarray]]):
+        """
+        Add or replace vectors by key
+        """
+        items = list(items)
+        if not items:
+            return
+        with self._lock:
+            written = []
+            for key, vector in items:
+                slot = self._slots.get(key)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                        self._keys[slot] = key
+                    else:
+                        slot = len(self._keys)
+                        self._grow(slot + 1)
+                        self._keys.append(key)
+                    self._slots[key] = slot
+                    self._alive[slot] = True
+                self._vectors[slot] = vector
+                written.append(slot)
+            if self._changed is not None:
+                self._changed.update(written)
+            if self._centroids is not None:
+                written = list(dict.fromkeys(written))
+                assignment = np.argmax(self._vectors[written] @ self._centroids.T, axis=1)
+                for slot, partition in zip(written, assignment):
+                    if self._partitions[slot] != partition:
+                        self._unlist(slot)
+                        self._lists[partition].append(slot)
+                        self._partitions[slot] = partition
+
+    def add(self, key: str, vector: np.ndarray):
+        self.add_many([(key, vector)])
+
+    def remove(self, key: str):
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot is not None:
+                self._alive[slot] = False
+                self._keys[slot] = None
+                if self._centroids is not None:
+                    self._unlist(slot)
+                if self._changed is not None:
+                    self._changed.add(slot)
+                self._free.append(slot)
+
+    def train(self):
+        """
+        (Re)build the partitions from the current vectors. The expensive part runs
+        without the lock on a snapshot, so it can run on a worker thread while
+        the index keeps serving queries and additions.
+        """
+        with self._lock:
+            size = len(self._keys)
+            vectors = self._vectors
+            alive = np.flatnonzero(self._alive[:size])
+            self._changed = set()
+        try:
+            if len(alive) < self.train_threshold:
+                return
+
+            # ~sqrt(n) partitions balances centroid scoring against partition scans
+            # (and keeps assigning every vector affordable); at least ~40 vectors
+            # per partition for k-means to be meaningful
+            partitions = max(1, min(len(alive) // 40, int(math.sqrt(len(alive)))))
+            rng = np.random.default_rng(len(alive))
+            sample = alive if len(alive) <= self.sample_size else rng.choice(alive, self.sample_size, replace=False)
+            centroids = kmeans(vectors[sample], partitions)
+
+            assignment = np.empty(len(alive), dtype=np.int64)
+            for begin in range(0, len(alive), 65536):
+                chunk = alive[begin:begin + 65536]
+                assignment[begin:begin + 65536] = np.argmax(vectors[chunk] @ centroids.T, axis=1)
+            lists = [array("q") for _ in range(partitions)]
+            order = np.argsort(assignment, kind="stable")
+            bounds = np.searchsorted(assignment[order], np.arange(partitions + 1))
+            for partition in range(partitions):
+                lists[partition].extend(alive[order[bounds[partition]:bounds[partition + 1]]].tolist())
+
+            with self._lock:
+                slot_partitions = np.full(len(self._partitions), -1, dtype=np.int64)
+                slot_partitions[alive] = assignment
+                # Slots added, replaced, removed or reused while training was running
+                changed = sorted(self._changed)
+                for slot in changed:
+                    if slot_partitions[slot] >= 0:
+                        lists[slot_partitions[slot]].remove(slot)
+                        slot_partitions[slot] = -1
+                placed = [slot for slot in changed if self._alive[slot]]
+                if placed:
+                    for slot, partition in zip(placed, np.argmax(self._vectors[placed] @ centroids.T, axis=1)):
+                        lists[partition].append(slot)
+                        slot_partitions[slot] = partition
+                self._centroids = centroids
+                self._lists = lists
+                self._partitions = slot_partitions
+                self._trained_size = len(alive)
+        finally:
+            with self._lock:
+                self._changed = None
+
+    def search(self, vector: np.ndarray, k: int = 10, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        The k keys with the highest inner product with vector, best first
+        """
+        with self._lock:
+            size = len(self._keys)
+            if self._centroids is None:
+                candidates = np.flatnonzero(self._alive[:size])
+            else:
+                nprobe = min(self.nprobe, len(self._centroids))
+                probed = np.argpartition(self._centroids @ vector, -nprobe)[-nprobe:]
+                candidates = np.concatenate([
+                    np.frombuffer(self._lists[p], dtype=np.int64) for p in probed if len(self._lists[p])
+                ] or [np.empty(0, dtype=np.int64)])
+                candidates = candidates[self._alive[candidates]]
+            if exclude is not None and exclude in self._slots:
+                candidates = candidates[candidates != self._slots[exclude]]
+            if not len(candidates):
+                return []
+
+            scores = self._vectors[candidates] @ vector
+            k = min(k, len(candidates))
+            top = np.argpartition(scores, -k)[-k:]
+            top = top[np.argsort(-scores[top])]
+            return [(self._keys[candidates[i]], float(scores[i])) for i in top]
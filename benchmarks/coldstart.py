@@ -0,0 +1,98 @@
+"""
+Cold-start cost of the API: how long a fresh interpreter takes to import
+``app.main``, which is what a serverless instance pays before its first request.
+
+Each round runs in a new subprocess. Required settings are filled with dummy
+values (``--no-env`` clears them to check the app still imports without any),
+and the report lists which slow SDKs were already loaded at import time.
+
+Usage:
+    python -m benchmarks.coldstart                # 10 rounds
+    python -m benchmarks.coldstart --top 15       # plus the slowest imports (-X importtime)
+    python -m benchmarks.coldstart --no-env
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from app.config import REQUIRED_SETTINGS
+
+# Imported on first use by the services; listed to catch regressions that import them eagerly
+DEFERRED_MODULES = ("google.generativeai", "supabase", "httpx")
+
+_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {DEFERRED_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def probe_environment(with_env: bool) -> dict:
+    required = {name.upper() for name in REQUIRED_SETTINGS}
+    env = {key: value for key, value in os.environ.items() if key.upper() not in required}
+    if with_env:
+        env.update({name.upper(): "coldstart" for name in REQUIRED_SETTINGS})
+        env["SUPABASE_URL"] = "https://coldstart.supabase.co"
+    return env
+
+
+def run_round(env: dict) -> dict:
+    # Run from a directory without a .env so only env decides the settings
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env: dict, top: int) -> list:
+    """(cumulative ms, module) of the slowest imports under -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], env=env, capture_output=True, text=True,
+        check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]) / 1000, parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    parser.add_argument("--no-env", action="store_true", help="import without any required settings")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    env = probe_environment(not args.no_env)
+    # The probe runs outside the repo root, so make the app importable
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+
+    rounds = [run_round(env) for _ in range(args.rounds)]
+    timings = sorted(r["ms"] for r in rounds)
+    print(f"import app.main over {args.rounds} fresh interpreters ({'no settings' if args.no_env else 'dummy settings'})")
+    print(f"min {timings[0]:.0f}ms  p50 {statistics.median(timings):.0f}ms  max {timings[-1]:.0f}ms")
+    loaded = rounds[-1]["loaded"]
+    print(f"deferred SDKs loaded at import: {', '.join(loaded) if loaded else 'none'}")
+
+    if args.top:
+        print("\nslowest imports (cumulative):")
+        for ms, module in slowest_imports(env, args.top):
+            print(f"{ms:8.1f}ms  {module}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
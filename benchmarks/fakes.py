@@ -0,0 +1,520 @@
+"""
+Local stand-ins for the upstream services used by the API.
+
+Each fake is a small FastAPI app that emulates just enough of the real
+protocol for the production clients to talk to it unmodified:
+
+- Jina AI Reader (``GET /{url}``)
+- Gemini REST API (``POST /v1beta/models/{model}:generateContent``)
+- Supabase PostgREST (``/rest/v1/{table}``)
+
+Latency and failures are drawn from a configurable ``LatencyProfile`` so the
+load-test harness can model slow or flaky upstreams.
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+
+@dataclass
+class LatencyProfile:
+    """Latency/error distribution for a fake upstream."""
+
+    distribution: str = "fixed"  # fixed | uniform | normal | lognormal | exponential
+    mean_ms: float = 0.0
+    spread_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyProfile":
+        """
+        Parse a ``dist:mean[:spread[:error_rate[:status]]]`` spec,
+        e.g. ``lognormal:400:150:0.01``
+        """
+        parts = spec.split(":")
+        profile = cls(distribution=parts[0])
+        if len(parts) > 1:
+            profile.mean_ms = float(parts[1])
+        if len(parts) > 2:
+            profile.spread_ms = float(parts[2])
+        if len(parts) > 3:
+            profile.error_rate = float(parts[3])
+        if len(parts) > 4:
+            profile.error_status = int(parts[4])
+        return profile
+
+    def sample_delay(self) -> float:
+        """Draw one delay in seconds."""
+        mean, spread = self.mean_ms, self.spread_ms
+        if self.distribution == "fixed" or mean <= 0:
+            delay = mean
+        elif self.distribution == "uniform":
+            delay = random.uniform(max(0.0, mean - spread), mean + spread)
+        elif self.distribution == "normal":
+            delay = random.gauss(mean, spread)
+        elif self.distribution == "lognormal":
+            # Parameterised by the mean/stddev of the resulting distribution
+            variance = spread ** 2
+            sigma2 = math.log(1 + variance / (mean ** 2))
+            mu = math.log(mean) - sigma2 / 2
+            delay = random.lognormvariate(mu, math.sqrt(sigma2))
+        elif self.distribution == "exponential":
+            delay = random.expovariate(1.0 / mean)
+        else:
+            raise ValueError(f"Unknown latency distribution: {self.distribution}")
+        return max(0.0, delay) / 1000.0
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+async def _emulate(profile: LatencyProfile) -> Optional[Response]:
+    """Sleep for a sampled delay and return an error response if one is drawn."""
+    delay = profile.sample_delay()
+    if delay:
+        await asyncio.sleep(delay)
+    if profile.should_fail():
+        return JSONResponse(
+            status_code=profile.error_status,
+            content={"error": {"code": profile.error_status, "message": "injected failure"}}
+        )
+    return None
+
+
+def build_page(url: str, size: int) -> str:
+    """Build a synthetic markdown page of roughly ``size`` characters."""
+    sections = [
+        f"# {url}\n\nWelcome to our company homepage.\n\n"
+        "[About us](/about) | [Contact](/contact) | [Pricing](/pricing) | [Blog](/blog)",
+        "## About Us\nWe are a mid-size company with 150 employees based in Berlin, Germany.",
+        "## Products\nCloud analytics, workflow automation and enterprise integrations.",
+        "## Pricing\nStarter, Growth and Enterprise plans billed monthly or yearly.",
+        "## Contact\nEmail: hello@example.com\nPhone: +49 30 1234567",
+    ]
+    filler = "Our platform helps teams ship faster with reliable tooling and great support. "
+    page = "\n\n".join(sections)
+    if len(page) < size:
+        page += "\n\n## Details\n" + filler * ((size - len(page)) // len(filler) + 1)
+    return page[:max(size, 100)]
+
+
+def create_fake_jina_app(profile: LatencyProfile, page_size: int = 8000) -> FastAPI:
+    """Fake Jina AI Reader: returns a synthetic page for any URL."""
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.get("/{target:path}")
+    async def read(target: str, request: Request):
+        app.state.requests += 1
+        error = await _emulate(profile)
+        if error is not None:
+            return error
+        return PlainTextResponse(build_page(target, page_size))
+
+    return app
+
+
+FAKE_INSIGHTS = {
+    "industry": "Software",
+    "company_size": "Medium (100-200 employees)",
+    "location": "Berlin, Germany",
+    "usp": "Reliable tooling with great support",
+    "products_services": "Cloud analytics, workflow automation",
+    "target_audience": "Engineering teams",
+    "contact_info": {
+        "emails": ["hello@example.com"],
+        "phones": ["+49 30 1234567"],
+        "social_media": []
+    }
+}
+
+
+def _gemini_payload(text: str) -> Dict[str, Any]:
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0
+        }],
+        "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": 0, "totalTokenCount": 0}
+    }
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    parts = []
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            parts.append(part.get("text", ""))
+    return "\n".join(parts)
+
+
+def _structured_output(schema: Dict[str, Any], prompt: str) -> Dict[str, Any]:
+    """Fill a structured-output schema: canned insights plus an answer per listed question."""
+    properties = schema.get("properties", {})
+    output = {key: value for key, value in FAKE_INSIGHTS.items() if key in properties}
+    if "answers" in properties:
+        questions = [
+            line.strip()[2:] for line in prompt.splitlines()
+            if line.strip().startswith("- ") and line.strip().endswith("?")
+        ]
+        output["answers"] = [
+            {"question": question, "answer": f"Answer to: {question}"} for question in questions
+        ]
+    return output
+
+
+def create_fake_gemini_app(
+    profile: LatencyProfile, model_profiles: Optional[Dict[str, LatencyProfile]] = None
+) -> FastAPI:
+    """
+    Fake Gemini REST API: JSON insights for analysis prompts, text for chat,
+    plus enough of ``cachedContents`` for context caching. ``model_profiles``
+    overrides the latency profile per model name (e.g. to exercise routing).
+    """
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.prompt_chars = 0
+    cached_contents: Dict[str, Dict[str, Any]] = {}
+    app.state.cached_contents = cached_contents
+
+    def cache_resource(name: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        ttl = float(str(body.get("ttl", "3600s")).rstrip("s"))
+        now = datetime.now(timezone.utc)
+        expire = datetime.fromtimestamp(now.timestamp() + ttl, timezone.utc)
+        return {
+            "name": name,
+            "model": body.get("model", "models/unknown"),
+            "createTime": now.isoformat().replace("+00:00", "Z"),
+            "updateTime": now.isoformat().replace("+00:00", "Z"),
+            "expireTime": expire.isoformat().replace("+00:00", "Z"),
+        }
+
+    @app.post("/v1beta/cachedContents")
+    async def create_cached_content(request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        error = await _emulate(profile)
+        if error is not None:
+            return error
+        name = f"cachedContents/{uuid.uuid4().hex[:16]}"
+        cached_contents[name] = {"prompt": _prompt_text(body), "resource": cache_resource(name, body)}
+        return cached_contents[name]["resource"]
+
+    @app.patch("/v1beta/cachedContents/{cache_id}")
+    async def update_cached_content(cache_id: str, request: Request):
+        name = f"cachedContents/{cache_id}"
+        if name not in cached_contents:
+            return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "not found"}})
+        body = await request.json()
+        body.setdefault("model", cached_contents[name]["resource"]["model"])
+        cached_contents[name]["resource"] = cache_resource(name, body)
+        return cached_contents[name]["resource"]
+
+    @app.delete("/v1beta/cachedContents/{cache_id}")
+    async def delete_cached_content(cache_id: str):
+        cached_contents.pop(f"cachedContents/{cache_id}", None)
+        return {}
+
+    async def respond(model: str, request: Request):
+        """Response text for a generate call, or an error response"""
+        app.state.requests += 1
+        body = await request.json()
+        error = await _emulate((model_profiles or {}).get(model, profile))
+        if error is not None:
+            return error
+        prompt = _prompt_text(body)
+        app.state.prompt_chars += len(prompt)
+        cache_name = body.get("cachedContent")
+        if cache_name and cache_name not in cached_contents:
+            return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "cache not found"}})
+        schema = body.get("generationConfig", {}).get("responseSchema")
+        if schema:
+            return json.dumps(_structured_output(schema, prompt))
+        if '"industry"' in prompt:
+            return json.dumps(FAKE_INSIGHTS)
+        return "They sell cloud analytics and workflow automation to engineering teams."
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def generate_content(model: str, request: Request):
+        text = await respond(model, request)
+        return _gemini_payload(text) if isinstance(text, str) else text
+
+    @app.post("/v1beta/models/{model}:streamGenerateContent")
+    async def stream_generate_content(model: str, request: Request):
+        # The REST transport reads a JSON array of partial responses
+        text = await respond(model, request)
+        if not isinstance(text, str):
+            return text
+        words = text.split(" ")
+        chunks = [" ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "") for i in range(0, len(words), 4)]
+        return [_gemini_payload(chunk) for chunk in chunks]
+
+    return app
+
+
+def _parse_filter(value: str):
+    op, _, operand = value.partition(".")
+    return op, operand
+
+
+def _split_top_level(expr: str) -> List[str]:
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in expr:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    return parts + [current] if current else parts
+
+
+def _parse_logic(operator: str, expr: str) -> tuple:
+    """Parse a PostgREST logic tree such as ``(a.gt.1,and(a.eq.1,b.gt.2))``"""
+    conditions = []
+    for part in _split_top_level(expr[1:-1]):
+        if part.startswith(("and(", "or(")):
+            nested, _, rest = part.partition("(")
+            conditions.append(_parse_logic(nested, "(" + rest))
+        else:
+            column, _, condition = part.partition(".")
+            op, operand = _parse_filter(condition)
+            conditions.append((column, op, operand.strip('"')))
+    return (operator, conditions)
+
+
+def _matches_logic(row: Dict[str, Any], tree: tuple) -> bool:
+    operator, conditions = tree
+    results = (
+        _matches_logic(row, c) if c[0] in ("and", "or") and isinstance(c[1], list) else _matches(row, [c])
+        for c in conditions
+    )
+    return any(results) if operator == "or" else all(results)
+
+
+def _matches(row: Dict[str, Any], filters: List[tuple]) -> bool:
+    for column, op, operand in filters:
+        if column in ("and", "or") and isinstance(operand, tuple):
+            if not _matches_logic(row, operand):
+                return False
+            continue
+        current = row.get(column)
+        current_text = "" if current is None else str(current)
+        if op == "eq" and current_text != operand:
+            return False
+        if op == "neq" and current_text == operand:
+            return False
+        if op == "gt" and not current_text > operand:
+            return False
+        if op == "gte" and not current_text >= operand:
+            return False
+        if op == "lt" and not current_text < operand:
+            return False
+        if op == "lte" and not current_text <= operand:
+            return False
+        if op == "in" and current_text not in operand.strip("()").split(","):
+            return False
+        if op == "is" and operand == "null" and current is not None:
+            return False
+        if op == "ilike" and not re.fullmatch(
+            ".*".join(re.escape(part) for part in operand.split("*")), current_text, re.IGNORECASE | re.DOTALL
+        ):
+            return False
+        if op.startswith("wfts") and not all(
+            term in current_text.split() for term in re.findall(r"[a-z0-9]+", operand.lower())
+        ):
+            return False
+    return True
+
+
+# Generated columns of website_analyses (see sql/setup_tables.sql)
+_FACETS = ("industry", "location", "company_size")
+_SEARCHABLE = ("industry", "location", "products_services", "usp", "target_audience", "company_size")
+
+
+def _derive_columns(table: str, row: Dict[str, Any]):
+    if table != "website_analyses":
+        return
+    insights = row.get("insights") if isinstance(row.get("insights"), dict) else {}
+    for column in _FACETS:
+        row[column] = insights.get(column)
+    text = " ".join(str(insights.get(column) or "") for column in _SEARCHABLE)
+    # Stand-in for the tsvector: lowercase words
+    row["search_vector"] = " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def create_fake_postgrest_app(profile: LatencyProfile) -> FastAPI:
+    """
+    In-memory PostgREST: supports the select/insert/update/upsert calls made
+    by ``DatabaseService`` with eq/neq/gt/gte/lt/lte/in/is filters, and/or
+    logic trees, ordering and limits.
+    """
+    app = FastAPI()
+    app.state.requests = 0
+    tables: Dict[str, List[Dict[str, Any]]] = {}
+    app.state.tables = tables
+
+    def query(request: Request, table: str) -> List[Dict[str, Any]]:
+        filters = []
+        for key, value in request.query_params.multi_items():
+            if key in _RESERVED_PARAMS:
+                continue
+            if key in ("and", "or"):
+                filters.append((key, None, _parse_logic(key, value)))
+                continue
+            op, operand = _parse_filter(value)
+            filters.append((key, op, operand))
+        return [row for row in tables.setdefault(table, []) if _matches(row, filters)]
+
+    def shape(request: Request, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        params = request.query_params
+        order = params.get("order")
+        if order:
+            for clause in reversed(order.split(",")):
+                column, _, direction = clause.partition(".")
+                rows = sorted(
+                    rows,
+                    key=lambda r: ("" if r.get(column) is None else str(r.get(column))),
+                    reverse=direction.startswith("desc")
+                )
+        offset = int(params.get("offset", 0))
+        if "limit" in params:
+            rows = rows[offset:offset + int(params["limit"])]
+        elif offset:
+            rows = rows[offset:]
+        select = params.get("select", "*")
+        if select != "*":
+            columns = [c.strip() for c in select.split(",")]
+            rows = [{c: r.get(c) for c in columns} for r in rows]
+        return rows
+
+    def now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    @app.get("/rest/v1/{table}")
+    async def select(table: str, request: Request):
+        app.state.requests += 1
+        error = await _emulate(profile)
+        if error is not None:
+            return error
+        return shape(request, query(request, table))
+
+    @app.post("/rest/v1/{table}")
+    async def insert(table: str, request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        error = await _emulate(profile)
+        if error is not None:
+            return error
+        rows = body if isinstance(body, list) else [body]
+        upsert = "merge-duplicates" in request.headers.get("prefer", "")
+        conflict = request.query_params.get("on_conflict")
+        stored = []
+        for row in rows:
+            existing = None
+            if upsert and conflict:
+                existing = next(
+                    (r for r in tables.setdefault(table, []) if r.get(conflict) == row.get(conflict)),
+                    None
+                )
+            if existing is not None:
+                existing.update(row)
+                existing["updated_at"] = now()
+                _derive_columns(table, existing)
+                stored.append(existing)
+            else:
+                record = {"id": str(uuid.uuid4()), "created_at": now(), "updated_at": now()}
+                record.update(row)
+                _derive_columns(table, record)
+                tables.setdefault(table, []).append(record)
+                stored.append(record)
+        return JSONResponse(status_code=201, content=stored)
+
+    @app.patch("/rest/v1/{table}")
+    async def update(table: str, request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        error = await _emulate(profile)
+        if error is not None:
+            return error
+        rows = query(request, table)
+        for row in rows:
+            row.update(body)
+            row["updated_at"] = now()
+            _derive_columns(table, row)
+        return rows
+
+    @app.delete("/rest/v1/{table}")
+    async def delete(table: str, request: Request):
+        app.state.requests += 1
+        rows = query(request, table)
+        tables[table] = [r for r in tables.setdefault(table, []) if r not in rows]
+        return rows
+
+    return app
+
+
+class ServerThread:
+    """Run an ASGI app under uvicorn on a background thread with its own event loop."""
+
+    def __init__(self, app, port: int, host: str = "127.0.0.1", on_loop=None):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.on_loop = on_loop
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = uvicorn.Server(
+            uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="on")
+        )
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        background = asyncio.create_task(self.on_loop()) if self.on_loop else None
+        try:
+            await self._server.serve()
+        finally:
+            if background:
+                background.cancel()
+
+    def start(self, timeout: float = 10.0) -> "ServerThread":
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
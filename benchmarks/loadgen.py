@@ -0,0 +1,272 @@
+"""
+End-to-end load test for the API.
+
+Starts local fakes for Jina, Gemini and Supabase, serves ``app.main:app``
+against them on a dedicated thread, drives ``/api/analyze`` and ``/api/chat``
+at a target concurrency and reports throughput, latency percentiles and
+event-loop lag of the API worker.
+
+Usage:
+    python -m benchmarks.loadgen --concurrency 32 --duration 30
+    python -m benchmarks.loadgen --baseline benchmarks/baselines/load.json --max-regression 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.fakes import (
+    LatencyProfile,
+    ServerThread,
+    create_fake_gemini_app,
+    create_fake_jina_app,
+    create_fake_postgrest_app,
+)
+from benchmarks.stats import compare_reports, load_report, save_report, summarize_latencies
+
+API_KEY = "loadtest-secret"
+# Supabase's client only accepts JWT-shaped keys
+FAKE_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.loadtest"
+GATED_METRICS = ["throughput_rps", "p95_ms", "p99_ms"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LoopLagProbe:
+    """Measures how late a periodic timer fires on the event loop it runs on."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples_ms: List[float] = []
+        self.recording = False
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            if self.recording:
+                self.samples_ms.append(max(0.0, (loop.time() - expected) * 1000))
+
+
+class LoadResult:
+    def __init__(self):
+        self.latencies_ms: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.status_codes: Dict[str, Dict[int, int]] = {}
+
+    def record(self, scenario: str, elapsed_ms: float, status: int):
+        codes = self.status_codes.setdefault(scenario, {})
+        codes[status] = codes.get(status, 0) + 1
+        if 200 <= status < 300:
+            self.latencies_ms.setdefault(scenario, []).append(elapsed_ms)
+        else:
+            self.errors[scenario] = self.errors.get(scenario, 0) + 1
+
+
+async def _request(
+    client: httpx.AsyncClient, scenario: str, url: str, crawl: bool = False, max_age: Optional[int] = None
+) -> int:
+    if scenario == "analyze":
+        payload = {"url": url, "crawl": crawl}
+        if max_age is not None:
+            payload["max_age"] = max_age
+        response = await client.post("/api/analyze", json=payload)
+    else:
+        # A handful of ongoing sessions per site, so chats read real history
+        response = await client.post(
+            "/api/chat",
+            json={"url": url, "session_id": f"{url}#{random.randrange(4)}", "query": random.choice([
+                "What do they sell?", "Where are they based?", "Who is the target audience?"
+            ])}
+        )
+    return response.status_code
+
+
+async def drive(
+    base_url: str,
+    urls: List[str],
+    concurrency: int,
+    duration: float,
+    chat_ratio: float,
+    result: LoadResult,
+    crawl: bool = False,
+    max_age: Optional[int] = None
+):
+    """Closed-loop load: ``concurrency`` workers issue requests back to back for ``duration``."""
+    stop_at = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {API_KEY}"},
+        timeout=120.0,
+        limits=limits
+    ) as client:
+        async def worker():
+            while time.perf_counter() < stop_at:
+                scenario = "chat" if random.random() < chat_ratio else "analyze"
+                started = time.perf_counter()
+                try:
+                    status = await _request(client, scenario, random.choice(urls), crawl, max_age)
+                except httpx.HTTPError:
+                    status = 599
+                result.record(scenario, (time.perf_counter() - started) * 1000, status)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def warm_up(base_url: str, urls: List[str]):
+    """Analyze every URL once so chat requests have stored content to work with."""
+    async with httpx.AsyncClient(
+        base_url=base_url, headers={"Authorization": f"Bearer {API_KEY}"}, timeout=120.0
+    ) as client:
+        semaphore = asyncio.Semaphore(16)
+
+        async def analyze(url):
+            async with semaphore:
+                await client.post("/api/analyze", json={"url": url})
+
+        await asyncio.gather(*(analyze(url) for url in urls))
+
+
+def build_report(args, result: LoadResult, elapsed: float, lag_ms: List[float]) -> Dict:
+    scenarios = {}
+    for scenario in sorted(set(result.status_codes)):
+        ok = result.latencies_ms.get(scenario, [])
+        errors = result.errors.get(scenario, 0)
+        total = len(ok) + errors
+        scenarios[scenario] = {
+            "throughput_rps": round(len(ok) / elapsed, 3),
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "latency": summarize_latencies(ok),
+            "status_codes": {str(k): v for k, v in sorted(result.status_codes[scenario].items())},
+        }
+    all_ok = [v for values in result.latencies_ms.values() for v in values]
+    return {
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "chat_ratio": args.chat_ratio,
+            "sites": args.sites,
+            "page_size": args.page_size,
+            "crawl": args.crawl,
+            "max_age": args.max_age,
+            "jina": args.jina,
+            "gemini": args.gemini,
+            "supabase": args.supabase,
+        },
+        "overall": {
+            "throughput_rps": round(len(all_ok) / elapsed, 3),
+            "latency": summarize_latencies(all_ok),
+        },
+        "scenarios": scenarios,
+        "event_loop_lag": summarize_latencies(lag_ms),
+    }
+
+
+def configure_environment(jina_url: str, gemini_url: str, supabase_url: str):
+    """Point the app's settings at the fakes; must run before ``app.main`` is imported."""
+    os.environ.update({
+        "GEMINI_API_KEY": "loadtest",
+        "GEMINI_API_ENDPOINT": gemini_url,
+        "JINA_API_KEY": "loadtest",
+        "JINA_BASE_URL": f"{jina_url}/",
+        "SUPABASE_URL": supabase_url,
+        "SUPABASE_KEY": FAKE_SUPABASE_KEY,
+        "API_SECRET_KEY": API_KEY,
+        "RATE_LIMIT_PER_MINUTE": "1000000",
+    })
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of measured load")
+    parser.add_argument("--chat-ratio", type=float, default=0.5, help="Fraction of requests hitting /api/chat")
+    parser.add_argument("--sites", type=int, default=50, help="Number of distinct URLs")
+    parser.add_argument("--page-size", type=int, default=8000, help="Characters returned by fake Jina")
+    parser.add_argument("--crawl", action="store_true", help="Analyze with multi-page crawl enabled")
+    parser.add_argument("--max-age", type=int, help="Send max_age with analyze requests (stale-while-revalidate)")
+    parser.add_argument("--jina", default="lognormal:800:300", help="Jina latency spec dist:mean[:spread[:error_rate[:status]]]")
+    parser.add_argument("--gemini", default="lognormal:1200:400", help="Gemini latency spec")
+    parser.add_argument("--supabase", default="lognormal:30:10", help="PostgREST latency spec")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    parser.add_argument("--baseline", type=Path, help="Compare against this stored report")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite --baseline with this run")
+    parser.add_argument("--max-regression", type=float, default=0.15, help="Allowed fractional regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    fakes = {
+        "jina": ServerThread(create_fake_jina_app(LatencyProfile.parse(args.jina), args.page_size), free_port()),
+        "gemini": ServerThread(create_fake_gemini_app(LatencyProfile.parse(args.gemini)), free_port()),
+        "supabase": ServerThread(create_fake_postgrest_app(LatencyProfile.parse(args.supabase)), free_port()),
+    }
+    for server in fakes.values():
+        server.start()
+    configure_environment(fakes["jina"].url, fakes["gemini"].url, fakes["supabase"].url)
+
+    from app.main import app
+
+    probe = LoopLagProbe()
+    api = ServerThread(app, free_port(), on_loop=probe.run).start()
+    urls = [f"https://site-{i}.example.com/" for i in range(args.sites)]
+
+    try:
+        asyncio.run(warm_up(api.url, urls))
+        result = LoadResult()
+        probe.recording = True
+        started = time.perf_counter()
+        asyncio.run(drive(
+            api.url, urls, args.concurrency, args.duration, args.chat_ratio, result, args.crawl, args.max_age
+        ))
+        elapsed = time.perf_counter() - started
+        probe.recording = False
+    finally:
+        api.stop()
+        for server in fakes.values():
+            server.stop()
+
+    report = build_report(args, result, elapsed, probe.samples_ms)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        save_report(args.output, report)
+
+    if args.baseline:
+        if args.save_baseline or not args.baseline.exists():
+            save_report(args.baseline, report)
+            print(f"Baseline written to {args.baseline}")
+            return 0
+        regressions = compare_reports(report, load_report(args.baseline), args.max_regression, GATED_METRICS)
+        if regressions:
+            print("Performance regressions detected:", file=sys.stderr)
+            for regression in regressions:
+                print(
+                    f"  {regression['metric']}: {regression['baseline']} -> {regression['current']} "
+                    f"({regression['change_pct']:+.1f}%)",
+                    file=sys.stderr
+                )
+            return 1
+        print("No regressions beyond threshold")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
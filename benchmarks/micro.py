@@ -0,0 +1,206 @@
+"""
+Microbenchmarks for CPU-bound content and prompt handling.
+
+Covers the pure-Python hot paths on the request path over a corpus of page
+sizes from 1KB to 500KB:
+
+- ``ScraperService._enhance_content_extraction``
+- prompt assembly in ``LLMService`` (insights and chat)
+- ```json fence stripping + ``json.loads`` of the insights response
+- ``AnalyzeResponse`` construction
+- token-budget fitting of page content (``PromptBuilder``)
+
+Usage:
+    python -m benchmarks.micro                       # run and print
+    python -m benchmarks.micro --save-baseline       # store benchmarks/baselines/micro.json
+    python -m benchmarks.micro --compare             # exit 1 on regressions beyond --max-regression
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.fakes import FAKE_INSIGHTS, build_page
+from benchmarks.stats import compare_reports, load_report, save_report
+
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "micro.json"
+SIZES = {"1KB": 1_000, "10KB": 10_000, "50KB": 50_000, "100KB": 100_000, "500KB": 500_000}
+GATED_METRICS = ["min_us"]
+
+
+def _ensure_settings_env():
+    """The services read settings at import time; provide inert values if unset."""
+    for name, value in {
+        "GEMINI_API_KEY": "bench",
+        "JINA_API_KEY": "bench",
+        "SUPABASE_URL": "http://127.0.0.1:1",
+        "SUPABASE_KEY": "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.bench",
+        "API_SECRET_KEY": "bench",
+    }.items():
+        os.environ.setdefault(name, value)
+
+
+def measure(func: Callable[[], object], repeat: int, min_round_time: float = 0.05) -> Dict[str, float]:
+    """
+    Time ``func`` like ``timeit.autorange``: calibrate a loop count so one
+    round takes at least ``min_round_time``, then take ``repeat`` rounds.
+    """
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_round_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_round_time / elapsed) + 1)
+
+    per_op_us = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        per_op_us.append((time.perf_counter() - started) / loops * 1e6)
+
+    median = statistics.median(per_op_us)
+    return {
+        "loops": loops,
+        "min_us": round(min(per_op_us), 3),
+        "median_us": round(median, 3),
+        "ops_per_sec": round(1e6 / median, 1) if median else 0.0,
+    }
+
+
+def build_cases(sizes: List[str]) -> Dict[str, Dict[str, Callable[[], object]]]:
+    """Return ``{benchmark: {size_label: callable}}``."""
+    _ensure_settings_env()
+    from app.models.schemas import AnalyzeResponse, BusinessInsights
+    from app.services.llm import LLMService
+    from app.services.prompt_builder import prompt_builder
+    from app.services.scraper import ScraperService
+
+    scraper = ScraperService()
+    llm = LLMService()
+    url = "https://bench.example.com/"
+    history = [
+        {"query": f"Question {i} about the company?", "response": f"Answer {i} " * 40}
+        for i in range(10)
+    ]
+    fenced_response = "```json\n" + json.dumps(FAKE_INSIGHTS, indent=2) + "\n```"
+    timestamp = datetime.utcnow()
+
+    cases: Dict[str, Dict[str, Callable[[], object]]] = {
+        "enhance_content": {},
+        "insights_prompt": {},
+        "questions_prompt": {},
+        "chat_prompt": {},
+        "split_sections": {},
+        "fit_content": {},
+        "parse_insights": {"fixed": lambda: llm._parse_insights_response(fenced_response)},
+        "analyze_response": {
+            "fixed": lambda: AnalyzeResponse(
+                url=url, insights=BusinessInsights(**FAKE_INSIGHTS), timestamp=timestamp
+            )
+        },
+    }
+    questions = ["What do they sell?", "Where are they based?", "How big is the team?"]
+    for label in sizes:
+        page = build_page(url, SIZES[label])
+        enhanced = scraper._enhance_content_extraction(page, url)
+        cases["enhance_content"][label] = lambda p=page: scraper._enhance_content_extraction(p, url)
+        cases["insights_prompt"][label] = lambda c=enhanced: llm._build_insights_prompt(c)
+        cases["questions_prompt"][label] = lambda c=enhanced: llm._build_insights_prompt(c, questions)
+        cases["chat_prompt"][label] = lambda c=enhanced: llm._build_chat_prompt(c, "What do they sell?", history)
+        cases["split_sections"][label] = lambda c=enhanced: prompt_builder.split_sections(c)
+        sections = prompt_builder.split_sections(enhanced)
+        cases["fit_content"][label] = lambda c=enhanced, s=sections: prompt_builder.fit(
+            c, "chat", llm.model_name, query="What do they sell?", sections=s
+        )
+    return cases
+
+
+def run(sizes: List[str], repeat: int, only: Optional[List[str]] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+    report: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for name, by_size in build_cases(sizes).items():
+        if only and name not in only:
+            continue
+        report[name] = {label: measure(func, repeat) for label, func in by_size.items()}
+    return report
+
+
+def print_table(report, baseline=None):
+    print(f"{'benchmark':<20} {'size':>6} {'min_us':>12} {'median_us':>12} {'ops/sec':>12} {'vs baseline':>12}")
+    for name, by_size in report.items():
+        for label, result in by_size.items():
+            delta = ""
+            base = (baseline or {}).get(name, {}).get(label)
+            if base and base.get("min_us"):
+                delta = f"{(result['min_us'] - base['min_us']) / base['min_us'] * 100:+.1f}%"
+            print(
+                f"{name:<20} {label:>6} {result['min_us']:>12.2f} {result['median_us']:>12.2f} "
+                f"{result['ops_per_sec']:>12.1f} {delta:>12}"
+            )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(SIZES), help="Comma-separated page sizes")
+    parser.add_argument("--only", help="Comma-separated benchmark names to run")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed rounds per case")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store this run as the baseline (with --only, update just those benchmarks)")
+    parser.add_argument("--compare", action="store_true", help="Exit 1 on regressions beyond --max-regression")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed fractional slowdown")
+    parser.add_argument("--json", action="store_true", help="Print the raw JSON report")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    sizes = [s for s in args.sizes.split(",") if s]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        print(f"Unknown sizes: {', '.join(unknown)} (choose from {', '.join(SIZES)})", file=sys.stderr)
+        return 2
+
+    report = run(sizes, args.repeat, args.only.split(",") if args.only else None)
+    baseline = load_report(args.baseline) if args.baseline.exists() else None
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(report, baseline)
+
+    if args.save_baseline:
+        # A partial run (--only) refreshes just those benchmarks in the stored baseline
+        save_report(args.baseline, {**(baseline or {}), **report} if args.only else report)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if args.compare:
+        if baseline is None:
+            print(f"No baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+            return 2
+        regressions = compare_reports(report, baseline, args.max_regression, GATED_METRICS)
+        if regressions:
+            print("Performance regressions detected:", file=sys.stderr)
+            for regression in regressions:
+                print(
+                    f"  {regression['metric']}: {regression['baseline']}us -> {regression['current']}us "
+                    f"({regression['change_pct']:+.1f}%)",
+                    file=sys.stderr
+                )
+            return 1
+        print("No regressions beyond threshold")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
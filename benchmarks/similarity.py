@@ -0,0 +1,85 @@
+"""
+Query latency and recall of the in-process similarity index (``IVFIndex``).
+
+Builds an index over synthetic clustered unit vectors (embedding real insights
+at this scale would mostly time the embedder), then times ``search`` and
+compares its top-k with an exhaustive scan.
+
+Usage:
+    python -m benchmarks.similarity                    # 1M vectors, 256 dimensions
+    python -m benchmarks.similarity --vectors 100000 --nprobe 8
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from app.utils.vector_index import IVFIndex
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around random cluster centres, like embeddings of similar companies."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = np.empty((count, dim), dtype=np.float32)
+    for begin in range(0, count, 100_000):
+        end = min(begin + 100_000, count)
+        labels = rng.integers(0, clusters, end - begin)
+        vectors[begin:end] = centres[labels] + 0.5 * rng.standard_normal((end - begin, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    vectors = synthetic_vectors(args.vectors, args.dimensions, args.clusters)
+    index = IVFIndex(args.dimensions, nprobe=args.nprobe)
+
+    started = time.perf_counter()
+    for begin in range(0, args.vectors, 10_000):
+        index.add_many((f"https://site-{i}.com", vectors[i]) for i in range(begin, min(begin + 10_000, args.vectors)))
+    loaded = time.perf_counter() - started
+    started = time.perf_counter()
+    index.train()
+    trained = time.perf_counter() - started
+
+    rng = np.random.default_rng(1)
+    queries = rng.choice(args.vectors, args.queries, replace=False)
+    latencies, recalls = [], []
+    for i in queries:
+        started = time.perf_counter()
+        found = index.search(vectors[i], args.k, exclude=f"https://site-{i}.com")
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        scores = vectors @ vectors[i]
+        scores[i] = -np.inf
+        exact = {f"https://site-{j}.com" for j in np.argpartition(scores, -args.k)[-args.k:]}
+        recalls.append(len(exact & {url for url, _ in found}) / args.k)
+
+    latencies.sort()
+    print(f"vectors={args.vectors} dimensions={args.dimensions} nprobe={args.nprobe}")
+    print(f"load {loaded:.1f}s, train {trained:.1f}s")
+    print(
+        f"query p50 {statistics.median(latencies):.2f}ms "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f}ms "
+        f"recall@{args.k} {statistics.mean(recalls):.3f}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
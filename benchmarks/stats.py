@@ -0,0 +1,94 @@
+"""
+Shared statistics and baseline comparison helpers for the benchmark suites.
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile; returns 0.0 for an empty sample."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_latencies(latencies_ms: Sequence[float]) -> Dict[str, float]:
+    """Summarize a latency sample (milliseconds) into the reported percentiles."""
+    if not latencies_ms:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "count": len(latencies_ms),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3),
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "max_ms": round(max(latencies_ms), 3),
+    }
+
+
+def flatten(report: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten a nested report into ``a.b.c`` -> number pairs."""
+    flat = {}
+    for key, value in report.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def _higher_is_better(metric: str) -> bool:
+    leaf = metric.rsplit(".", 1)[-1]
+    return leaf.endswith("_rps") or leaf.endswith("_per_sec") or leaf == "ops"
+
+
+def compare_reports(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+    metrics: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Compare two reports metric by metric.
+
+    A metric regresses when it moves in the bad direction by more than
+    ``threshold`` (a fraction, e.g. 0.1 for 10%). Only metrics present in
+    both reports (optionally filtered by suffix) are compared.
+    """
+    current_flat = flatten(current)
+    baseline_flat = flatten(baseline)
+    regressions = []
+    for name, base in baseline_flat.items():
+        if name not in current_flat or base == 0:
+            continue
+        if metrics and not any(name.endswith(m) for m in metrics):
+            continue
+        value = current_flat[name]
+        change = (value - base) / abs(base)
+        worse = -change if _higher_is_better(name) else change
+        if worse > threshold:
+            regressions.append({
+                "metric": name,
+                "baseline": base,
+                "current": value,
+                "change_pct": round(change * 100, 1),
+            })
+    return regressions
+
+
+def load_report(path: Path) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_report(path: Path, report: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -18,7 +18,7 @@ async function chatAboutWebsite(
   apiKey: string,
   url: string,
   query: string,
-  conversationHistory?: Array<{ query: string; response: string }>
+  sessionId?: string
 ): Promise<ChatResponse> {
   const response = await fetch(`${API_URL}/api/chat`, {
     method: 'POST',
@@ -29,7 +29,7 @@ async function chatAboutWebsite(
     body: JSON.stringify({
       url,
       query,
-      conversation_history: conversationHistory,
+      session_id: sessionId,
     }),
   });
 
@@ -49,6 +49,8 @@ export function ChatInterface({ apiKey, analyzedUrl }: ChatInterfaceProps) {
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  // Server-side conversation; issued by the API on the first message
+  const [sessionId, setSessionId] = useState<string | undefined>(undefined);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   const scrollToBottom = () => {
@@ -75,17 +77,13 @@ export function ChatInterface({ apiKey, analyzedUrl }: ChatInterfaceProps) {
     setError(null);
 
     try {
-      const conversationHistory = messages.map(msg => ({
-        query: msg.query,
-        response: msg.response,
-      }));
-
       const response: ChatResponse = await chatAboutWebsite(
         apiKey,
         analyzedUrl,
         userMessage.query,
-        conversationHistory
+        sessionId
       );
+      setSessionId(response.session_id);
 
       const botMessage: ConversationMessage = {
         id: (Date.now() + 1).toString(),
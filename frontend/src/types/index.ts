@@ -20,6 +20,7 @@ export interface AnalyzeResponse {
 
 export interface ChatResponse {
   response: string;
+  session_id?: string;
   timestamp: string;
 }
 
@@ -3,6 +3,8 @@
 
 -- Enable UUID extension if not already enabled
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+-- Trigram indexes for substring facet filters
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Create website_analyses table
 CREATE TABLE IF NOT EXISTS website_analyses (
@@ -10,23 +12,75 @@ CREATE TABLE IF NOT EXISTS website_analyses (
     url TEXT UNIQUE NOT NULL,
     raw_content TEXT,
     insights JSONB,
+    token_count INTEGER,
+    sections JSONB,
+    content_hash TEXT,
+    -- Local embedding of insights for similar-company search (indexed in-process)
+    embedding REAL[],
+    -- Search facets and full-text vector, generated from insights
+    industry TEXT GENERATED ALWAYS AS (insights->>'industry') STORED,
+    location TEXT GENERATED ALWAYS AS (insights->>'location') STORED,
+    company_size TEXT GENERATED ALWAYS AS (insights->>'company_size') STORED,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(insights->>'industry', '') || ' ' || coalesce(insights->>'location', '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(insights->>'products_services', '') || ' ' || coalesce(insights->>'usp', '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(insights->>'target_audience', '') || ' ' || coalesce(insights->>'company_size', '')), 'C')
+    ) STORED,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Upgrade existing installations
+-- token_count: estimated prompt tokens of raw_content
+-- sections: heading-delimited sections of raw_content ({title, start, end, tokens, hash})
+-- content_hash: sha256 of raw_content, to detect unchanged re-scrapes
+ALTER TABLE website_analyses ADD COLUMN IF NOT EXISTS token_count INTEGER;
+ALTER TABLE website_analyses ADD COLUMN IF NOT EXISTS sections JSONB;
+ALTER TABLE website_analyses ADD COLUMN IF NOT EXISTS content_hash TEXT;
+-- embedding: hashed bag-of-words vector of insights (rows without one are embedded at startup)
+ALTER TABLE website_analyses ADD COLUMN IF NOT EXISTS embedding REAL[];
+-- industry / location / company_size / search_vector: generated from insights for search
+ALTER TABLE website_analyses ADD COLUMN IF NOT EXISTS industry TEXT GENERATED ALWAYS AS (insights->>'industry') STORED;
+ALTER TABLE website_analyses ADD COLUMN IF NOT EXISTS location TEXT GENERATED ALWAYS AS (insights->>'location') STORED;
+ALTER TABLE website_analyses ADD COLUMN IF NOT EXISTS company_size TEXT GENERATED ALWAYS AS (insights->>'company_size') STORED;
+ALTER TABLE website_analyses ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(insights->>'industry', '') || ' ' || coalesce(insights->>'location', '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(insights->>'products_services', '') || ' ' || coalesce(insights->>'usp', '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(insights->>'target_audience', '') || ' ' || coalesce(insights->>'company_size', '')), 'C')
+) STORED;
+
 -- Create conversations table
 CREATE TABLE IF NOT EXISTS conversations (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     url TEXT NOT NULL,
+    -- Chat session the turn belongs to; history is read per session
+    session_id TEXT,
     query TEXT NOT NULL,
     response TEXT NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Upgrade existing installations
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS session_id TEXT;
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_website_analyses_url ON website_analyses(url);
-CREATE INDEX IF NOT EXISTS idx_conversations_url ON conversations(url);
+CREATE INDEX IF NOT EXISTS idx_website_analyses_updated_at ON website_analyses(updated_at);
+-- Chat history: newest turns of a session (or a URL) read straight off the index in order.
+-- query/response are not INCLUDEd: long responses exceed the B-tree row size limit.
+CREATE INDEX IF NOT EXISTS idx_conversations_session_created_at ON conversations(session_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_url_created_at ON conversations(url, created_at DESC);
+-- Superseded by idx_conversations_url_created_at
+DROP INDEX IF EXISTS idx_conversations_url;
 CREATE INDEX IF NOT EXISTS idx_conversations_created_at ON conversations(created_at DESC);
+-- Search: full-text, substring facets, newest-first listing
+CREATE INDEX IF NOT EXISTS idx_website_analyses_search ON website_analyses USING GIN(search_vector);
+CREATE INDEX IF NOT EXISTS idx_website_analyses_industry_trgm ON website_analyses USING GIN(industry gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_website_analyses_location_trgm ON website_analyses USING GIN(location gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_website_analyses_company_size_trgm ON website_analyses USING GIN(company_size gin_trgm_ops);
+-- Keyset pagination for bulk export (ascending) and listing (scanned backwards)
+CREATE INDEX IF NOT EXISTS idx_website_analyses_updated_at_id ON website_analyses(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_conversations_created_at_id ON conversations(created_at, id);
 
 -- Create updated_at trigger for website_analyses
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi.testclient import TestClient
 from app.main import app
 from app.config import Settings
+from app.services.answer_cache import chat_answer_cache
 
 
 @pytest.fixture(scope="session")
@@ -35,7 +36,9 @@ def mock_settings():
 @pytest.fixture(autouse=True)
 def mock_app_settings():
     """Mock app settings for all tests."""
-    with patch('app.config.settings') as mock_settings:
+    # Modules hold the settings object itself; auth needs the test secret without any env set
+    with patch('app.config.settings') as mock_settings, \
+            patch('app.utils.auth.settings.api_secret_key', "test_secret_key"):
         mock_settings.api_secret_key = "test_secret_key"
         mock_settings.gemini_api_key = "test_gemini_key"
         mock_settings.supabase_url = "https://test.supabase.co"
@@ -45,6 +48,13 @@ def mock_app_settings():
         yield mock_settings
 
 
+@pytest.fixture(autouse=True)
+def empty_chat_answer_cache():
+    """Chat answers cached by one test must not answer another test's questions."""
+    chat_answer_cache.clear()
+    yield
+
+
 @pytest.fixture
 def sample_website_content():
     """Sample website content for testing."""
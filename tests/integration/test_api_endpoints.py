@@ -1,15 +1,22 @@
+import asyncio
 import pytest
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch, AsyncMock
+from fastapi import WebSocketDisconnect
 from fastapi.testclient import TestClient
+import app.main as app_module
+from app.config import ApiKeyConfig
 from app.main import app
+from app.models.schemas import BusinessInsights, StructuredAnalysis
 
 
 class TestAPIEndpoints:
     """Integration tests for API endpoints."""
 
     def setup_method(self):
-        """Setup test client."""
+        """Setup test client with fresh rate limit counters."""
         self.client = TestClient(app)
+        app_module.limiter.reset()
         self.auth_headers = {"Authorization": "Bearer test_secret_key"}
 
     def test_health_endpoint(self):
@@ -20,6 +27,60 @@ class TestAPIEndpoints:
         assert data["status"] == "healthy"
         assert "timestamp" in data
 
+    def test_saturated_endpoint_sheds_load(self):
+        """Test a full chat queue gets fast 503s with Retry-After and fails the health check."""
+        gate = app_module.admission_gates["chat"]
+        with patch.object(gate, 'in_flight', gate.max_in_flight), patch.object(gate, 'queued', gate.max_queue):
+            response = self.client.post(
+                "/api/chat", json={"url": "https://example.com", "query": "Hi?"}, headers=self.auth_headers
+            )
+            health = self.client.get("/health")
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"]
+        assert health.status_code == 503
+        assert health.json()["status"] == "saturated"
+        assert health.json()["admission"]["chat"]["rejected"] >= 1
+
+    def test_saturated_endpoint_authenticates_first(self):
+        """Test requests with a bad key are refused as such, without taking or waiting for a slot."""
+        gate = app_module.admission_gates["chat"]
+        rejected = gate.stats["rejected"]
+        with patch.object(gate, 'in_flight', gate.max_in_flight), patch.object(gate, 'queued', gate.max_queue):
+            response = self.client.post(
+                "/api/chat", json={"url": "https://example.com", "query": "Hi?"},
+                headers={"Authorization": "Bearer wrong_key"}
+            )
+
+        assert response.status_code == 401
+        assert gate.stats["rejected"] == rejected
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.profiler.api_key_for')
+    def test_profiled_request(self, mock_key, mock_auth):
+        """Test a request with X-Profile is profiled, and its stacks and allocations are downloadable."""
+        mock_auth.return_value = "test_secret_key"
+        mock_key.return_value = ApiKeyConfig(name="default")
+        headers = {**self.auth_headers, "X-Profile": "1"}
+
+        with patch('app.services.profiler.settings.profiling_enabled', False):
+            assert "x-profile-id" not in self.client.get("/health", headers=headers).headers
+            assert self.client.get("/api/profiles/unknown", headers=self.auth_headers).status_code == 404
+
+        with patch('app.services.profiler.settings.profiling_enabled', True), \
+                patch('app.main.settings.profiling_enabled', True):
+            response = self.client.get("/health", headers=headers)
+            profile_id = response.headers["x-profile-id"]
+            stacks = self.client.get(f"/api/profiles/{profile_id}", headers=self.auth_headers)
+            allocations = self.client.get(f"/api/profiles/{profile_id}/allocations", headers=self.auth_headers)
+            unprofiled = self.client.get("/health")
+
+        assert response.status_code == 200
+        assert stacks.status_code == 200
+        assert f'filename="profile-{profile_id}.folded"' in stacks.headers["content-disposition"]
+        assert allocations.text.startswith("# Allocations during GET /health")
+        assert "x-profile-id" not in unprofiled.headers
+
     def test_root_endpoint(self):
         """Test root endpoint."""
         response = self.client.get("/")
@@ -75,6 +136,190 @@ class TestAPIEndpoints:
         assert data["url"] == "https://example.com"
         assert "cloud computing" in data["insights"]["products_services"]
 
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.scraper.scraper_service.scrape_website')
+    @patch('app.services.llm.llm_service.extract_structured_insights')
+    @patch('app.services.database.db_service.store_website_analysis')
+    def test_analyze_endpoint_structured(self, mock_store, mock_extract, mock_scrape, mock_auth,
+                                         sample_website_content, sample_insights):
+        """Test structured analysis returns insights and answers together."""
+        mock_auth.return_value = "test_secret_key"
+        mock_scrape.return_value = sample_website_content
+        mock_extract.return_value = StructuredAnalysis(
+            insights=BusinessInsights(**sample_insights),
+            answers={"What is the main product?": "Cloud computing."}
+        )
+        mock_store.return_value = "test-analysis-id"
+        
+        payload = {
+            "url": "https://example.com",
+            "questions": ["What is the main product?"],
+            "structured": True
+        }
+        
+        response = self.client.post("/api/analyze", json=payload, headers=self.auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["insights"]["industry"] == "Technology"
+        assert data["answers"]["What is the main product?"] == "Cloud computing."
+        stored_insights = mock_store.call_args.kwargs["insights"]
+        assert stored_insights["answers"] == {"What is the main product?": "Cloud computing."}
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.scraper.scraper_service.scrape_website')
+    @patch('app.services.llm.llm_service.extract_business_insights')
+    @patch('app.services.database.db_service.store_website_analysis')
+    def test_analyze_endpoint_deadline_partial(self, mock_store, mock_extract, mock_scrape, mock_auth):
+        """Test a model call outliving the deadline yields the locally extracted contacts."""
+        async def slow_extract(**kwargs):
+            await asyncio.sleep(5)
+
+        mock_auth.return_value = "test_secret_key"
+        mock_scrape.return_value = "# Acme\nContact us at hello@acme.io or +1 415 555 0100."
+        mock_extract.side_effect = slow_extract
+        mock_store.return_value = "test-analysis-id"
+
+        headers = {**self.auth_headers, "X-Request-Timeout": "0.2"}
+        response = self.client.post("/api/analyze", json={"url": "https://example.com"}, headers=headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["partial"] is True
+        assert data["insights"]["contact_info"]["emails"] == ["hello@acme.io"]
+        assert data["insights"]["contact_info"]["phones"] == ["+1 415 555 0100"]
+        assert "insights" not in mock_store.call_args.kwargs
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.scraper.scraper_service.scrape_website')
+    @patch('app.services.llm.llm_service.extract_business_insights')
+    @patch('app.services.database.db_service.store_website_analysis')
+    def test_analyze_endpoint_overlaps_stages(self, mock_store, mock_extract, mock_scrape, mock_auth,
+                                              sample_insights):
+        """Test the content write overlaps the model call and stage timings are reported."""
+        async def slow_store(**kwargs):
+            await asyncio.sleep(0.3)
+            return "test-analysis-id"
+
+        async def slow_extract(**kwargs):
+            await asyncio.sleep(0.3)
+            return dict(sample_insights)
+
+        mock_auth.return_value = "test_secret_key"
+        mock_scrape.return_value = "# Acme\nContact us at hello@acme.io."
+        mock_store.side_effect = slow_store
+        mock_extract.side_effect = slow_extract
+
+        response = self.client.post("/api/analyze", json={"url": "https://example.com"}, headers=self.auth_headers)
+
+        assert response.status_code == 200
+        timing = response.headers["server-timing"]
+        assert "insights;dur=" in timing and "store_content;dur=" in timing
+        assert 'critical;desc="scrape>sections>' in timing
+        critical = float(timing.split('critical;desc="')[1].split("dur=")[1])
+        assert critical < 850
+        assert mock_store.call_count == 2
+        assert "insights" in mock_store.call_args.kwargs
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.scraper.scraper_service.scrape_website')
+    @patch('app.services.llm.llm_service.extract_business_insights')
+    def test_analyze_endpoint_deadline_scrape(self, mock_extract, mock_scrape, mock_auth):
+        """Test a scrape outliving its share of the deadline returns 504 without calling the model."""
+        async def slow_scrape(url):
+            await asyncio.sleep(5)
+
+        mock_auth.return_value = "test_secret_key"
+        mock_scrape.side_effect = slow_scrape
+
+        headers = {**self.auth_headers, "X-Request-Timeout": "0.2"}
+        response = self.client.post("/api/analyze", json={"url": "https://example.com"}, headers=headers)
+
+        assert response.status_code == 504
+        assert "scrape" in response.json()["detail"]
+        mock_extract.assert_not_called()
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.scraper.scraper_service.scrape_website')
+    @patch('app.services.llm.llm_service.extract_business_insights')
+    @patch('app.services.database.db_service.get_website_analysis')
+    @patch('app.services.database.db_service.store_website_analysis')
+    def test_analyze_endpoint_incremental_unchanged(self, mock_store, mock_get, mock_extract, mock_scrape,
+                                                    mock_auth, sample_website_content, sample_insights):
+        """Test incremental re-analysis of unchanged content skips the model."""
+        from app.services.prompt_builder import prompt_builder
+
+        mock_auth.return_value = "test_secret_key"
+        mock_scrape.return_value = sample_website_content
+        mock_get.return_value = {
+            "raw_content": sample_website_content,
+            "insights": sample_insights,
+            "sections": [s.to_dict() for s in prompt_builder.split_sections(sample_website_content)]
+        }
+        mock_store.return_value = "test-analysis-id"
+
+        payload = {"url": "https://example.com", "incremental": True}
+
+        response = self.client.post("/api/analyze", json=payload, headers=self.auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["analysis_mode"] == "unchanged"
+        assert data["insights"]["industry"] == "Technology"
+        mock_extract.assert_not_called()
+        assert mock_store.call_args_list[0].kwargs["content_hash"]
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.scraper.scraper_service.scrape_website')
+    @patch('app.services.scheduler.freshness_scheduler.revalidate')
+    @patch('app.services.database.db_service.get_website_analysis')
+    def test_analyze_endpoint_max_age_fresh(self, mock_get, mock_revalidate, mock_scrape, mock_auth,
+                                            sample_insights):
+        """Test a recent stored analysis is served without re-analyzing."""
+        mock_auth.return_value = "test_secret_key"
+        mock_get.return_value = {
+            "url": "https://example.com",
+            "insights": sample_insights,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+
+        payload = {"url": "https://example.com", "max_age": 3600}
+
+        response = self.client.post("/api/analyze", json=payload, headers=self.auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["cached"] is True
+        assert data["stale"] is False
+        assert data["insights"]["industry"] == "Technology"
+        mock_scrape.assert_not_called()
+        mock_revalidate.assert_not_called()
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.scraper.scraper_service.scrape_website')
+    @patch('app.services.scheduler.freshness_scheduler.revalidate')
+    @patch('app.services.database.db_service.get_website_analysis')
+    def test_analyze_endpoint_max_age_stale(self, mock_get, mock_revalidate, mock_scrape, mock_auth,
+                                            sample_insights):
+        """Test a stale stored analysis is served flagged and refreshed in the background."""
+        mock_auth.return_value = "test_secret_key"
+        mock_get.return_value = {
+            "url": "https://example.com",
+            "insights": sample_insights,
+            "updated_at": (datetime.now(timezone.utc) - timedelta(hours=2)).isoformat()
+        }
+
+        payload = {"url": "https://example.com", "max_age": 3600}
+
+        response = self.client.post("/api/analyze", json=payload, headers=self.auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["cached"] is True
+        assert data["stale"] is True
+        mock_scrape.assert_not_called()
+        mock_revalidate.assert_called_once_with("https://example.com/")
+
     def test_analyze_endpoint_unauthorized(self):
         """Test analysis endpoint without authentication."""
         payload = {"url": "https://example.com"}
@@ -134,6 +379,184 @@ class TestAPIEndpoints:
         data = response.json()
         assert "cloud computing solutions" in data["response"]
 
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.database.db_service.get_website_analysis')
+    @patch('app.services.llm.llm_service.answer_conversational_query')
+    @patch('app.services.database.db_service.store_conversation')
+    @patch('app.services.database.db_service.get_conversation_history')
+    def test_chat_endpoint_session(self, mock_history, mock_store_conv, mock_answer,
+                                   mock_get_analysis, mock_auth, sample_website_content):
+        """Test chat history is scoped to the session and sent oldest first."""
+        mock_auth.return_value = "test_secret_key"
+        mock_get_analysis.return_value = {"raw_content": sample_website_content}
+        mock_history.return_value = [
+            {"query": "Second?", "response": "B"},
+            {"query": "First?", "response": "A"}
+        ]
+        mock_answer.return_value = "Enterprise businesses."
+        mock_store_conv.return_value = "conv-id"
+
+        payload = {"url": "https://example.com", "query": "Who buys it?", "session_id": "session-1"}
+
+        response = self.client.post("/api/chat", json=payload, headers=self.auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["session_id"] == "session-1"
+        assert mock_history.call_args.kwargs["session_id"] == "session-1"
+        history = mock_answer.call_args.kwargs["conversation_history"]
+        assert [turn["query"] for turn in history] == ["First?", "Second?"]
+        assert mock_store_conv.call_args.kwargs["session_id"] == "session-1"
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.database.db_service.get_website_analysis')
+    @patch('app.services.llm.llm_service.answer_conversational_query')
+    @patch('app.services.database.db_service.store_conversation')
+    @patch('app.services.database.db_service.get_conversation_history')
+    def test_chat_endpoint_new_session(self, mock_history, mock_store_conv, mock_answer,
+                                       mock_get_analysis, mock_auth, sample_website_content):
+        """Test a chat without a session starts a new one with no history."""
+        mock_auth.return_value = "test_secret_key"
+        mock_get_analysis.return_value = {"raw_content": sample_website_content}
+        mock_answer.return_value = "Cloud computing."
+        mock_store_conv.return_value = "conv-id"
+
+        payload = {"url": "https://example.com", "query": "What is the main product?"}
+
+        response = self.client.post("/api/chat", json=payload, headers=self.auth_headers)
+
+        assert response.status_code == 200
+        session_id = response.json()["session_id"]
+        assert session_id
+        mock_history.assert_not_called()
+        assert mock_store_conv.call_args.kwargs["session_id"] == session_id
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.write_behind.write_behind.enabled', True)
+    @patch('app.services.scraper.scraper_service.scrape_website')
+    @patch('app.services.llm.llm_service.extract_business_insights')
+    @patch('app.services.llm.llm_service.answer_conversational_query')
+    @patch('app.services.database.db_service.get_website_analysis')
+    @patch('app.services.database.db_service.store_website_analysis')
+    def test_write_behind_read_your_writes(self, mock_store, mock_get_analysis, mock_answer, mock_extract,
+                                           mock_scrape, mock_auth, sample_website_content, sample_insights):
+        """Test queued writes are acknowledged at once and visible to the next chat."""
+        from app.services.write_behind import write_behind
+        mock_auth.return_value = "test_secret_key"
+        mock_scrape.return_value = sample_website_content
+        mock_extract.return_value = sample_insights
+        mock_get_analysis.return_value = None
+        mock_answer.return_value = "Cloud computing."
+
+        try:
+            response = self.client.post("/api/analyze", json={"url": "https://example.com"}, headers=self.auth_headers)
+            assert response.status_code == 200
+            mock_store.assert_not_called()
+
+            response = self.client.post(
+                "/api/chat", json={"url": "https://example.com", "query": "What do they sell?"}, headers=self.auth_headers
+            )
+            assert response.status_code == 200
+            assert mock_answer.call_args.kwargs["content"] == sample_website_content
+            assert len(write_behind.pending_rows("conversations", url="https://example.com/")) == 1
+        finally:
+            write_behind._pending.clear()
+
+    @patch('app.main.websocket_api_key')
+    @patch('app.services.database.db_service.get_website_analysis')
+    @patch('app.services.llm.llm_service.stream_conversational_query')
+    @patch('app.services.database.db_service.store_conversation')
+    @patch('app.services.database.db_service.get_conversation_history')
+    def test_chat_websocket_session(self, mock_history, mock_store_conv, mock_stream,
+                                    mock_get_analysis, mock_key, sample_website_content):
+        """Test a WebSocket session loads the site once, streams answers and keeps its history."""
+        async def stream(**kwargs):
+            for chunk in ("Cloud ", "computing."):
+                yield chunk
+
+        mock_key.return_value = ApiKeyConfig(name="default")
+        mock_get_analysis.return_value = {"raw_content": sample_website_content}
+        mock_history.return_value = [{"id": "1", "query": "First?", "response": "A"}]
+        mock_stream.side_effect = stream
+        mock_store_conv.return_value = "conv-id"
+
+        with self.client.websocket_connect("/ws/chat?url=https://example.com&session_id=session-1") as websocket:
+            assert websocket.receive_json() == {"type": "ready", "session_id": "session-1"}
+            for query in ("What do they sell?", "Who buys it?"):
+                websocket.send_json({"query": query})
+                assert websocket.receive_json() == {"type": "chunk", "text": "Cloud "}
+                assert websocket.receive_json() == {"type": "chunk", "text": "computing."}
+                done = websocket.receive_json()
+                assert done["type"] == "done"
+                assert done["response"] == "Cloud computing."
+            websocket.send_json({"question": "Hi?"})
+            assert websocket.receive_json()["type"] == "error"
+
+        assert mock_get_analysis.call_count == 1
+        assert mock_history.call_count == 1
+        history = mock_stream.call_args.kwargs["conversation_history"]
+        assert [turn["query"] for turn in history] == ["First?", "What do they sell?"]
+        assert mock_store_conv.call_count == 2
+        assert mock_store_conv.call_args.kwargs["session_id"] == "session-1"
+        assert app_module.chat_sessions.metrics()["sessions"] == 0
+
+    @patch('app.main.websocket_api_key')
+    def test_chat_websocket_unauthorized(self, mock_key):
+        """Test a WebSocket handshake without a valid key is refused."""
+        mock_key.return_value = None
+
+        with pytest.raises(WebSocketDisconnect) as error:
+            with self.client.websocket_connect("/ws/chat?url=https://example.com"):
+                pass
+
+        assert error.value.code == 1008
+
+    @patch('app.main.websocket_api_key')
+    @patch('app.services.database.db_service.get_website_analysis')
+    @patch('app.services.llm.llm_service.stream_conversational_query')
+    @patch('app.services.database.db_service.store_conversation')
+    def test_chat_websocket_rate_limit_and_binary(self, mock_store_conv, mock_stream, mock_get_analysis, mock_key,
+                                                  sample_website_content):
+        """Test WebSocket questions are held to the per-IP rate limit and binary frames close the socket."""
+        async def stream(**kwargs):
+            yield "Cloud computing."
+
+        mock_key.return_value = ApiKeyConfig(name="default")
+        mock_get_analysis.return_value = {"raw_content": sample_website_content}
+        mock_stream.side_effect = stream
+        app_module.ws_message_buckets.clear()
+
+        with patch('app.main.settings.rate_limit_per_minute', 1), \
+                self.client.websocket_connect("/ws/chat?url=https://example.com") as websocket:
+            assert websocket.receive_json()["type"] == "ready"
+            websocket.send_json({"query": "What do they sell?"})
+            assert websocket.receive_json()["type"] == "chunk"
+            assert websocket.receive_json()["type"] == "done"
+            websocket.send_json({"query": "Where are they based?"})
+            error = websocket.receive_json()
+            assert error["type"] == "error" and "Rate limit" in error["detail"]
+            assert error["retry_after"] >= 1
+
+            websocket.send_bytes(b"\x00")
+            assert websocket.receive()["code"] == 1003
+
+        assert mock_stream.call_count == 1
+        app_module.ws_message_buckets.clear()
+
+    @patch('app.main.websocket_api_key')
+    @patch('app.services.database.db_service.get_website_analysis')
+    def test_chat_websocket_saturated(self, mock_get_analysis, mock_key):
+        """Test no session is opened while chats are being shed."""
+        mock_key.return_value = ApiKeyConfig(name="default")
+        gate = app_module.admission_gates["chat"]
+
+        with patch.object(gate, 'in_flight', gate.max_in_flight), patch.object(gate, 'queued', gate.max_queue), \
+                self.client.websocket_connect("/ws/chat?url=https://example.com") as websocket:
+            error = websocket.receive_json()
+            assert error["type"] == "error" and error["retry_after"] >= 1
+            assert websocket.receive()["code"] == 1013
+
+        mock_get_analysis.assert_not_called()
+
     @patch('app.utils.auth.verify_token')
     @patch('app.services.database.db_service.get_website_analysis')
     def test_chat_endpoint_website_not_found(self, mock_get_analysis, mock_auth):
@@ -152,6 +575,139 @@ class TestAPIEndpoints:
         data = response.json()
         assert "Website not found" in data["detail"]
 
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.database.db_service.search_analyses')
+    def test_list_analyses(self, mock_search, mock_auth):
+        """Test listing analyses returns projected summaries and a next cursor."""
+        mock_auth.return_value = "test_secret_key"
+        mock_search.return_value = [
+            {"id": f"id-{i}", "url": f"https://site-{i}.com", "industry": "Technology",
+             "location": "Austin", "company_size": "50", "updated_at": "2024-01-01T00:00:00+00:00"}
+            for i in range(3)
+        ]
+
+        response = self.client.get(
+            "/api/analyses", params={"q": "cloud", "industry": "tech", "limit": 2}, headers=self.auth_headers
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["url"] for item in data["items"]] == ["https://site-0.com", "https://site-1.com"]
+        assert "insights" not in data["items"][0]
+        assert data["next_cursor"]
+        assert mock_search.call_args.kwargs["filters"] == {"industry": "tech"}
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.similarity.similarity_service.ready', True)
+    @patch('app.services.similarity.similarity_service.find_similar')
+    def test_similar_endpoint(self, mock_find, mock_auth):
+        """Test similar companies are returned best first."""
+        mock_auth.return_value = "test_secret_key"
+        mock_find.return_value = [("https://peer.com/", 0.91234), ("https://other.com/", 0.5)]
+
+        response = self.client.get("/api/similar", params={"url": "https://example.com"}, headers=self.auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["results"] == [
+            {"url": "https://peer.com/", "score": 0.9123},
+            {"url": "https://other.com/", "score": 0.5}
+        ]
+        mock_find.assert_called_once_with("https://example.com/", 10)
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.similarity.similarity_service.ready', True)
+    @patch('app.services.similarity.similarity_service.find_similar')
+    def test_similar_endpoint_not_analyzed(self, mock_find, mock_auth):
+        """Test similar search for a website that was never analyzed."""
+        mock_auth.return_value = "test_secret_key"
+        mock_find.return_value = None
+
+        response = self.client.get("/api/similar", params={"url": "https://example.com"}, headers=self.auth_headers)
+
+        assert response.status_code == 404
+
+    @patch('app.utils.auth.verify_token')
+    def test_list_analyses_invalid_cursor(self, mock_auth):
+        """Test a malformed cursor is rejected."""
+        mock_auth.return_value = "test_secret_key"
+
+        response = self.client.get("/api/analyses", params={"cursor": "not-a-cursor"}, headers=self.auth_headers)
+
+        assert response.status_code == 400
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.bulk.db_service.get_rows_after')
+    def test_export_invalid_since(self, mock_rows, mock_auth):
+        """Test a malformed since is rejected before the export starts streaming."""
+        mock_auth.return_value = "test_secret_key"
+
+        response = self.client.get(
+            "/api/export/conversations", params={"since": '2024-01-01",id.gt.0'}, headers=self.auth_headers
+        )
+
+        assert response.status_code == 400
+        mock_rows.assert_not_called()
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.database.db_service.get_website_analysis')
+    def test_get_analysis_conditional(self, mock_get, mock_auth, sample_insights):
+        """Test stored insights are served compressed with an ETag, then as a 304 without reading them."""
+        mock_auth.return_value = "test_secret_key"
+        record = {
+            "url": "https://cached.example.com/",
+            "insights": {**sample_insights, "answers": {"Who founded it?": "Jane"}},
+            "content_hash": "abc123",
+            "updated_at": "2024-01-01T00:00:00+00:00"
+        }
+        mock_get.side_effect = lambda url, columns="*": {
+            key: record[key] for key in (column.strip() for column in columns.split(","))
+        }
+
+        response = self.client.get(
+            "/api/analyses/https://cached.example.com",
+            headers={**self.auth_headers, "Accept-Encoding": "gzip"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["cache-control"].startswith("private, max-age=")
+        data = response.json()
+        assert data["insights"]["industry"] == sample_insights["industry"]
+        assert data["answers"] == {"Who founded it?": "Jane"}
+        etag = response.headers["etag"]
+
+        mock_get.reset_mock()
+        response = self.client.get(
+            "/api/analyses/https://cached.example.com",
+            headers={**self.auth_headers, "Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert mock_get.call_args.kwargs["columns"] == "content_hash, updated_at"
+        assert mock_get.call_count == 1
+
+        # A new write moves updated_at, so the old ETag no longer matches
+        record["updated_at"] = "2024-01-02T00:00:00+00:00"
+        response = self.client.get(
+            "/api/analyses/https://cached.example.com",
+            headers={**self.auth_headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    @patch('app.utils.auth.verify_token')
+    @patch('app.services.database.db_service.get_website_analysis')
+    def test_get_analysis_not_found(self, mock_get, mock_auth):
+        """Test reading a website that was never analyzed."""
+        mock_auth.return_value = "test_secret_key"
+        mock_get.return_value = None
+
+        response = self.client.get("/api/analyses/https://unknown.example.com", headers=self.auth_headers)
+
+        assert response.status_code == 404
+
     def test_chat_endpoint_unauthorized(self):
         """Test chat endpoint without authentication."""
         payload = {
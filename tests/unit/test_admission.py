@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from app.utils.admission import AdmissionGate, Saturated
+
+
+class TestAdmissionGate:
+    """Unit tests for AdmissionGate."""
+
+    @pytest.mark.asyncio
+    async def test_queues_in_order_then_rejects(self):
+        """Test waiters are admitted first come, first served and a full queue rejects at once."""
+        gate = AdmissionGate("test", max_in_flight=1, max_queue=2, queue_timeout=5)
+        await gate.acquire()
+
+        order = []
+
+        async def wait(name):
+            await gate.acquire()
+            order.append(name)
+
+        first = asyncio.create_task(wait("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(wait("second"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(Saturated):
+            await gate.acquire()
+        assert gate.stats["rejected"] == 1
+        assert gate.saturation == 1.0
+
+        gate.release()
+        await first
+        gate.release()
+        await second
+        assert order == ["first", "second"]
+        gate.release()
+        assert gate.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """Test a request that can't get a slot within the timeout is turned away."""
+        gate = AdmissionGate("test", max_in_flight=1, max_queue=5, queue_timeout=0.01)
+        await gate.acquire()
+
+        with pytest.raises(Saturated) as error:
+            await gate.acquire()
+
+        assert error.value.retry_after == 1
+        assert gate.stats["timed_out"] == 1
+        assert gate.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_frees_its_place(self):
+        """Test a client that goes away while queued doesn't hold a slot."""
+        gate = AdmissionGate("test", max_in_flight=1, max_queue=5, queue_timeout=5)
+        await gate.acquire()
+
+        waiting = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        gate.release()
+        assert gate.in_flight == 0
+        await asyncio.wait_for(gate.acquire(), timeout=1)
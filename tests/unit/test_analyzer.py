@@ -0,0 +1,153 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.analyzer import WebsiteAnalyzer, reusable_insights, stored_result
+from app.services.content_diff import diff_sections
+from app.services.prompt_builder import PromptBuilder
+
+PAGE = "\n\n".join([
+    "# Acme Corporation\nWelcome to Acme.",
+    "## Products\n" + "Cloud platform for analytics and automation. " * 20,
+    "## About Us\n" + "Founded in 2010, 150 employees, headquarters in San Francisco. " * 20,
+    "## Contact\nEmail: contact@acme.com\nPhone: +1-555-123-4567",
+])
+
+
+def stored_record(content, insights):
+    sections = PromptBuilder().split_sections(content)
+    return {"raw_content": content, "insights": insights, "sections": [s.to_dict() for s in sections]}
+
+
+class TestDiffSections:
+    """Unit tests for section-level content diffs."""
+
+    def setup_method(self):
+        """Setup test instance."""
+        self.builder = PromptBuilder()
+
+    def test_identical_content(self):
+        """Test identical content has no changes."""
+        sections = self.builder.split_sections(PAGE)
+
+        diff = diff_sections(sections, self.builder.split_sections(PAGE))
+
+        assert not diff.changed
+        assert diff.unchanged == len(sections)
+        assert diff.change_ratio == 0.0
+
+    def test_edited_section(self):
+        """Test an edited section is reported as removed plus added."""
+        updated = PAGE.replace("+1-555-123-4567", "+1-555-987-6543")
+
+        diff = diff_sections(self.builder.split_sections(PAGE), self.builder.split_sections(updated))
+
+        assert [s.title for s in diff.added] == ["Contact"]
+        assert [s.title for s in diff.removed] == ["Contact"]
+        assert "987-6543" in diff.added[0].text(updated)
+        assert 0 < diff.change_ratio < 0.1
+
+    def test_reordered_sections_unchanged(self):
+        """Test moved sections are not treated as changes."""
+        parts = PAGE.split("\n\n")
+        reordered = "\n\n".join([parts[0], parts[2], parts[1], parts[3]])
+
+        diff = diff_sections(self.builder.split_sections(PAGE), self.builder.split_sections(reordered))
+
+        assert not diff.changed
+
+    def test_sections_without_hash_count_as_changed(self):
+        """Test sections stored before hashing was added never match."""
+        old = self.builder.split_sections(PAGE)
+        for section in old:
+            section.hash = ""
+
+        diff = diff_sections(old, self.builder.split_sections(PAGE))
+
+        assert diff.change_ratio == 1.0
+
+
+class TestWebsiteAnalyzer:
+    """Unit tests for WebsiteAnalyzer."""
+
+    def setup_method(self):
+        """Setup test instance."""
+        self.analyzer = WebsiteAnalyzer(full_rerun_ratio=0.3)
+        self.builder = PromptBuilder()
+
+    @pytest.mark.asyncio
+    async def test_unchanged_reuses_insights(self, sample_insights):
+        """Test unchanged content reuses stored insights without a model call."""
+        previous = stored_record(PAGE, {**sample_insights, "answers": {"Q?": "A"}})
+
+        with patch('app.services.analyzer.llm_service') as mock_llm:
+            insights, mode = await self.analyzer.extract_insights(PAGE, self.builder.split_sections(PAGE), previous)
+
+        assert mode == "unchanged"
+        assert insights == sample_insights
+        mock_llm.extract_business_insights.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_small_change_is_incremental(self, sample_insights):
+        """Test a small change sends only the changed sections."""
+        updated = PAGE.replace("+1-555-123-4567", "+1-555-987-6543")
+        previous = stored_record(PAGE, sample_insights)
+
+        with patch('app.services.analyzer.llm_service') as mock_llm:
+            mock_llm.update_business_insights = AsyncMock(return_value={**sample_insights, "location": "Austin"})
+            insights, mode = await self.analyzer.extract_insights(
+                updated, self.builder.split_sections(updated), previous
+            )
+
+        assert mode == "incremental"
+        assert insights["location"] == "Austin"
+        kwargs = mock_llm.update_business_insights.call_args.kwargs
+        assert "987-6543" in kwargs["changed_content"]
+        assert "Cloud platform" not in kwargs["changed_content"]
+        assert kwargs["removed_titles"] == ["Contact"]
+
+    @pytest.mark.asyncio
+    async def test_large_change_runs_full_analysis(self, sample_insights):
+        """Test changes above the threshold re-run the full analysis."""
+        updated = PAGE.replace("Cloud platform", "Payroll software").replace("Founded", "Established")
+        previous = stored_record(PAGE, sample_insights)
+
+        with patch('app.services.analyzer.llm_service') as mock_llm:
+            mock_llm.extract_business_insights = AsyncMock(return_value=sample_insights)
+            _, mode = await self.analyzer.extract_insights(updated, self.builder.split_sections(updated), previous)
+
+        assert mode == "full"
+        mock_llm.update_business_insights.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_update_falls_back_to_full(self, sample_insights):
+        """Test a failed incremental update falls back to a full analysis."""
+        updated = PAGE.replace("+1-555-123-4567", "+1-555-987-6543")
+        previous = stored_record(PAGE, sample_insights)
+
+        with patch('app.services.analyzer.llm_service') as mock_llm:
+            mock_llm.update_business_insights = AsyncMock(side_effect=Exception("Analysis error"))
+            mock_llm.extract_business_insights = AsyncMock(return_value=sample_insights)
+            _, mode = await self.analyzer.extract_insights(
+                updated, self.builder.split_sections(updated), previous
+            )
+
+        assert mode == "full"
+
+    def test_reusable_insights(self, sample_insights):
+        """Test only default insights are reused."""
+        assert reusable_insights(None) is None
+        assert reusable_insights({"insights": None}) is None
+        assert reusable_insights({"insights": {"custom_answers": "..."}}) is None
+        assert reusable_insights({"insights": {"raw_analysis": "..."}}) is None
+        assert reusable_insights({"insights": sample_insights}) == sample_insights
+
+    def test_stored_result(self, sample_insights):
+        """Test stored analyses only answer requests they cover."""
+        record = {"insights": {**sample_insights, "answers": {"Who?": "Enterprises."}}}
+
+        insights, answers = stored_result(record)
+        assert insights.industry == "Technology" and answers is None
+
+        assert stored_result(record, ["Who?"], structured=True)[1] == {"Who?": "Enterprises."}
+        assert stored_result(record, ["Who?", "Where?"], structured=True) is None
+        assert stored_result(record, ["Who?"]) is None
+        assert stored_result({"insights": {"custom_answers": "..."}}) is None
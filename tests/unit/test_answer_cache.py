@@ -0,0 +1,67 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.answer_cache import ChatAnswerCache, history_independent
+from app.services.llm import LLMService
+
+
+class TestChatAnswerCache:
+    """Unit tests for ChatAnswerCache."""
+
+    def setup_method(self):
+        """Cache with two answered questions."""
+        self.cache = ChatAnswerCache(max_sites=10, per_site=10, ttl_seconds=3600, similarity_threshold=0.9)
+        self.cache.set("https://example.com/", "v1", "Where are they based?", "Berlin.")
+        self.cache.set("https://example.com/", "v1", "Do they sell shoes?", "Yes.")
+
+    def test_exact_and_near_duplicate_matches(self):
+        """Test normalized and near-identical questions hit, different or negated ones don't."""
+        assert self.cache.get("https://example.com/", "v1", "  where are they BASED ") == "Berlin."
+        assert self.cache.get("https://example.com/", "v1", "Where is the company based?") == "Berlin."
+        assert self.cache.get("https://example.com/", "v1", "Do they sell boots?") is None
+        assert self.cache.get("https://example.com/", "v1", "Do they not sell shoes?") is None
+        assert self.cache.metrics()["hits"] == 1
+        assert self.cache.metrics()["near_hits"] == 1
+
+    def test_content_change_and_invalidation(self):
+        """Test answers only apply to the content version they were given for."""
+        assert self.cache.get("https://example.com/", "v2", "Where are they based?") is None
+        self.cache.set("https://example.com/", "v2", "Where are they based?", "Munich.")
+        assert self.cache.get("https://example.com/", "v1", "Where are they based?") is None
+
+        self.cache.invalidate("https://example.com/")
+        assert self.cache.get("https://example.com/", "v2", "Where are they based?") is None
+        assert self.cache.metrics()["invalidations"] == 1
+
+    def test_history_independence(self):
+        """Test follow-up questions are only cacheable when they open a conversation."""
+        history = [{"query": "What do they sell?", "response": "Shoes."}]
+
+        assert history_independent("What about pricing?")
+        assert not history_independent("What about pricing?", history)
+        assert not history_independent("Tell me more about it", history)
+        assert history_independent("Where are they based?", history)
+
+
+class TestLLMServiceAnswerCache:
+    """Chat answering through the answer cache."""
+
+    def setup_method(self):
+        """Setup test instance without context caching."""
+        self.llm = LLMService()
+        self.llm.context_cache = None
+
+    @pytest.mark.asyncio
+    async def test_repeated_question_skips_the_model(self, sample_website_content):
+        """Test a repeated standalone question is answered once, a follow-up every time."""
+        history = [{"query": "What do they sell?", "response": "Cloud."}]
+
+        with patch.object(self.llm.model, 'generate_content', return_value=MagicMock(text="Cloud.")) as mock_generate:
+            for _ in range(2):
+                await self.llm.answer_conversational_query(
+                    sample_website_content, "What do they sell?", url="https://example.com/"
+                )
+                await self.llm.answer_conversational_query(
+                    sample_website_content, "What about pricing?", history, url="https://example.com/"
+                )
+
+        assert mock_generate.call_count == 3
@@ -0,0 +1,59 @@
+import pytest
+from benchmarks.fakes import LatencyProfile, build_page
+from benchmarks.micro import measure
+from benchmarks.stats import compare_reports, percentile, summarize_latencies
+
+
+class TestBenchmarkStats:
+    """Unit tests for the benchmark statistics helpers."""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 95) == 0.0
+
+    def test_summarize_latencies(self):
+        """Test latency summary fields."""
+        summary = summarize_latencies([10.0, 20.0, 30.0, 40.0])
+        assert summary["count"] == 4
+        assert summary["p50_ms"] == 20.0
+        assert summary["max_ms"] == 40.0
+
+    def test_compare_reports_flags_regressions(self):
+        """Test that only moves in the bad direction beyond the threshold are flagged."""
+        baseline = {"chat": {"throughput_rps": 100.0, "latency": {"p95_ms": 50.0}}}
+        current = {"chat": {"throughput_rps": 80.0, "latency": {"p95_ms": 40.0}}}
+
+        regressions = compare_reports(current, baseline, threshold=0.1)
+
+        assert [r["metric"] for r in regressions] == ["chat.throughput_rps"]
+        assert regressions[0]["change_pct"] == -20.0
+
+    def test_latency_profile_parse(self):
+        """Test parsing of latency specs."""
+        profile = LatencyProfile.parse("lognormal:400:150:0.05:429")
+        assert profile.distribution == "lognormal"
+        assert profile.mean_ms == 400
+        assert profile.error_rate == 0.05
+        assert profile.error_status == 429
+        assert profile.sample_delay() >= 0
+
+    def test_latency_profile_unknown_distribution(self):
+        """Test unknown distributions are rejected."""
+        with pytest.raises(ValueError):
+            LatencyProfile.parse("pareto:100").sample_delay()
+
+    def test_build_page_size(self):
+        """Test synthetic pages honour the requested size."""
+        page = build_page("https://example.com", 5000)
+        assert len(page) == 5000
+        assert "## Contact" in page
+
+    def test_measure_calibrates_loops(self):
+        """Test microbenchmark timing output."""
+        result = measure(lambda: sum(range(100)), repeat=3, min_round_time=0.001)
+        assert result["loops"] >= 1
+        assert 0 < result["min_us"] <= result["median_us"]
+        assert result["ops_per_sec"] > 0
@@ -0,0 +1,125 @@
+import io
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.bulk import BulkTransferService
+
+
+def make_rows(count):
+    return [
+        {
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "url": f"https://site-{i}.com",
+            "raw_content": "content",
+            "insights": {"industry": "Technology"},
+            "token_count": 10,
+            "sections": [{"title": "About"}],
+            "content_hash": "abc",
+            "created_at": "2024-01-01T00:00:00+00:00",
+            "updated_at": f"2024-01-0{1 + i // 3}T00:00:00+00:00",
+        }
+        for i in range(count)
+    ]
+
+
+def paged(rows):
+    """get_rows_after stand-in that pages rows by (updated_at, id)"""
+    async def get_rows_after(table, key_column, after, limit, columns):
+        remaining = [r for r in rows if after is None or (r[key_column], r["id"]) > after]
+        return remaining[:limit]
+    return get_rows_after
+
+
+async def chunks_of(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+async def collect(stream):
+    return b"".join([chunk async for chunk in stream])
+
+
+class TestBulkTransferService:
+    """Unit tests for BulkTransferService."""
+
+    def setup_method(self):
+        """Setup test instance."""
+        self.service = BulkTransferService()
+
+    @pytest.mark.asyncio
+    async def test_export_ndjson_pages_by_keyset(self):
+        """Test every row is exported once, paging by (updated_at, id)."""
+        rows = make_rows(7)
+
+        with patch('app.services.bulk.db_service') as mock_db:
+            mock_db.get_rows_after = AsyncMock(side_effect=paged(rows))
+            data = await collect(self.service.export_ndjson("website_analyses", batch_size=3))
+
+        exported = [json.loads(line) for line in data.decode().splitlines()]
+        assert [row["url"] for row in exported] == [row["url"] for row in rows]
+        cursors = [call.args[2] for call in mock_db.get_rows_after.call_args_list]
+        assert cursors == [None, (rows[2]["updated_at"], rows[2]["id"]), (rows[5]["updated_at"], rows[5]["id"])]
+
+    @pytest.mark.asyncio
+    async def test_export_since(self):
+        """Test since starts the keyset cursor at the given timestamp."""
+        with patch('app.services.bulk.db_service') as mock_db:
+            mock_db.get_rows_after = AsyncMock(return_value=[])
+            await collect(self.service.export_ndjson("conversations", since="2024-01-02T00:00:00+00:00"))
+
+        key_column, after = mock_db.get_rows_after.call_args.args[1:3]
+        assert key_column == "created_at"
+        assert after[0] == "2024-01-02T00:00:00+00:00"
+
+    @pytest.mark.asyncio
+    async def test_export_since_validated(self):
+        """Test since is re-serialized as an ISO timestamp, and anything else rejected."""
+        with patch('app.services.bulk.db_service') as mock_db:
+            mock_db.get_rows_after = AsyncMock(return_value=[])
+            await collect(self.service.export_ndjson("website_analyses", since="2024-01-02T00:00:00Z"))
+            with pytest.raises(ValueError):
+                await collect(self.service.export_ndjson("website_analyses", since='x",id.gt.0'))
+
+        assert mock_db.get_rows_after.call_count == 1
+        assert mock_db.get_rows_after.call_args.args[2][0] == "2024-01-02T00:00:00+00:00"
+
+    @pytest.mark.asyncio
+    async def test_export_parquet(self):
+        """Test Parquet export streams a readable file with one row group per batch."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        rows = make_rows(5)
+
+        with patch('app.services.bulk.db_service') as mock_db:
+            mock_db.get_rows_after = AsyncMock(side_effect=paged(rows))
+            data = await collect(self.service.export_parquet("website_analyses", batch_size=2))
+
+        parquet_file = pq.ParquetFile(io.BytesIO(data))
+        table = parquet_file.read()
+        assert parquet_file.num_row_groups == 3
+        assert table.column("url").to_pylist() == [row["url"] for row in rows]
+        assert json.loads(table.column("insights")[0].as_py()) == {"industry": "Technology"}
+
+    @pytest.mark.asyncio
+    async def test_import_ndjson_batches(self):
+        """Test NDJSON split across arbitrary chunks is upserted in batches."""
+        rows = make_rows(5)
+        body = "".join(json.dumps({**row, "extra": 1}) + "\n" for row in rows).encode()
+
+        with patch('app.services.bulk.db_service') as mock_db:
+            mock_db.upsert_rows = AsyncMock(side_effect=lambda table, batch, on_conflict: len(batch))
+            result = await self.service.import_ndjson("website_analyses", chunks_of(body, 37), batch_size=2)
+
+        assert result == {"imported": 5, "batches": 3}
+        first_batch = mock_db.upsert_rows.call_args_list[0]
+        assert first_batch.kwargs["on_conflict"] == "url"
+        assert "extra" not in first_batch.args[1][0]
+
+    @pytest.mark.asyncio
+    async def test_import_invalid_line(self):
+        """Test invalid lines are rejected with their line number."""
+        body = b'{"url": "https://a.com"}\n\n{"query": "no url"}\n'
+
+        with patch('app.services.bulk.db_service') as mock_db:
+            mock_db.upsert_rows = AsyncMock(return_value=1)
+            with pytest.raises(ValueError, match="Line 3"):
+                await self.service.import_ndjson("website_analyses", chunks_of(body, 8))
@@ -0,0 +1,133 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.chat_sessions import ChatSessionStore, SessionsFull
+from app.services.fair_scheduler import FairScheduler
+from app.services.llm import LLMService
+
+
+class TestChatSessionStore:
+    """Unit tests for ChatSessionStore."""
+
+    def setup_method(self):
+        """Store with room for two sessions and 1000 bytes."""
+        self.store = ChatSessionStore(max_sessions=2, max_bytes=1000)
+
+    @pytest.mark.asyncio
+    async def test_site_is_loaded_once_and_shared(self):
+        """Test sessions about one site share its content, loaded from the database once."""
+        history = [{"id": "2", "query": "Second?", "response": "B"}, {"id": "1", "query": "First?", "response": "A"}]
+        with patch('app.services.chat_sessions.db_service') as mock_db:
+            mock_db.get_website_analysis = AsyncMock(return_value={"raw_content": "x" * 400})
+            mock_db.get_conversation_history = AsyncMock(return_value=history)
+            first = await self.store.open("https://example.com/", "session-1")
+            second = await self.store.open("https://example.com/")
+
+        assert mock_db.get_website_analysis.call_count == 1
+        assert first.site is second.site
+        assert [turn["query"] for turn in first.history] == ["First?", "Second?"]
+        assert second.history == [] and second.session_id
+        assert self.store.metrics()["bytes"] == 400 + first.history_bytes
+
+        with pytest.raises(SessionsFull):
+            await self.store.open("https://example.com/")
+
+        self.store.close(first)
+        self.store.close(second)
+        assert self.store.metrics()["sites"] == 0
+
+    @pytest.mark.asyncio
+    async def test_memory_cap_and_unknown_site(self):
+        """Test sessions are refused beyond the memory cap and for sites never analyzed."""
+        with patch('app.services.chat_sessions.db_service') as mock_db:
+            mock_db.get_website_analysis = AsyncMock(side_effect=[{"raw_content": "x" * 600}, {"raw_content": "y" * 600}, None])
+            await self.store.open("https://a.com/")
+            with pytest.raises(SessionsFull):
+                await self.store.open("https://b.com/")
+            assert await self.store.open("https://c.com/") is None
+
+        assert self.store.metrics()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_history_trimmed_and_reanalyzed_site_reloaded(self):
+        """Test history stays within the turn limit and a re-analyzed site is reloaded on refresh."""
+        with patch('app.services.chat_sessions.db_service') as mock_db, \
+                patch('app.services.chat_sessions.settings.chat_history_turns', 2):
+            mock_db.get_website_analysis = AsyncMock(side_effect=[{"raw_content": "old"}, {"raw_content": "new"}])
+            session = await self.store.open("https://example.com/")
+            for n in range(3):
+                session.add_turn(f"Q{n}?", f"A{n}")
+            assert [turn["query"] for turn in session.history] == ["Q1?", "Q2?"]
+
+            self.store.invalidate("https://example.com/")
+            assert await self.store.refresh(session)
+
+        assert session.site.content == "new"
+        assert self.store.metrics()["reloads"] == 1
+
+    @pytest.mark.asyncio
+    async def test_turns_persisted_in_background(self):
+        """Test turns are stored without blocking, and failed writes are only logged."""
+        with patch('app.services.chat_sessions.db_service') as mock_db, \
+                patch('app.services.chat_sessions.write_behind') as mock_write_behind:
+            mock_db.get_website_analysis = AsyncMock(return_value={"raw_content": "content"})
+            mock_write_behind.pending_row.return_value = None
+            mock_write_behind.store_conversation = AsyncMock(side_effect=["conv-id", Exception("down")])
+            session = await self.store.open("https://example.com/")
+            session.persist("Q1?", "A1")
+            session.persist("Q2?", "A2")
+            await session.flush()
+
+        assert mock_write_behind.store_conversation.call_count == 2
+        assert mock_write_behind.store_conversation.call_args.kwargs["session_id"] == session.session_id
+
+
+class TestStreamingAnswers:
+    """LLMService streaming chat answers."""
+
+    def setup_method(self):
+        """Setup test instance without context caching."""
+        self.llm = LLMService()
+        self.llm.context_cache = None
+
+    async def collect(self, **kwargs):
+        return [chunk async for chunk in self.llm.stream_conversational_query(**kwargs)]
+
+    @pytest.mark.asyncio
+    async def test_answer_streamed_and_cached(self, sample_website_content):
+        """Test chunks are passed on as they arrive and the whole answer is cached."""
+        chunks = [MagicMock(text="Cloud "), MagicMock(text="computing.")]
+        with patch.object(self.llm.model, 'generate_content', return_value=iter(chunks)) as mock_generate:
+            first = await self.collect(content=sample_website_content, query="What do they sell?", url="https://example.com/")
+            second = await self.collect(content=sample_website_content, query="What do they sell?", url="https://example.com/")
+
+        assert first == ["Cloud ", "computing."]
+        assert second == ["Cloud computing."]
+        assert mock_generate.call_count == 1
+        assert mock_generate.call_args.kwargs["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_failed_stream_falls_back(self, sample_website_content):
+        """Test a stream failing before any chunk is answered without streaming instead."""
+        def generate(prompt, stream=False, **kwargs):
+            if stream:
+                raise Exception("stream reset")
+            return MagicMock(text="Cloud computing.")
+
+        with patch.object(self.llm.model, 'generate_content', side_effect=generate):
+            result = await self.collect(content=sample_website_content, query="What do they sell?")
+
+        assert result == ["Cloud computing."]
+
+    @pytest.mark.asyncio
+    async def test_closing_stream_frees_slot(self, sample_website_content):
+        """Test a stream abandoned mid-answer gives its Gemini slot back when closed."""
+        chunks = [MagicMock(text="Cloud "), MagicMock(text="computing.")]
+        with patch.object(self.llm.model, 'generate_content', return_value=iter(chunks)), \
+                patch('app.services.llm.gemini_scheduler', FairScheduler("gemini", concurrency=1)) as scheduler:
+            stream = self.llm.stream_conversational_query(content=sample_website_content, query="What do they sell?")
+            assert await stream.__anext__() == "Cloud "
+            assert scheduler.active == 1
+            await stream.aclose()
+
+        assert scheduler.active == 0
+
@@ -0,0 +1,140 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.context_cache import ContextCache, LocalContextCacheBackend
+from app.services.llm import LLMService
+
+
+@pytest.fixture
+def base_model():
+    model = MagicMock()
+    model.generate_content.return_value = MagicMock(text="Cached answer")
+    return model
+
+
+@pytest.fixture
+def long_content(sample_website_content):
+    return sample_website_content * 20
+
+
+class TestContextCache:
+    """Unit tests for ContextCache."""
+
+    @pytest.mark.asyncio
+    async def test_reuses_handle_for_same_content(self, base_model, long_content):
+        """Test repeated turns on the same site reuse one cached context."""
+        backend = LocalContextCacheBackend(base_model)
+        cache = ContextCache(backend, min_content_chars=100)
+
+        first = await cache.get_model("https://example.com", long_content, "model", "system")
+        second = await cache.get_model("https://example.com", long_content, "model", "system")
+
+        assert first is second
+        assert backend.created == 1
+        assert cache._locks == {}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_turns_share_one_creation(self, base_model, long_content):
+        """Test concurrent first turns on a site create its context once, and no lock outlives them."""
+        backend = LocalContextCacheBackend(base_model)
+        cache = ContextCache(backend, min_content_chars=100)
+
+        models = await asyncio.gather(*(
+            cache.get_model("https://example.com", long_content, "model", "system") for _ in range(5)
+        ))
+
+        assert all(model is models[0] for model in models)
+        assert backend.created == 1
+        assert cache._locks == {}
+
+    @pytest.mark.asyncio
+    async def test_recreates_on_content_change(self, base_model, long_content):
+        """Test changed content replaces the cached context."""
+        backend = LocalContextCacheBackend(base_model)
+        cache = ContextCache(backend, min_content_chars=100)
+
+        await cache.get_model("https://example.com", long_content, "model", "system")
+        await cache.get_model("https://example.com", long_content + " updated", "model", "system")
+
+        assert backend.created == 2
+        assert backend.deleted == 1
+
+    @pytest.mark.asyncio
+    async def test_recreates_on_expiry(self, base_model, long_content):
+        """Test expired handles are recreated and near-expiry handles are extended."""
+        backend = LocalContextCacheBackend(base_model)
+        cache = ContextCache(backend, ttl_seconds=3600, refresh_margin_seconds=300, min_content_chars=100)
+
+        await cache.get_model("https://example.com", long_content, "model", "system")
+        handle = cache._handles.get("https://example.com")
+
+        handle.expires_at -= 3500  # inside the refresh margin
+        await cache.get_model("https://example.com", long_content, "model", "system")
+        assert backend.extended == 1
+        assert backend.created == 1
+
+        handle.expires_at -= 7200  # expired
+        await cache.get_model("https://example.com", long_content, "model", "system")
+        assert backend.created == 2
+
+    @pytest.mark.asyncio
+    async def test_small_content_not_cached(self, base_model):
+        """Test content below the minimum size is not cached."""
+        backend = LocalContextCacheBackend(base_model)
+        cache = ContextCache(backend, min_content_chars=10_000)
+
+        assert await cache.get_model("https://example.com", "short", "model", "system") is None
+        assert backend.created == 0
+
+    @pytest.mark.asyncio
+    async def test_creation_failure_backs_off(self, long_content):
+        """Test failed cache creation falls back and is not retried immediately."""
+        backend = MagicMock()
+        backend.create.side_effect = Exception("Cached content is too small")
+        cache = ContextCache(backend, min_content_chars=100)
+
+        assert await cache.get_model("https://example.com", long_content, "model", "system") is None
+        assert await cache.get_model("https://example.com", long_content, "model", "system") is None
+        assert backend.create.call_count == 1
+
+
+class TestLLMServiceContextCache:
+    """Tests for chat answering through a cached context."""
+
+    def setup_method(self):
+        """Setup test instance."""
+        self.llm = LLMService()
+
+    @pytest.mark.asyncio
+    async def test_cached_turn_sends_only_question(self, long_content):
+        """Test cached turns omit the site content from the prompt."""
+        self.llm.context_cache = ContextCache(LocalContextCacheBackend(self.llm.model), min_content_chars=100)
+
+        with patch.object(self.llm.model, 'generate_content', return_value=MagicMock(text="Cloud.")) as mock_generate:
+            await self.llm.answer_conversational_query(long_content, "What do they sell?", url="https://example.com")
+            result = await self.llm.answer_conversational_query(
+                long_content, "Where are they?", [{"query": "What do they sell?", "response": "Cloud."}],
+                url="https://example.com"
+            )
+
+        assert result == "Cloud."
+        assert self.llm.context_cache.backend.created == 1
+        # The local backend prepends the cached prefix; the per-turn prompt itself has no content
+        turn_prompt = mock_generate.call_args[0][0].split(long_content, 1)[1]
+        assert "Website Content" not in turn_prompt
+        assert "Where are they?" in turn_prompt
+
+    @pytest.mark.asyncio
+    async def test_cached_call_failure_falls_back(self, long_content):
+        """Test a failing cached model invalidates the handle and answers uncached."""
+        backend = MagicMock()
+        cached_model = MagicMock()
+        cached_model.generate_content.side_effect = Exception("404 cache not found")
+        backend.create.return_value = MagicMock(model=cached_model, remaining=MagicMock(return_value=3600))
+        self.llm.context_cache = ContextCache(backend, min_content_chars=100)
+
+        with patch.object(self.llm.model, 'generate_content', return_value=MagicMock(text="Fallback.")):
+            result = await self.llm.answer_conversational_query(long_content, "Q?", url="https://example.com")
+
+        assert result == "Fallback."
+        backend.delete.assert_called_once()
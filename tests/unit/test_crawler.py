@@ -0,0 +1,95 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.crawler import SiteCrawler, discover_links
+from app.services.scraper import ScraperService
+
+HOMEPAGE = """
+# Acme Corporation
+[About us](/about) | [Contact](https://www.acme.com/contact#form) | [Blog](/blog/post-1)
+[Careers](https://acme.com/careers) [Logo](/static/logo.png) [Partner](https://other.com/about)
+Email us: mailto:hello@acme.com
+""" + "Acme builds cloud software for enterprises. " * 10
+
+ABOUT_PAGE = "# About\nAcme was founded in 2010 and has 150 employees in San Francisco. " * 5
+CONTACT_PAGE = "# Contact\nEmail: contact@acme.com Phone: +1-555-123-4567 Address: 1 Market St. " * 5
+
+
+class TestDiscoverLinks:
+    """Unit tests for link discovery."""
+
+    def test_discovers_high_value_same_site_links(self):
+        """Test same-site about/contact/careers links are found and ranked."""
+        links = [url for url, _ in discover_links(HOMEPAGE, "https://acme.com/")]
+
+        assert links[:2] == ["https://www.acme.com/contact", "https://acme.com/about"]
+        assert "https://acme.com/careers" in links
+        assert not any("other.com" in url or url.endswith(".png") for url in links)
+        assert "https://acme.com/blog/post-1" not in links
+
+
+class TestSiteCrawler:
+    """Unit tests for SiteCrawler."""
+
+    def setup_method(self):
+        """Setup test instance."""
+        self.scraper = ScraperService()
+        self.crawler = SiteCrawler(self.scraper)
+
+    @pytest.mark.asyncio
+    async def test_crawl_merges_pages(self, mock_app_settings):
+        """Test the homepage and linked pages are fetched and merged."""
+        pages = {
+            "https://acme.com/": HOMEPAGE,
+            "https://www.acme.com/contact": CONTACT_PAGE,
+            "https://acme.com/about": ABOUT_PAGE,
+            "https://acme.com/careers": ABOUT_PAGE,  # duplicate of /about
+        }
+
+        async def fetch(client, url):
+            return pages[url]
+
+        with patch('app.services.crawler.settings') as crawl_settings, \
+             patch.object(self.scraper, 'fetch_page', side_effect=fetch) as mock_fetch:
+            crawl_settings.crawl_max_pages = 5
+            crawl_settings.crawl_per_host_concurrency = 2
+            crawl_settings.crawl_politeness_delay_seconds = 0
+            crawl_settings.crawl_max_chars = 100000
+            crawl_settings.crawl_duplicate_threshold = 0.9
+
+            result = await self.crawler.crawl_website("https://acme.com/")
+
+        assert mock_fetch.call_count == 4
+        assert "contact@acme.com" in result
+        assert "150 employees" in result
+        assert "## Page: https://acme.com/about" in result
+        assert "## Page: https://acme.com/careers" not in result
+
+    @pytest.mark.asyncio
+    async def test_crawl_skips_failed_subpages(self):
+        """Test a failing internal page does not fail the crawl."""
+        async def fetch(client, url):
+            if url.endswith("/about"):
+                raise Exception("HTTP 500")
+            return CONTACT_PAGE if "contact" in url else HOMEPAGE
+
+        with patch.object(self.scraper, 'fetch_page', side_effect=fetch):
+            result = await self.crawler.crawl_website("https://acme.com/", max_pages=3)
+
+        assert "contact@acme.com" in result
+        assert "## Page: https://acme.com/about" not in result
+
+    @pytest.mark.asyncio
+    async def test_crawl_homepage_failure(self):
+        """Test a failing homepage fails the crawl."""
+        with patch.object(self.scraper, 'fetch_page', AsyncMock(side_effect=Exception("Timeout"))):
+            with pytest.raises(Exception, match="Scraping error"):
+                await self.crawler.crawl_website("https://acme.com/")
+
+    def test_merge_respects_budget(self):
+        """Test merged content stays within the character budget."""
+        pages = [("https://acme.com/", "a" * 5000), ("https://acme.com/about", "b" * 5000)]
+
+        merged = self.crawler._merge(pages, 4000)
+
+        assert len(merged) <= 4002
+        assert "b" * 100 in merged
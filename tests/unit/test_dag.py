@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from app.utils.dag import Dag, Stage, StageTimeout
+
+
+def sleeper(seconds, value=None, log=None, name=None):
+    async def fn(results):
+        if log is not None:
+            log.append(name)
+        await asyncio.sleep(seconds)
+        return value
+    return fn
+
+
+class TestDag:
+    """Unit tests for the pipeline DAG runner."""
+
+    @pytest.mark.asyncio
+    async def test_independent_stages_overlap(self):
+        """Test stages run once their dependencies are done, side branches concurrently."""
+        async def total(results):
+            return results["a"] + results["b"]
+
+        dag = Dag([
+            Stage("fetch", sleeper(0.05, 1)),
+            Stage("a", sleeper(0.1, 2), after=("fetch",)),
+            Stage("b", sleeper(0.1, 3), after=("fetch",)),
+            Stage("sum", total, after=("a", "b"))
+        ])
+        results = await dag.run()
+
+        assert results["sum"] == 5
+        assert dag.timings["sum"].end < 0.22
+        assert dag.timings["a"].start >= dag.timings["fetch"].end
+        assert dag.critical_path()[0] == "fetch" and dag.critical_path()[-1] == "sum"
+        assert 'critical;desc="fetch>' in dag.server_timing()
+
+    @pytest.mark.asyncio
+    async def test_retries_and_timeouts(self):
+        """Test a stage is retried after failing or timing out, up to its retries."""
+        attempts = []
+
+        async def flaky(results):
+            attempts.append(1)
+            if len(attempts) == 1:
+                await asyncio.sleep(1)
+            return "ok"
+
+        dag = Dag([Stage("write", flaky, timeout=0.05, retries=1, retry_delay=0)])
+        assert (await dag.run())["write"] == "ok"
+        assert dag.timings["write"].attempts == 2
+
+        dag = Dag([Stage("write", sleeper(1), timeout=0.05)])
+        with pytest.raises(StageTimeout):
+            await dag.run()
+        assert dag.failed == "write"
+
+    @pytest.mark.asyncio
+    async def test_failure_cancels_the_rest(self):
+        """Test the first failure is raised, running stages cancelled and dependents never started."""
+        started = []
+
+        async def fail(results):
+            raise ValueError("boom")
+
+        dag = Dag([
+            Stage("slow", sleeper(5, log=started, name="slow")),
+            Stage("fail", fail),
+            Stage("after", sleeper(0, log=started, name="after"), after=("fail",))
+        ])
+        with pytest.raises(ValueError, match="boom"):
+            await asyncio.wait_for(dag.run(), 1)
+
+        assert dag.failed == "fail"
+        assert started == ["slow"]
+        assert dag.timings["slow"].end < 1
+
+    def test_invalid_graphs(self):
+        """Test unknown dependencies and cycles are rejected up front."""
+        with pytest.raises(ValueError, match="unknown"):
+            Dag([Stage("a", sleeper(0), after=("missing",))])
+        with pytest.raises(ValueError, match="cycle"):
+            Dag([Stage("a", sleeper(0), after=("b",)), Stage("b", sleeper(0), after=("a",))])
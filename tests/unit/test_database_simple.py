@@ -21,33 +21,20 @@ class TestDatabaseService:
     """Unit tests for DatabaseService."""
 
     @pytest.mark.asyncio
-    async def test_store_website_analysis_new(self, mock_db, sample_website_content, sample_insights):
-        """Test storing new website analysis."""
+    async def test_store_website_analysis_upserts(self, mock_db, sample_website_content, sample_insights):
+        """Test storing a website analysis inserts or updates it in one statement on its URL."""
         url = "https://example.com"
         
-        # Mock no existing record
-        mock_db.mock_table.select.return_value.eq.return_value.execute.return_value.data = []
-        
-        # Mock insert response
-        mock_db.mock_table.insert.return_value.execute.return_value.data = [{"id": "test-id-123"}]
+        # Mock upsert response
+        mock_db.mock_table.upsert.return_value.execute.return_value.data = [{"id": "test-id-123"}]
         
         result = await mock_db.store_website_analysis(url, sample_website_content, sample_insights)
         
         assert result == "test-id-123"
-        mock_db.mock_table.insert.assert_called_once()
-
-    @pytest.mark.asyncio
-    async def test_store_website_analysis_update(self, mock_db, sample_website_content, sample_insights):
-        """Test updating existing website analysis."""
-        url = "https://example.com"
-        
-        # Mock existing record
-        mock_db.mock_table.select.return_value.eq.return_value.execute.return_value.data = [{"id": "existing-id"}]
-        
-        result = await mock_db.store_website_analysis(url, sample_website_content, sample_insights)
-        
-        assert result == "existing-id"
-        mock_db.mock_table.update.assert_called_once()
+        mock_db.mock_table.upsert.assert_called_once()
+        assert mock_db.mock_table.upsert.call_args.kwargs["on_conflict"] == "url"
+        assert mock_db.mock_table.upsert.call_args.args[0]["url"] == url
+        mock_db.mock_table.select.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_get_website_analysis_success(self, mock_db):
@@ -101,3 +88,21 @@ class TestDatabaseService:
         
         assert len(result) == 2
         assert result[0]["query"] == "What is the main product?"
+
+    @pytest.mark.asyncio
+    async def test_get_conversation_history_session_bytes(self, mock_db):
+        """Test session history is projected, filtered by session and bounded in bytes."""
+        url = "https://example.com"
+        mock_conversations = [
+            {"query": "Newest?", "response": "x" * 40},
+            {"query": "Older?", "response": "y" * 40},
+            {"query": "Oldest?", "response": "z" * 40}
+        ]
+        chain = mock_db.mock_table.select.return_value.eq.return_value.eq.return_value
+        chain.order.return_value.limit.return_value.execute.return_value.data = mock_conversations
+        
+        result = await mock_db.get_conversation_history(url, limit=10, session_id="session-1", max_bytes=100)
+        
+        assert [row["query"] for row in result] == ["Newest?", "Older?"]
+        mock_db.mock_table.select.assert_called_once_with("id, query, response, created_at")
+        mock_db.mock_table.select.return_value.eq.assert_called_once_with("session_id", "session-1")
@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from app.services.analyzer import extract_contact_info
+from app.utils.deadline import ClientDisconnected, Deadline, DeadlineExceeded, until_disconnected
+
+
+class TestDeadline:
+    """Unit tests for Deadline and disconnect handling."""
+
+    @pytest.mark.asyncio
+    async def test_stage_is_cancelled_at_its_share(self):
+        """Test a stage gets at most its share of the deadline and is cancelled after it."""
+        deadline = Deadline(1.0)
+        cancelled = asyncio.Event()
+
+        async def slow_stage():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(DeadlineExceeded) as error:
+            await deadline.run("scrape", slow_stage(), share=0.05)
+
+        assert error.value.stage == "scrape"
+        assert cancelled.is_set()
+        assert not deadline.expired
+        assert deadline.budget(0.05) == pytest.approx(0.05)
+        assert 0.5 < deadline.budget(1.0) < 1.0
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_work(self):
+        """Test the work is cancelled once the client disconnects."""
+        request = MagicMock()
+        disconnected = [False, False, True]
+        request.is_disconnected = MagicMock(side_effect=lambda: asyncio.sleep(0, disconnected.pop(0)))
+        work = asyncio.Event()
+
+        async def analysis():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                work.set()
+                raise
+
+        with pytest.raises(ClientDisconnected):
+            await until_disconnected(request, analysis(), poll_interval=0.01)
+
+        assert work.is_set()
+
+    @pytest.mark.asyncio
+    async def test_result_passes_through(self):
+        """Test a finished request returns its result without waiting for the next poll."""
+        request = MagicMock()
+
+        async def analysis():
+            return "done"
+
+        assert await asyncio.wait_for(until_disconnected(request, analysis(), poll_interval=10), timeout=1) == "done"
+
+
+class TestContactExtraction:
+    """Unit tests for local contact extraction."""
+
+    def test_extracts_contacts(self):
+        """Test emails, phones and social links are found and noise is skipped."""
+        content = (
+            "Write to sales@acme.io or sales@acme.io. ![logo](logo@2x.png)\n"
+            "Call +1 (415) 555-0100 or 415.555.0199. Founded 2024-01-15, 1200 customers, v1.2.3.\n"
+            "Follow us: https://www.linkedin.com/company/acme, [X](https://x.com/acme)"
+        )
+
+        contacts = extract_contact_info(content)
+
+        assert contacts["emails"] == ["sales@acme.io"]
+        assert contacts["phones"] == ["+1 (415) 555-0100", "415.555.0199"]
+        assert contacts["social_media"] == ["https://www.linkedin.com/company/acme", "https://x.com/acme"]
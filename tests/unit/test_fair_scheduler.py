@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from fastapi import HTTPException
+from app.config import ApiKeyConfig
+from app.services.fair_scheduler import Caller, FairScheduler
+from app.utils.auth import api_key_for, charge_quota
+
+
+async def admission_order(scheduler, callers):
+    """Queue one job per caller behind a held slot; return caller keys in admission order."""
+    order = []
+
+    async def job(caller):
+        await scheduler.acquire(caller)
+        order.append(caller.key)
+        await asyncio.sleep(0)
+        scheduler.release()
+
+    await scheduler.acquire(Caller("holder"))
+    tasks = []
+    for caller in callers:
+        tasks.append(asyncio.create_task(job(caller)))
+        await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+class TestFairScheduler:
+    """Unit tests for FairScheduler."""
+
+    @pytest.mark.asyncio
+    async def test_interactive_lane_goes_first(self):
+        """Test queued chat work is admitted before earlier batch work."""
+        scheduler = FairScheduler("test", concurrency=1)
+
+        order = await admission_order(
+            scheduler, [Caller("batch"), Caller("batch"), Caller("chat", interactive=True)]
+        )
+
+        assert order == ["chat", "batch", "batch"]
+
+    @pytest.mark.asyncio
+    async def test_keys_share_fairly_by_weight(self):
+        """Test a key with a deep backlog doesn't delay other keys, and weights set the shares."""
+        scheduler = FairScheduler("test", concurrency=1)
+
+        order = await admission_order(
+            scheduler, [Caller("bulk")] * 6 + [Caller("small")] * 2
+        )
+        assert order[:4].count("small") == 2
+
+        scheduler = FairScheduler("test", concurrency=1)
+        order = await admission_order(
+            scheduler, [Caller("heavy", weight=2.0)] * 6 + [Caller("light")] * 6
+        )
+        assert order[:6].count("heavy") == 4
+
+    @pytest.mark.asyncio
+    async def test_reserved_slot_is_kept_for_chat(self):
+        """Test batch work can't take the reserved slot but chat can."""
+        scheduler = FairScheduler("test", concurrency=2, reserved_interactive=1)
+        await scheduler.acquire(Caller("batch"))
+
+        waiting = asyncio.create_task(scheduler.acquire(Caller("batch")))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        await asyncio.wait_for(scheduler.acquire(Caller("chat", interactive=True)), timeout=1)
+        assert scheduler.active == 2
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        scheduler.release()
+        scheduler.release()
+        assert scheduler.active == 0
+        assert scheduler.waiting == 0
+
+
+class TestApiKeys:
+    """Unit tests for named API keys and quotas."""
+
+    def test_named_keys_and_quota(self):
+        """Test named keys authenticate and a used-up quota returns 429 with Retry-After."""
+        keys = {"batch-secret": ApiKeyConfig(name="batch", weight=0.5, requests_per_minute=2)}
+
+        with patch('app.utils.auth.settings') as mock_settings:
+            mock_settings.api_keys = keys
+            mock_settings.api_secret_key = "shared-secret"
+            assert api_key_for("batch-secret").name == "batch"
+            assert api_key_for("shared-secret").name == "default"
+            assert api_key_for("wrong") is None
+
+        charge_quota(keys["batch-secret"])
+        charge_quota(keys["batch-secret"])
+        with pytest.raises(HTTPException) as error:
+            charge_quota(keys["batch-secret"])
+
+        assert error.value.status_code == 429
+        assert int(error.value.headers["Retry-After"]) >= 1
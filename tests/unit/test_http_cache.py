@@ -0,0 +1,44 @@
+import gzip
+from unittest.mock import patch
+from app.utils.http_cache import encode_body, etag_matches, negotiate_encoding, strong_etag, variant_etag
+
+
+class TestConditionalRequests:
+    """Unit tests for ETag helpers."""
+
+    def test_etag_changes_with_its_parts(self):
+        """Test the ETag is stable for a version and differs across versions."""
+        assert strong_etag("u", "hash", "t1") == strong_etag("u", "hash", "t1")
+        assert strong_etag("u", "hash", "t1") != strong_etag("u", "hash", "t2")
+
+    def test_if_none_match(self):
+        """Test lists, weak tags, wildcards and encoded variants match."""
+        etag = strong_etag("u", "hash", "t1")
+
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"other", W/{etag}', etag)
+        assert etag_matches(variant_etag(etag, "gzip"), etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"other"', etag)
+        assert not etag_matches(None, etag)
+
+
+class TestCompression:
+    """Unit tests for content negotiation."""
+
+    def test_negotiation(self):
+        """Test br is preferred when available and q=0 refuses a coding."""
+        with patch('app.utils.http_cache.brotli_available', return_value=True):
+            assert negotiate_encoding("gzip, deflate, br") == "br"
+            assert negotiate_encoding("br;q=0, gzip") == "gzip"
+        with patch('app.utils.http_cache.brotli_available', return_value=False):
+            assert negotiate_encoding("br, gzip;q=0.5") == "gzip"
+        assert negotiate_encoding("identity") is None
+        assert negotiate_encoding(None) is None
+
+    def test_gzip_round_trip(self):
+        """Test encoded bodies decode to the original."""
+        body = b'{"industry": "Technology"}' * 20
+
+        assert gzip.decompress(encode_body(body, "gzip")) == body
+        assert encode_body(body, None) is body
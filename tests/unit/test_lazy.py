@@ -0,0 +1,127 @@
+import threading
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from app.config import Settings
+from app.utils.auth import verify_token
+from app.utils.lazy import LazyService
+
+
+class Counter:
+    """Service whose constructions are counted."""
+
+    created = 0
+
+    def __init__(self):
+        Counter.created += 1
+        time.sleep(0.01)
+        self.value = 1
+
+    def double(self):
+        return self.value * 2
+
+    async def fetch(self):
+        return self.value
+
+
+class Unbuildable:
+    """Service that cannot be constructed (e.g. no credentials set)."""
+
+    def __init__(self):
+        raise RuntimeError("no credentials")
+
+    async def fetch(self):
+        return 1
+
+
+class TestLazyService:
+    """Unit tests for LazyService."""
+
+    def setup_method(self):
+        """Reset the construction count."""
+        Counter.created = 0
+
+    def test_constructs_on_first_use(self):
+        """Test the instance is built on first attribute access, once."""
+        service = LazyService(Counter)
+        assert not service.resolved
+        assert Counter.created == 0
+
+        assert service.double() == 2
+        assert service.resolve() is service.resolve()
+        assert Counter.created == 1
+
+    def test_attribute_writes_and_patching_reach_the_instance(self):
+        """Test setattr and patch() act on the real instance."""
+        service = LazyService(Counter)
+        service.value = 5
+        assert service.resolve().value == 5
+
+        with patch.object(service.resolve(), "double", MagicMock(return_value=0)):
+            assert service.double() == 0
+        assert service.double() == 10
+
+    @pytest.mark.asyncio
+    async def test_patching_does_not_construct(self):
+        """Test patching a method of an unbuilt service, and restoring it, never constructs it."""
+        service = LazyService(Unbuildable)
+
+        with patch.object(service, "fetch") as mock_fetch:
+            mock_fetch.return_value = 2
+            assert isinstance(mock_fetch, AsyncMock)
+            assert await service.fetch() == 2
+        assert not hasattr(service, "_is_coroutine")
+        assert not service.resolved
+
+        with pytest.raises(RuntimeError, match="no credentials"):
+            await service.fetch()
+
+    @pytest.mark.asyncio
+    async def test_methods_and_writes_before_construction(self):
+        """Test a method taken before construction builds the service when called, with earlier writes applied."""
+        service = LazyService(Counter)
+        fetch = service.fetch
+        service.value = 3
+        assert Counter.created == 0
+
+        assert await fetch() == 3
+        assert service.resolve().value == 3
+        assert Counter.created == 1
+
+    def test_concurrent_first_use_constructs_once(self):
+        """Test racing threads share a single instance."""
+        service = LazyService(Counter)
+        threads = [threading.Thread(target=service.resolve) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert Counter.created == 1
+
+
+class TestColdStartSettings:
+    """Settings and auth without environment variables."""
+
+    def test_settings_load_without_required_values(self, monkeypatch):
+        """Test missing secrets are reported instead of failing on import."""
+        for name in ("GEMINI_API_KEY", "SUPABASE_URL", "SUPABASE_KEY", "JINA_API_KEY", "API_SECRET_KEY"):
+            monkeypatch.delenv(name, raising=False)
+
+        settings = Settings(_env_file=None, gemini_api_key="key")
+
+        assert "gemini_api_key" not in settings.missing_required()
+        assert "api_secret_key" in settings.missing_required()
+
+    @pytest.mark.asyncio
+    async def test_unset_secret_rejects_requests(self):
+        """Test an unset API secret does not accept an empty token."""
+        with patch('app.utils.auth.settings') as mock_settings:
+            mock_settings.api_secret_key = ""
+            mock_settings.api_keys = {}
+            with pytest.raises(HTTPException) as error:
+                await verify_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials=""))
+
+        assert error.value.status_code == 401
@@ -1,3 +1,4 @@
+import json
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from app.services.llm import LLMService
@@ -108,3 +109,84 @@ class TestLLMService:
         with patch.object(self.llm.model, 'generate_content', side_effect=Exception("API Error")):
             with pytest.raises(Exception, match="Conversation error"):
                 await self.llm.answer_conversational_query(sample_website_content, "Test query")
+
+    @pytest.mark.asyncio
+    async def test_extract_structured_insights(self, sample_website_content, sample_insights):
+        """Test default insights and custom answers come back from one structured call."""
+        mock_response = MagicMock()
+        mock_response.text = json.dumps({
+            **sample_insights,
+            "answers": [{"question": "What is the main product?", "answer": "Cloud computing solutions."}]
+        })
+
+        with patch.object(self.llm.model, 'generate_content', return_value=mock_response) as mock_generate:
+            result = await self.llm.extract_structured_insights(
+                sample_website_content, ["What is the main product?"]
+            )
+
+            assert result.insights.industry == "Technology"
+            assert result.answers == {"What is the main product?": "Cloud computing solutions."}
+            generation_config = mock_generate.call_args.kwargs["generation_config"]
+            assert "answers" in generation_config.response_schema["properties"]
+
+    @pytest.mark.asyncio
+    async def test_extract_structured_insights_caches_answers(self, sample_website_content, sample_insights):
+        """Test repeated questions about the same content are answered from cache."""
+        first = MagicMock()
+        first.text = json.dumps({
+            **sample_insights,
+            "answers": [{"question": "What is the main product?", "answer": "Cloud computing."}]
+        })
+        second = MagicMock()
+        second.text = json.dumps({"answers": [{"question": "Who are the customers?", "answer": "Enterprises."}]})
+
+        with patch.object(self.llm.model, 'generate_content', side_effect=[first, second]) as mock_generate:
+            await self.llm.extract_structured_insights(sample_website_content, ["What is the main product?"])
+            result = await self.llm.extract_structured_insights(
+                sample_website_content, ["what is the main product", "Who are the customers?"]
+            )
+            cached = await self.llm.extract_structured_insights(
+                sample_website_content, ["Who are the customers?"]
+            )
+
+            assert mock_generate.call_count == 2
+            # The second call only asked for the new question, without insights
+            schema = mock_generate.call_args.kwargs["generation_config"].response_schema
+            assert list(schema["properties"]) == ["answers"]
+            assert result.answers["what is the main product"] == "Cloud computing."
+            assert result.answers["Who are the customers?"] == "Enterprises."
+            assert cached.insights.location == "San Francisco, CA"
+
+    @pytest.mark.asyncio
+    async def test_extract_structured_insights_invalid_response(self, sample_website_content):
+        """Test invalid structured output raises instead of falling back to raw text."""
+        mock_response = MagicMock()
+        mock_response.text = '{"answers": "not a list"}'
+
+        with patch.object(self.llm.model, 'generate_content', return_value=mock_response):
+            with pytest.raises(Exception, match="invalid structured response"):
+                await self.llm.extract_structured_insights(sample_website_content, ["Q?"])
+
+    @pytest.mark.asyncio
+    async def test_update_business_insights(self, sample_insights):
+        """Test incremental updates send only changed sections and merge the result."""
+        mock_response = MagicMock()
+        mock_response.text = '```json\n{"location": "Austin, TX"}\n```'
+
+        with patch.object(self.llm.model, 'generate_content', return_value=mock_response) as mock_generate:
+            result = await self.llm.update_business_insights(
+                sample_insights, "## Contact\nNew office in Austin, TX", ["Contact"]
+            )
+
+            prompt = mock_generate.call_args[0][0]
+            assert "New office in Austin, TX" in prompt
+            assert '"industry": "Technology"' in prompt
+            assert result["location"] == "Austin, TX"
+            assert result["industry"] == "Technology"
+
+    @pytest.mark.asyncio
+    async def test_update_business_insights_unparseable(self, sample_insights):
+        """Test an unparseable update raises so callers can fall back to a full analysis."""
+        with patch.object(self.llm.model, 'generate_content', return_value=MagicMock(text="Sorry")):
+            with pytest.raises(Exception, match="Analysis error"):
+                await self.llm.update_business_insights(sample_insights, "## Contact\n...")
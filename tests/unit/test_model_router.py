@@ -0,0 +1,96 @@
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from app.config import ModelRouteConfig
+from app.services.llm import LLMService
+from app.services.model_router import TASK_CHAT, TASK_INSIGHTS, ModelRouter
+
+
+def names(routes):
+    return [route.name for route in routes]
+
+
+class TestModelRouter:
+    """Unit tests for ModelRouter."""
+
+    def setup_method(self):
+        """Small model for small prompts, large model for anything, fast model for chat only."""
+        self.router = ModelRouter([
+            ModelRouteConfig(name="small", max_prompt_tokens=1000),
+            ModelRouteConfig(name="large"),
+            ModelRouteConfig(name="fast", max_prompt_tokens=500, tasks=["chat"])
+        ])
+
+    def test_routes_by_size_and_task(self):
+        """Test prompts go to the preferred model that fits, with smaller models as last resorts."""
+        assert names(self.router.candidates(TASK_INSIGHTS, 800)) == ["small", "large"]
+        assert names(self.router.candidates(TASK_INSIGHTS, 5000)) == ["large", "small"]
+        assert names(self.router.candidates(TASK_CHAT, 300)) == ["small", "large", "fast"]
+        assert names(self.router.candidates(TASK_CHAT, 800)) == ["small", "large", "fast"]
+
+    def test_failing_and_slow_models_are_demoted(self):
+        """Test repeated errors or latency over the task's target move a model back, for a while."""
+        self.router.record("small", 0.1, ok=False)
+        assert names(self.router.candidates(TASK_INSIGHTS, 800)) == ["small", "large"]
+        self.router.record("small", 0.1, ok=False, timed_out=True)
+        assert names(self.router.candidates(TASK_INSIGHTS, 800)) == ["large", "small"]
+        assert self.router.metrics()["small"]["cooling_down"]
+        assert self.router.metrics()["small"]["timeouts"] == 1
+
+        self.router.stats["small"].cooldown_until = time.monotonic() - 1
+        assert names(self.router.candidates(TASK_INSIGHTS, 800)) == ["small", "large"]
+
+        self.router.record("small", 60.0, ok=True)
+        assert names(self.router.candidates(TASK_CHAT, 800)) == ["large", "small", "fast"]
+        assert names(self.router.candidates(TASK_INSIGHTS, 800))[0] == "small"
+
+
+class TestModelFallback:
+    """LLMService falling back across routed models."""
+
+    def setup_method(self):
+        """Service with two routed models."""
+        self.router = ModelRouter([
+            ModelRouteConfig(name="primary", timeout_seconds=0.01),
+            ModelRouteConfig(name="backup")
+        ])
+        with patch('app.services.llm.model_router', self.router):
+            self.llm = LLMService()
+
+    @pytest.mark.asyncio
+    async def test_error_falls_back(self):
+        """Test a failing model's call is retried on the next one and counted."""
+        with patch('app.services.llm.model_router', self.router), \
+                patch.object(self.llm.models["primary"], 'generate_content', side_effect=Exception("503")), \
+                patch.object(self.llm.models["backup"], 'generate_content', return_value=MagicMock(text="Hello")):
+            result = await self.llm.answer_conversational_query(content="Some content", query="Hi?")
+
+        assert result == "Hello"
+        metrics = self.router.metrics()
+        assert metrics["primary"]["errors"] == 1
+        assert metrics["primary"]["fallbacks"] == 1
+        assert metrics["backup"]["calls"] == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_falls_back(self):
+        """Test a model that doesn't answer within its timeout is abandoned for the next one."""
+        def slow(prompt, **kwargs):
+            time.sleep(1.5)
+
+        with patch('app.services.llm.model_router', self.router), \
+                patch.object(self.llm.models["primary"], 'generate_content', side_effect=slow) as primary, \
+                patch.object(self.llm.models["backup"], 'generate_content', return_value=MagicMock(text="Hello")):
+            result = await self.llm.answer_conversational_query(content="Some content", query="Hi?")
+
+        assert result == "Hello"
+        assert primary.call_args.kwargs["request_options"] == {"timeout": 1.0}
+        assert self.router.metrics()["primary"]["timeouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_last_error_is_raised(self):
+        """Test the error surfaces when every model fails."""
+        with patch('app.services.llm.model_router', self.router), \
+                patch.object(self.llm.models["primary"], 'generate_content', side_effect=Exception("503")), \
+                patch.object(self.llm.models["backup"], 'generate_content', side_effect=Exception("quota")):
+            with pytest.raises(Exception, match="Conversation error: quota"):
+                await self.llm.answer_conversational_query(content="Some content", query="Hi?")
@@ -0,0 +1,72 @@
+import threading
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+from app.services.offload import ContentOffload
+
+
+def shout(content: str) -> str:
+    return content.upper()
+
+
+def current_thread_name(content: str) -> str:
+    return threading.current_thread().name
+
+
+def fail(content: str) -> str:
+    raise RuntimeError("bad content")
+
+
+class TestContentOffload:
+    """Unit tests for ContentOffload."""
+
+    @pytest.mark.asyncio
+    async def test_small_content_runs_inline(self):
+        """Test content below the threshold never starts the pool."""
+        offload = ContentOffload(workers=1, min_chars=100)
+
+        assert await offload.run(shout, "page", size=4) == "PAGE"
+        assert offload.stats["inline"] == 1
+        assert offload._executor is None
+
+    @pytest.mark.asyncio
+    async def test_large_content_runs_in_the_pool(self):
+        """Test content at the threshold is processed by a worker process."""
+        offload = ContentOffload(workers=1, min_chars=100)
+        try:
+            assert await offload.run(shout, "x" * 100, size=100) == "X" * 100
+        finally:
+            offload.shutdown()
+
+        metrics = offload.metrics()
+        assert metrics["offloaded"] == 1
+        assert metrics["max_pending"] == 1
+        assert metrics["queue_depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_broken_pool_falls_back_to_a_thread(self):
+        """Test a crashed pool is replaced and the job still completes, off the event loop."""
+        offload = ContentOffload(workers=1, min_chars=1)
+
+        with patch.object(offload, "_pool", side_effect=BrokenProcessPool("worker died")):
+            assert await offload.run(shout, "page", size=4) == "PAGE"
+            assert await offload.run(current_thread_name, "page", size=4) != threading.current_thread().name
+
+        assert offload.stats["fallbacks"] == 2
+        assert offload.stats["offloaded"] == 0
+
+    @pytest.mark.asyncio
+    async def test_job_errors_propagate(self):
+        """Test an error raised by the job is not mistaken for a broken pool, and a closed pool is replaced."""
+        offload = ContentOffload(workers=1, min_chars=1)
+        try:
+            with pytest.raises(RuntimeError, match="bad content"):
+                await offload.run(fail, "page", size=4)
+            assert offload.stats["fallbacks"] == 0
+            assert offload.stats["offloaded"] == 0
+
+            offload._pool().shutdown()
+            assert await offload.run(shout, "page", size=4) == "PAGE"
+            assert offload.stats["fallbacks"] == 1
+        finally:
+            offload.shutdown()
@@ -0,0 +1,93 @@
+import asyncio
+import time
+import tracemalloc
+import pytest
+from unittest.mock import patch
+from app.services.profiler import Profiler, _current_profile
+
+
+async def wait_upstream():
+    await asyncio.sleep(0.2)
+
+
+def burn(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def handle_request():
+    await asyncio.create_task(wait_upstream())
+    burn(0.1)
+    return [bytearray(1024) for _ in range(1000)]
+
+
+async def unrelated():
+    await asyncio.sleep(0.3)
+
+
+class TestProfiler:
+    """Unit tests for the on-demand profiler."""
+
+    def setup_method(self):
+        """Profiler sampling every millisecond."""
+        self.profiler = Profiler(keep=5)
+
+    @pytest.mark.asyncio
+    async def test_request_profile_follows_its_tasks(self):
+        """Test a request profile samples the request and tasks it starts, waiting or running, only."""
+        other = asyncio.ensure_future(unrelated())
+        with patch('app.services.profiler.settings.profiling_sample_interval_seconds', 0.001):
+            loop = asyncio.get_running_loop()
+            factory = loop.get_task_factory()
+            profile = await self.profiler.start("GET /test")
+            kept = await handle_request()
+            await self.profiler.stop(profile)
+        await other
+
+        folded = profile.folded()
+        assert profile.finished and profile.samples > 0
+        assert "wait_upstream" in folded and "[awaiting Future]" in folded
+        assert "burn" in folded
+        assert "unrelated" not in folded
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines())
+        assert any("test_profiler.py" in line or "test_profiler" in line for line in profile.allocations)
+        assert loop.get_task_factory() is factory
+        assert _current_profile.get() is None
+        assert self.profiler.get(profile.id) is profile
+        assert len(kept) == 1000
+
+    @pytest.mark.asyncio
+    async def test_worker_profile_samples_everything(self):
+        """Test a worker profile samples every task for the given time."""
+        other = asyncio.ensure_future(unrelated())
+        with patch('app.services.profiler.settings.profiling_sample_interval_seconds', 0.001):
+            profile = await self.profiler.capture(0.1)
+        await other
+
+        assert "unrelated" in profile.folded()
+        assert profile.duration >= 0.1
+
+    @pytest.mark.asyncio
+    async def test_snapshots_taken_off_the_loop(self):
+        """Test slow allocation snapshots don't block other tasks while a profile starts and stops."""
+        real_snapshot = tracemalloc.take_snapshot
+        ticks = []
+
+        def slow_snapshot():
+            time.sleep(0.1)
+            return real_snapshot()
+
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        running = asyncio.ensure_future(ticker())
+        with patch('app.services.profiler.tracemalloc.take_snapshot', side_effect=slow_snapshot):
+            profile = await self.profiler.start("GET /test")
+            await self.profiler.stop(profile)
+        running.cancel()
+
+        assert profile.finished
+        assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.08
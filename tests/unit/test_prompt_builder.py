@@ -0,0 +1,69 @@
+from app.services.prompt_builder import PromptBuilder, Section, estimate_tokens
+
+
+def build_page(filler_sections: int = 40) -> str:
+    parts = ["# Acme Corporation\nWelcome to Acme."]
+    for i in range(filler_sections):
+        parts.append(f"## Blog post {i}\n" + "Thoughts on engineering culture and tooling. " * 40)
+    parts.append("## Pricing\nStarter $10 per month, Enterprise plans available.")
+    parts.append("## About Us\nFounded in 2010, 150 employees, headquarters in San Francisco.")
+    parts.append("## Contact\nEmail: contact@acme.com\nPhone: +1-555-123-4567")
+    return "\n\n".join(parts)
+
+
+class TestPromptBuilder:
+    """Unit tests for PromptBuilder."""
+
+    def setup_method(self):
+        """Setup test instance."""
+        self.builder = PromptBuilder(max_section_tokens=2000)
+
+    def test_estimate_tokens(self):
+        """Test token estimation from character length."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("a" * 400) == 100
+
+    def test_split_sections_offsets(self):
+        """Test sections cover the content and carry titles."""
+        content = build_page(2)
+        sections = self.builder.split_sections(content)
+
+        assert [s.title for s in sections][-3:] == ["Pricing", "About Us", "Contact"]
+        assert "".join(s.text(content) for s in sections) == content
+        assert Section.from_dict(sections[0].to_dict()) == sections[0]
+
+    def test_split_sections_chunks_oversized(self):
+        """Test oversized sections are chunked."""
+        builder = PromptBuilder(max_section_tokens=100)
+        content = "# Big\n" + ("paragraph text " * 30 + "\n\n") * 10
+
+        sections = builder.split_sections(content)
+
+        assert len(sections) > 1
+        assert all(s.tokens <= 101 for s in sections)
+
+    def test_fit_returns_small_content_unchanged(self, sample_website_content):
+        """Test content within budget is untouched."""
+        assert self.builder.fit(sample_website_content, "insights", "unknown-model") == sample_website_content
+
+    def test_fit_keeps_priority_sections(self):
+        """Test over-budget content keeps contact/about/pricing sections in page order."""
+        content = build_page(40)
+        self.builder.budget_for = lambda model_name: 2048 + 1500
+
+        fitted = self.builder.fit(content, "insights", "model")
+
+        assert estimate_tokens(fitted) <= 1600
+        assert "contact@acme.com" in fitted
+        assert "150 employees" in fitted
+        assert fitted.index("About Us") < fitted.index("Contact")
+        assert "lower-priority sections omitted" in fitted
+
+    def test_fit_ranks_by_query(self):
+        """Test chat queries pull in matching sections."""
+        content = build_page(40).replace("## Blog post 7\n", "## Blog post 7\nOur kubernetes migration story. ")
+        self.builder.budget_for = lambda model_name: 2048 + 800
+
+        fitted = self.builder.fit(content, "chat", "model", query="Tell me about kubernetes")
+
+        assert "kubernetes" in fitted
@@ -0,0 +1,168 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+from app.services.fair_scheduler import SYSTEM_CALLER, Caller, current_caller
+from app.services.scheduler import FreshnessScheduler, refresh_priority
+from app.utils.cache import content_hash
+from app.utils.deadline import Deadline, current_deadline
+from app.utils.token_bucket import TokenBucket
+
+
+def ago(hours):
+    return (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
+
+
+@pytest.fixture
+def scheduler():
+    return FreshnessScheduler(
+        max_age_seconds=86400,
+        interval_seconds=300,
+        pages_per_hour=24,
+        concurrency=2,
+        activity_window_seconds=604800,
+        scan_limit=100
+    )
+
+
+class TestTokenBucket:
+    """Unit tests for TokenBucket."""
+
+    def test_refills_over_time(self):
+        """Test tokens are consumed and refilled at the configured rate."""
+        now = [0.0]
+        bucket = TokenBucket(rate=1.0, capacity=2, clock=lambda: now[0])
+
+        assert bucket.try_acquire() and bucket.try_acquire()
+        assert not bucket.try_acquire()
+        assert bucket.time_until() == pytest.approx(1.0)
+
+        now[0] = 1.5
+        assert bucket.try_acquire()
+        assert bucket.tokens == pytest.approx(0.5)
+
+
+class TestFreshnessScheduler:
+    """Unit tests for FreshnessScheduler."""
+
+    def test_refresh_priority(self):
+        """Test older and busier analyses rank higher."""
+        assert refresh_priority(2 * 86400, 0, 86400) > refresh_priority(86400, 0, 86400)
+        assert refresh_priority(86400, 10, 86400) > refresh_priority(86400, 0, 86400)
+
+    @pytest.mark.asyncio
+    async def test_plan_orders_by_staleness_and_activity(self, scheduler):
+        """Test the queue is ordered by staleness boosted by chat activity."""
+        with patch('app.services.scheduler.db_service') as mock_db:
+            mock_db.get_analyses_updated_before = AsyncMock(return_value=[
+                {"url": "https://old.com", "updated_at": ago(72)},
+                {"url": "https://busy.com", "updated_at": ago(30)},
+                {"url": "https://quiet.com", "updated_at": ago(30)},
+            ])
+            mock_db.get_chat_activity = AsyncMock(return_value={"https://busy.com": 50})
+
+            assert await scheduler.plan() == 3
+
+        order = [url for _, url in sorted(scheduler._queue)]
+        assert order == ["https://busy.com", "https://old.com", "https://quiet.com"]
+
+    @pytest.mark.asyncio
+    async def test_run_once_respects_budget(self, scheduler):
+        """Test no more pages are refreshed than the upstream budget allows."""
+        scheduler.budget = TokenBucket(rate=0, capacity=2)
+        records = [{"url": f"https://site-{i}.com", "updated_at": ago(48 + i)} for i in range(5)]
+
+        with patch('app.services.scheduler.db_service') as mock_db, \
+             patch.object(scheduler, 'refresh', AsyncMock(return_value="full")) as mock_refresh:
+            mock_db.get_analyses_updated_before = AsyncMock(return_value=records)
+            mock_db.get_chat_activity = AsyncMock(return_value={})
+            mock_db.get_website_analysis = AsyncMock(side_effect=lambda url: {"url": url, "raw_content": "page"})
+
+            assert await scheduler.run_once() == 2
+
+        refreshed = [call.args[0] for call in mock_refresh.call_args_list]
+        assert refreshed == ["https://site-4.com", "https://site-3.com"]
+
+    @pytest.mark.asyncio
+    async def test_refresh_unchanged_skips_llm(self, scheduler, sample_website_content, sample_insights):
+        """Test unchanged content only marks the analysis fresh."""
+        previous = {
+            "raw_content": sample_website_content,
+            "content_hash": content_hash(sample_website_content),
+            "insights": sample_insights
+        }
+
+        with patch('app.services.scheduler.scraper_service') as mock_scraper, \
+             patch('app.services.scheduler.db_service') as mock_db, \
+             patch('app.services.scheduler.website_analyzer') as mock_analyzer:
+            mock_scraper.scrape_website = AsyncMock(return_value=sample_website_content)
+            mock_db.touch_website_analysis = AsyncMock()
+
+            assert await scheduler.refresh("https://example.com", previous) == "unchanged"
+
+        mock_db.touch_website_analysis.assert_awaited_once_with("https://example.com")
+        mock_analyzer.extract_insights.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_refresh_changed_reanalyzes(self, scheduler, sample_website_content, sample_insights):
+        """Test changed content is re-analyzed and stored."""
+        previous = {"raw_content": "old page", "content_hash": content_hash("old page"), "insights": sample_insights}
+
+        with patch('app.services.scheduler.scraper_service') as mock_scraper, \
+             patch('app.services.scheduler.db_service') as mock_db, \
+             patch('app.services.scheduler.website_analyzer') as mock_analyzer:
+            mock_scraper.scrape_website = AsyncMock(return_value=sample_website_content)
+            mock_analyzer.extract_insights = AsyncMock(return_value=(sample_insights, "incremental"))
+            mock_db.store_website_analysis = AsyncMock()
+
+            assert await scheduler.refresh("https://example.com", previous) == "incremental"
+
+        stored = mock_db.store_website_analysis.call_args.kwargs
+        assert stored["insights"] == sample_insights
+        assert stored["content_hash"] == content_hash(sample_website_content)
+        assert scheduler.stats["refreshed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_revalidate_deduplicates(self, scheduler):
+        """Test concurrent revalidations of one URL refresh it once."""
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_refresh(url, previous):
+            started.set()
+            await release.wait()
+            return "full"
+
+        with patch('app.services.scheduler.db_service') as mock_db, \
+             patch.object(scheduler, 'refresh', side_effect=slow_refresh) as mock_refresh:
+            mock_db.get_website_analysis = AsyncMock(return_value={"raw_content": "page"})
+            first = asyncio.create_task(scheduler.revalidate("https://example.com"))
+            await started.wait()
+            await scheduler.revalidate("https://example.com")
+            release.set()
+            await first
+
+        assert mock_refresh.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_revalidate_detached_from_request(self, scheduler):
+        """Test a revalidation started by a request runs without its deadline or API key."""
+        seen = {}
+
+        async def refresh(url, previous):
+            seen["deadline"] = current_deadline.get()
+            seen["caller"] = current_caller.get()
+            return "full"
+
+        deadline_token = current_deadline.set(Deadline(0.5))
+        caller_token = current_caller.set(Caller(key="client"))
+        try:
+            with patch('app.services.scheduler.db_service') as mock_db, \
+                 patch.object(scheduler, 'refresh', side_effect=refresh):
+                mock_db.get_website_analysis = AsyncMock(return_value={"raw_content": "page"})
+                await scheduler.revalidate("https://example.com")
+        finally:
+            current_deadline.reset(deadline_token)
+            current_caller.reset(caller_token)
+
+        assert seen == {"deadline": None, "caller": SYSTEM_CALLER}
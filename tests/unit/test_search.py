@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.search import SearchService, decode_cursor, encode_cursor
+
+
+def summary_rows(count):
+    return [
+        {
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "url": f"https://site-{i}.com",
+            "industry": "Technology",
+            "location": "San Francisco",
+            "company_size": "150 employees",
+            "updated_at": f"2024-01-0{9 - i}T00:00:00+00:00",
+        }
+        for i in range(count)
+    ]
+
+
+class TestSearchService:
+    """Unit tests for SearchService."""
+
+    def setup_method(self):
+        """Setup test instance."""
+        self.service = SearchService()
+
+    def test_cursor_round_trip(self):
+        """Test cursors decode to the (updated_at, id) they were built from."""
+        row_id = "0b7e6c2a-4f3d-4a8e-9c1b-2d5f6a7b8c9d"
+        cursor = encode_cursor("2024-01-01T00:00:00+00:00", row_id)
+
+        assert decode_cursor(cursor) == ("2024-01-01T00:00:00+00:00", row_id)
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor("not-a-cursor")
+
+    def test_cursor_values_are_validated(self):
+        """Test cursors whose values aren't a timestamp and a UUID are rejected, not passed to the filter."""
+        row_id = "0b7e6c2a-4f3d-4a8e-9c1b-2d5f6a7b8c9d"
+        for updated_at, cursor_id in [
+            ('2024-01-01",id.gt.0', row_id),
+            ("2024-01-01T00:00:00+00:00", "0),or(id.gt.0"),
+            ("yesterday", row_id)
+        ]:
+            with pytest.raises(ValueError, match="Invalid cursor"):
+                decode_cursor(encode_cursor(updated_at, cursor_id))
+
+    @pytest.mark.asyncio
+    async def test_next_cursor_points_at_last_row(self):
+        """Test an extra row yields a next cursor pointing at the page's last row."""
+        rows = summary_rows(3)
+
+        with patch('app.services.search.db_service') as mock_db:
+            mock_db.search_analyses = AsyncMock(return_value=rows)
+            page = await self.service.list_analyses(limit=2)
+
+        assert [item.url for item in page.items] == ["https://site-0.com", "https://site-1.com"]
+        assert decode_cursor(page.next_cursor) == (rows[1]["updated_at"], rows[1]["id"])
+        assert mock_db.search_analyses.call_args.kwargs["limit"] == 3
+
+    @pytest.mark.asyncio
+    async def test_last_page_has_no_cursor(self):
+        """Test a short page ends the listing."""
+        with patch('app.services.search.db_service') as mock_db:
+            mock_db.search_analyses = AsyncMock(return_value=summary_rows(1))
+            page = await self.service.list_analyses(limit=2)
+
+        assert len(page.items) == 1
+        assert page.next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_query_and_facets_are_passed_through(self):
+        """Test the text query, cursor and sanitized facets reach the database."""
+        cursor = encode_cursor("2024-01-05T00:00:00+00:00", "0b7e6c2a-4f3d-4a8e-9c1b-2d5f6a7b8c9d")
+
+        with patch('app.services.search.db_service') as mock_db:
+            mock_db.search_analyses = AsyncMock(return_value=[])
+            await self.service.list_analyses(
+                text_query="  cloud analytics ",
+                industry="Tech*,(x)",
+                location="  ",
+                cursor=cursor
+            )
+
+        kwargs = mock_db.search_analyses.call_args.kwargs
+        assert kwargs["text_query"] == "cloud analytics"
+        assert kwargs["filters"] == {"industry": "Tech   x"}
+        assert kwargs["before"] == ("2024-01-05T00:00:00+00:00", "0b7e6c2a-4f3d-4a8e-9c1b-2d5f6a7b8c9d")
@@ -0,0 +1,155 @@
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.embeddings import HashingEmbedder
+from app.services.similarity import SimilarityService
+from app.utils.vector_index import IVFIndex
+
+
+def unit_vectors(count, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((20, dim))
+    vectors = centres[rng.integers(0, 20, count)] + 0.3 * rng.standard_normal((count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+class TestHashingEmbedder:
+    """Unit tests for HashingEmbedder."""
+
+    def setup_method(self):
+        """Setup test instance."""
+        self.embedder = HashingEmbedder(256)
+
+    def test_similar_insights_are_closer(self, sample_insights):
+        """Test companies in the same line of business embed closer together."""
+        peer = {**sample_insights, "location": "Berlin, Germany"}
+        bakery = {"industry": "Food and beverage", "products_services": "Artisan bread and pastries"}
+
+        base = self.embedder.embed_insights(sample_insights)
+
+        assert np.linalg.norm(base) == pytest.approx(1.0, abs=1e-5)
+        assert base @ self.embedder.embed_insights(peer) > base @ self.embedder.embed_insights(bakery)
+
+    def test_only_default_insights_are_embedded(self):
+        """Test custom answers, unparsed responses and empty insights have no embedding."""
+        assert self.embedder.embed_insights({"custom_answers": "..."}) is None
+        assert self.embedder.embed_insights({"raw_analysis": "..."}) is None
+        assert self.embedder.embed_insights({"industry": "Not available"}) is None
+        assert self.embedder.embed_insights(None) is None
+
+
+class TestIVFIndex:
+    """Unit tests for IVFIndex."""
+
+    def test_exhaustive_search_before_training(self):
+        """Test a small index returns exact neighbours, excluding the query key."""
+        vectors = unit_vectors(50, 16)
+        index = IVFIndex(16)
+        index.add_many((f"k{i}", vector) for i, vector in enumerate(vectors))
+
+        results = index.search(vectors[0], k=3, exclude="k0")
+
+        expected = np.argsort(-(vectors @ vectors[0]))[1:4]
+        assert [key for key, _ in results] == [f"k{i}" for i in expected]
+
+    def test_trained_search_recall(self):
+        """Test partitioned search finds most exact neighbours."""
+        vectors = unit_vectors(3000, 32)
+        index = IVFIndex(32, nprobe=4, train_threshold=1000)
+        index.add_many((f"k{i}", vector) for i, vector in enumerate(vectors))
+        assert index.needs_training
+        index.train()
+        assert index.trained
+
+        found = exact = 0
+        for i in range(0, 3000, 100):
+            scores = vectors @ vectors[i]
+            exact_keys = {f"k{j}" for j in np.argsort(-scores)[:10]}
+            found += len(exact_keys & {key for key, _ in index.search(vectors[i], k=10)})
+            exact += 10
+        assert found / exact > 0.9
+
+    def test_replace_and_remove(self):
+        """Test re-adding a key replaces its vector and removed keys are not returned."""
+        vectors = unit_vectors(3, 8)
+        index = IVFIndex(8)
+        index.add("a", vectors[0])
+        index.add("b", vectors[1])
+        index.add("a", vectors[2])
+
+        assert len(index) == 2
+        assert index.search(vectors[2], k=1)[0][0] == "a"
+
+        index.remove("a")
+        assert [key for key, _ in index.search(vectors[2], k=5)] == ["b"]
+
+    def test_updates_reuse_slots(self):
+        """Test replacing and re-adding keys of a trained index reuses their slots and moves partitions."""
+        vectors = unit_vectors(1200, 16)
+        index = IVFIndex(16, nprobe=2, train_threshold=1000)
+        index.add_many((f"k{i}", vector) for i, vector in enumerate(vectors[:1000]))
+        index.train()
+
+        for round_ in range(5):
+            index.add_many((f"k{i}", vectors[1000 + (i + round_) % 200]) for i in range(100))
+        freed = index._slots["k500"]
+        index.remove("k500")
+        index.add("new", vectors[0])
+
+        assert index._slots["new"] == freed
+        assert len(index._keys) == 1000
+        assert sum(len(partition) for partition in index._lists) == 1000
+        results = index.search(vectors[1004], k=3)
+        assert results[0][0] == "k0" and len({key for key, _ in results}) == 3
+        assert index.search(vectors[0], k=1)[0][0] == "new"
+
+
+class TestSimilarityService:
+    """Unit tests for SimilarityService."""
+
+    def setup_method(self):
+        """Setup test instance."""
+        self.service = SimilarityService(dimensions=256, nprobe=4)
+
+    @pytest.mark.asyncio
+    async def test_load_uses_stored_or_computed_embeddings(self, sample_insights):
+        """Test loading indexes stored embeddings and embeds rows stored without one."""
+        stored = [0.0] * 256
+        stored[0] = 1.0
+
+        async def batches(*args, **kwargs):
+            yield [
+                {"url": "https://stored.com", "insights": sample_insights, "embedding": stored},
+                {"url": "https://old.com", "insights": sample_insights, "embedding": None},
+                {"url": "https://custom.com", "insights": {"custom_answers": "..."}, "embedding": stored},
+            ]
+
+        with patch('app.services.similarity.bulk_service') as mock_bulk:
+            mock_bulk.iter_batches = batches
+            assert await self.service.load() == 2
+
+        assert self.service.ready
+        assert self.service.index.get("https://stored.com")[0] == 1.0
+        assert "https://custom.com" not in self.service.index
+
+    @pytest.mark.asyncio
+    async def test_find_similar(self, sample_insights):
+        """Test similar companies are ranked and unknown websites return None."""
+        embed = HashingEmbedder(256).embed_insights
+        self.service.update("https://a.com", embed(sample_insights))
+        self.service.update("https://b.com", embed({**sample_insights, "location": "Berlin"}))
+        self.service.update("https://c.com", embed({"industry": "Food", "products_services": "Bread"}))
+
+        results = await self.service.find_similar("https://a.com", limit=2)
+        assert [url for url, _ in results] == ["https://b.com", "https://c.com"]
+
+        with patch('app.services.similarity.db_service') as mock_db:
+            mock_db.get_website_analysis = AsyncMock(return_value=None)
+            assert await self.service.find_similar("https://unknown.com") is None
+
+    def test_disabled_keeps_no_index(self, sample_insights):
+        """Test analyses are not indexed while similar-company search is disabled."""
+        with patch('app.services.similarity.settings.similarity_enabled', False):
+            self.service.update("https://a.com", HashingEmbedder(256).embed_insights(sample_insights))
+
+        assert len(self.service.index) == 0
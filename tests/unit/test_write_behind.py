@@ -0,0 +1,152 @@
+import os
+import threading
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.write_behind import WriteBehindQueue, coalesce
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return WriteBehindQueue(
+        enabled=True,
+        flush_interval_seconds=0.01,
+        batch_size=100,
+        max_pending=1000,
+        spool_path=str(tmp_path / "spool.ndjson")
+    )
+
+
+def upserted(mock_db):
+    """(table, urls or ids) per upsert_rows call"""
+    return [
+        (call.args[0], [row.get("url") if call.args[0] == "website_analyses" else row["id"] for row in call.args[1]])
+        for call in mock_db.upsert_rows.call_args_list
+    ]
+
+
+class TestCoalesce:
+    """Unit tests for write coalescing."""
+
+    def test_merges_writes_to_the_same_row(self):
+        """Test later writes to a row win and rows are grouped by column set."""
+        groups = coalesce([
+            ("website_analyses", "url", {"url": "a", "raw_content": "v1", "insights": None}),
+            ("website_analyses", "url", {"url": "b", "raw_content": "v1", "insights": None}),
+            ("website_analyses", "url", {"url": "a", "raw_content": "v2", "insights": {"industry": "x"}}),
+            ("conversations", "id", {"id": "1", "query": "q"}),
+        ])
+
+        analyses = [rows for table, _, rows in groups if table == "website_analyses"]
+        assert analyses == [[
+            {"url": "a", "raw_content": "v2", "insights": {"industry": "x"}},
+            {"url": "b", "raw_content": "v1", "insights": None}
+        ]]
+        assert ("conversations", "id", [{"id": "1", "query": "q"}]) in groups
+
+
+class TestWriteBehindQueue:
+    """Unit tests for WriteBehindQueue."""
+
+    @pytest.mark.asyncio
+    async def test_acknowledges_then_writes_in_bulk(self, queue):
+        """Test writes return immediately and are persisted together on flush."""
+        with patch('app.services.write_behind.db_service') as mock_db:
+            mock_db.upsert_rows = AsyncMock(side_effect=lambda table, rows, on_conflict: len(rows))
+            for i in range(3):
+                await queue.store_conversation("https://a.com", f"Q{i}?", "A", session_id="s1")
+            await queue.store_website_analysis("https://a.com", "content", insights={"industry": "x"})
+
+            mock_db.upsert_rows.assert_not_called()
+            assert [row["query"] for row in queue.pending_rows("conversations", session_id="s1")] == ["Q0?", "Q1?", "Q2?"]
+            assert queue.pending_row("website_analyses", "url", "https://a.com")["raw_content"] == "content"
+
+            await queue.flush()
+
+        assert [table for table, _ in upserted(mock_db)] == ["conversations", "website_analyses"]
+        assert len(mock_db.upsert_rows.call_args_list[0].args[1]) == 3
+        assert queue.pending_rows("conversations") == []
+
+    @pytest.mark.asyncio
+    async def test_disabled_writes_directly(self, tmp_path):
+        """Test a disabled queue writes through db_service as before."""
+        queue = WriteBehindQueue(False, 0.01, 100, 1000, str(tmp_path / "spool.ndjson"))
+
+        with patch('app.services.write_behind.db_service') as mock_db:
+            mock_db.store_conversation = AsyncMock(return_value="conv-id")
+            assert await queue.store_conversation("https://a.com", "Q?", "A", session_id="s1") == "conv-id"
+
+        mock_db.store_conversation.assert_awaited_once_with(url="https://a.com", query="Q?", response="A", session_id="s1")
+
+    @pytest.mark.asyncio
+    async def test_spools_while_down_and_replays_in_order(self, queue):
+        """Test failed batches are spooled, later writes queue behind them, and all replay on recovery."""
+        with patch('app.services.write_behind.db_service') as mock_db:
+            mock_db.upsert_rows = AsyncMock(side_effect=Exception("Database error: connection refused"))
+            await queue.store_website_analysis("https://a.com", "v1")
+            await queue.flush()
+            await queue.store_website_analysis("https://a.com", "v2")
+            await queue.flush()
+
+            assert queue._has_spool()
+            assert queue.stats["spooled"] == 2
+
+            mock_db.upsert_rows = AsyncMock(side_effect=lambda table, rows, on_conflict: len(rows))
+            queue._retry_at = 0.0
+            await queue.flush()
+
+        # Both spooled writes to the row were merged, newest content last
+        assert mock_db.upsert_rows.call_args.args[1] == [{"url": "https://a.com", "raw_content": "v2", "insights": None}]
+        assert not queue._has_spool()
+        assert queue.stats["replayed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_spool_io_off_the_event_loop(self, queue):
+        """Test spool appends, reads and rewrites run on a worker thread."""
+        loop_thread = threading.get_ident()
+        threads = set()
+        real_fsync, real_replace = os.fsync, os.replace
+
+        def fsync(fd):
+            threads.add(threading.get_ident())
+            real_fsync(fd)
+
+        def replace(source, destination):
+            threads.add(threading.get_ident())
+            real_replace(source, destination)
+
+        with patch('app.services.write_behind.db_service') as mock_db, \
+                patch('app.services.write_behind.os.fsync', side_effect=fsync), \
+                patch('app.services.write_behind.os.replace', side_effect=replace):
+            mock_db.upsert_rows = AsyncMock(side_effect=Exception("Database error: connection refused"))
+            await queue.store_conversation("https://a.com", "Q?", "A")
+            await queue.flush()
+            mock_db.upsert_rows = AsyncMock(side_effect=lambda table, rows, on_conflict: len(rows))
+            queue._retry_at = 0.0
+            await queue.flush()
+
+        assert queue.stats["replayed"] == 1
+        assert threads and loop_thread not in threads
+
+    @pytest.mark.asyncio
+    async def test_backpressure_flushes_inline(self, tmp_path):
+        """Test reaching max_pending writes on the caller's time."""
+        queue = WriteBehindQueue(True, 60, 100, 2, str(tmp_path / "spool.ndjson"))
+
+        with patch('app.services.write_behind.db_service') as mock_db:
+            mock_db.upsert_rows = AsyncMock(side_effect=lambda table, rows, on_conflict: len(rows))
+            await queue.store_conversation("https://a.com", "Q1?", "A")
+            mock_db.upsert_rows.assert_not_called()
+            await queue.store_conversation("https://a.com", "Q2?", "A")
+
+        assert len(mock_db.upsert_rows.call_args.args[1]) == 2
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes(self, queue):
+        """Test shutdown writes what is still queued."""
+        with patch('app.services.write_behind.db_service') as mock_db:
+            mock_db.upsert_rows = AsyncMock(side_effect=lambda table, rows, on_conflict: len(rows))
+            queue.start()
+            await queue.store_conversation("https://a.com", "Q?", "A")
+            await queue.stop()
+
+        assert queue.stats["written"] == 1